@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from eventtime import now_epoch
+
+# Archival settings
+ARCHIVE_INTERVAL = 600        # Seconds between archive sweeps
+ARCHIVE_BATCH = 200           # Events moved per write transaction
+BATCH_PAUSE = 0.05            # Seconds between batches so interactive writes get through
+ANALYZE_INTERVAL = 86400      # Seconds between ANALYZE runs
+VACUUM_PAGES = 1000           # Free pages returned to the OS per sweep
+
+EVENT_COLUMNS = ('event_id, creator_id, creator_name, description, event_type, event_size, '
+                 'location, event_time, duration, duration_minutes, created_at, '
+                 'interested_count, connect_count, latitude, longitude, guild_id')
+INTEREST_COLUMNS = 'interest_id, event_id, user_id, username, interested_in_connection, guild_id'
+
+def archive_batch(conn, now, limit=ARCHIVE_BATCH):
+    """Move up to limit ended events and their interests into the archive tables
+
+    An event has ended once event_time + duration_minutes is in the past.
+    Returns the number of events moved.
+    """
+    ids = [row[0] for row in conn.execute('''
+        SELECT event_id FROM events
+        WHERE event_time < ? AND event_time + COALESCE(duration_minutes, 0) * 60 < ?
+        ORDER BY event_time
+        LIMIT ?
+    ''', (now, now, limit))]
+    if not ids:
+        return 0
+
+    placeholders = ', '.join('?' * len(ids))
+    conn.execute(f'''
+        INSERT OR REPLACE INTO events_archive ({EVENT_COLUMNS}, archived_at)
+        SELECT {EVENT_COLUMNS}, ? FROM events WHERE event_id IN ({placeholders})
+    ''', [now] + ids)
+    conn.execute(f'''
+        INSERT OR REPLACE INTO event_interests_archive ({INTEREST_COLUMNS})
+        SELECT {INTEREST_COLUMNS} FROM event_interests WHERE event_id IN ({placeholders})
+    ''', ids)
+    # Delete events first so the interest triggers have no counters left to update
+    conn.execute(f'DELETE FROM events WHERE event_id IN ({placeholders})', ids)
+    conn.execute(f'DELETE FROM event_interests WHERE event_id IN ({placeholders})', ids)
+    return len(ids)
+
+def past_events(conn, guild_id, user_id, limit):
+    """A member's most recent archived events they organized or were interested in
+
+    Rows are (event_id, description, location, event_time, interested_count, organized).
+    """
+    return conn.execute('''
+        SELECT e.event_id, e.description, e.location, e.event_time,
+               e.interested_count, e.creator_id = ? AS organized
+        FROM events_archive e
+        WHERE (e.guild_id = ? AND e.creator_id = ?)
+           OR e.event_id IN (SELECT event_id FROM event_interests_archive
+                             WHERE guild_id = ? AND user_id = ?)
+        ORDER BY e.event_time DESC
+        LIMIT ?
+    ''', (user_id, guild_id, user_id, guild_id, user_id, limit)).fetchall()
+
+def enable_incremental_vacuum(conn):
+    """Switch the file to incremental auto-vacuum; the one-off VACUUM rewrites it
+
+    VACUUM locks and rewrites the whole file, so this runs at startup before
+    anything else writes (web1.setup_database), not from the Archiver.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+
+def analyze(conn):
+    conn.execute('ANALYZE')
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES):
+    conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+
+class Archiver:
+    """Background task that keeps the live events tables down to current events
+
+    Every ARCHIVE_INTERVAL it moves ended events in ARCHIVE_BATCH-sized
+    transactions through the database's single writer, then returns freed
+    pages with an incremental vacuum (enabled at startup by
+    enable_incremental_vacuum). ANALYZE runs every ANALYZE_INTERVAL.
+    """
+
+    def __init__(self, db, interval=ARCHIVE_INTERVAL, batch_size=ARCHIVE_BATCH):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+        self._last_analyze = 0.0
+        self.archived = 0
+        self.sweeps = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f'Archive sweep failed: {e}')
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self):
+        """Archive everything that has ended; returns the number of events moved"""
+        now = now_epoch()
+        moved = 0
+        while True:
+            count = await self.db.write(archive_batch, now, self.batch_size)
+            moved += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(BATCH_PAUSE)
+
+        if time.monotonic() - self._last_analyze >= ANALYZE_INTERVAL:
+            await self.db.run(analyze)
+            self._last_analyze = time.monotonic()
+        await self.db.run(incremental_vacuum)
+
+        self.archived += moved
+        self.sweeps += 1
+        if moved:
+            print(f'Archived {moved} past events')
+        return moved
+
+    def stats(self):
+        return {'archived': self.archived, 'sweeps': self.sweeps}
@@ -0,0 +1,109 @@
+"""Archival: hot-table query cost before/after moving ended events out, and batch sizes
+
+Seeds a database where most events are already over, times the !myevents
+join, runs a full archive sweep in bounded batches (reporting the longest
+write transaction) and times the same query again.
+
+Run from the bot directory:  python -m bench.archive [--events N] [--past FRACTION] [--batch B]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import archive
+from archive import Archiver
+from database import Database
+from eventtime import now_epoch
+from migrations import migrate
+
+GUILD_ID = '1'
+USERS = 2000
+INTERESTS_PER_EVENT = 4
+
+MY_EVENTS_QUERY = '''
+    SELECT e.event_id, e.description, e.event_time
+    FROM events e
+    JOIN event_interests i ON e.event_id = i.event_id
+    WHERE i.guild_id = ? AND i.user_id = ? AND e.event_time >= ?
+    ORDER BY e.event_time ASC
+'''
+
+def seed(path, events, past, rng):
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO events
+        (event_id, guild_id, creator_id, creator_name, description, event_type, event_size,
+         location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (i, GUILD_ID, str(rng.randrange(USERS)), 'creator', f'Event {i}', 'social', 'small', 'Library',
+         now - rng.randint(3 * 3600, 365 * 86400) if rng.random() < past else now + rng.randint(3600, 30 * 86400),
+         '1 hour', 60, now)
+        for i in range(1, events + 1)
+    ])
+    conn.executemany('''
+        INSERT OR IGNORE INTO event_interests (event_id, guild_id, user_id, username, interested_in_connection)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(i, GUILD_ID, str(rng.randrange(USERS)), 'user', False)
+          for i in range(1, events + 1) for _ in range(INTERESTS_PER_EVENT)])
+    conn.commit()
+    conn.close()
+
+def time_query(path, users):
+    conn = sqlite3.connect(path)
+    now = now_epoch()
+    start = time.perf_counter()
+    for user in users:
+        conn.execute(MY_EVENTS_QUERY, (GUILD_ID, user, now)).fetchall()
+    elapsed = (time.perf_counter() - start) / len(users)
+    conn.close()
+    return elapsed
+
+async def main(events, past, batch):
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), 'archive.db')
+    seed(path, events, past, rng)
+    users = [str(rng.randrange(USERS)) for _ in range(200)]
+    size_before = os.path.getsize(path)
+    before = time_query(path, users)
+
+    db = Database(path)
+    await db.run(archive.enable_incremental_vacuum)
+    batch_times = []
+    original = archive.archive_batch
+
+    def timed_batch(conn, now, limit):
+        start = time.perf_counter()
+        try:
+            return original(conn, now, limit)
+        finally:
+            batch_times.append(time.perf_counter() - start)
+
+    archive.archive_batch = timed_batch
+    start = time.perf_counter()
+    moved = await Archiver(db, batch_size=batch).sweep()
+    sweep = time.perf_counter() - start
+    archive.archive_batch = original
+    db.close()
+
+    after = time_query(path, users)
+    print(f"{events} events, {past:.0%} already over, batches of {batch}")
+    print(f"archived {moved} events in {len(batch_times)} batches, {sweep:.2f} s total, "
+          f"longest write transaction {max(batch_times) * 1000:.1f} ms")
+    print(f"!myevents query before      {before * 1000:9.3f} ms")
+    print(f"!myevents query after       {after * 1000:9.3f} ms")
+    print(f"database file               {size_before / 2**20:9.1f} MiB -> {os.path.getsize(path) / 2**20:.1f} MiB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--past', type=float, default=0.9)
+    parser.add_argument('--batch', type=int, default=archive.ARCHIVE_BATCH)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.past, args.batch))
@@ -0,0 +1,67 @@
+"""Event card rendering: building every embed vs the versioned card cache
+
+Replays a skewed stream of card views (a few hot events get most of them)
+with occasional interest clicks that bump an event's version, and times
+rendering every card from scratch against serving it from CardCache.
+
+Run from the bot directory:  python -m bench.cards [--events N] [--views V] [--click-rate R]
+"""
+import argparse
+import itertools
+import random
+import time
+
+from bench.fakes import DEFAULT_GUILD_ID
+from cards import CardCache, event_card
+from eventtime import now_epoch
+from preferences import EVENT_TYPES, EVENT_SIZES
+
+def make_events(count, rng):
+    now = now_epoch()
+    return [{
+        'event_id': event_id,
+        'guild_id': str(DEFAULT_GUILD_ID),
+        'creator_name': f'user{rng.randrange(500)}',
+        'description': f'Study group {event_id} for the midterm, bring notes and snacks',
+        'event_type': rng.choice(EVENT_TYPES),
+        'event_size': rng.choice(EVENT_SIZES),
+        'location': 'Library',
+        'event_time': now + rng.randrange(1, 30 * 86400),
+        'duration': '2 hours',
+        'interested_count': rng.randrange(50),
+        'connect_count': 0,
+        'version': 0,
+    } for event_id in range(1, count + 1)]
+
+def run(label, events, stream, render):
+    start = time.perf_counter()
+    for event_index, clicked in stream:
+        event = events[event_index]
+        if clicked:
+            event['interested_count'] += 1
+            event['version'] += 1
+        render(event).to_dict()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<16} {elapsed / len(stream) * 1e6:8.1f} us/view')
+
+def main(events, views, click_rate, seed):
+    rng = random.Random(seed)
+    # Zipf-like popularity: event i is viewed about 1/(i+1) as often as the hottest
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(events)))
+    stream = [(index, rng.random() < click_rate)
+              for index in rng.choices(range(events), cum_weights=cum_weights, k=views)]
+
+    run('render always', make_events(events, random.Random(seed)), stream, event_card)
+    cache = CardCache()
+    run('card cache', make_events(events, random.Random(seed)), stream, cache.event_card)
+    stats = cache.stats()
+    print(f"cache: {stats['size']} cards, hit rate {stats['hit_rate']:.1%}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--views', type=int, default=100000)
+    parser.add_argument('--click-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args.events, args.views, args.click_rate, args.seed)
@@ -0,0 +1,126 @@
+"""Offline latency/throughput benchmark for the bot's commands and buttons
+
+Seeds a synthetic database, then drives the real command callbacks through
+stand-in ctx/interaction objects. Results are written as JSON so runs can be
+compared for regressions.
+
+Run from the bot directory:
+    python -m bench.commands [--events N] [--users M] [--interests K]
+                             [--iterations I] [--concurrency C] [--output results.json]
+                             [--backend sqlite|memory]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import web1
+from event_cache import UpcomingEventCache
+from repository import MemoryRepository
+from bench.fakes import FakeCtx, FakeInteraction, FakeUser
+from bench.seed import seed_database
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def build_scenarios(events, users, rng):
+    def user():
+        u = rng.randrange(users)
+        return FakeUser(u, f'user{u}')
+
+    def event_id():
+        return rng.randint(1, events)
+
+    return {
+        'list_events': lambda: web1.list_events.callback(FakeCtx(user())),
+        'event_detail': lambda: web1.event_detail.callback(FakeCtx(user()), event_id()),
+        'view_my_interests': lambda: web1.view_my_interests.callback(FakeCtx(user())),
+        'view_interested_users': lambda: web1.view_interested_users.callback(FakeCtx(user()), event_id()),
+        'register_interest': lambda: web1.register_interest(FakeInteraction(user()), event_id()),
+        'toggle_connection_interest': lambda: web1.toggle_connection_interest(FakeInteraction(user()), event_id()),
+    }
+
+async def run_scenario(make_call, iterations, concurrency):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await make_call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'calls': iterations,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'throughput_per_s': iterations / elapsed,
+    }
+
+async def main(args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'discord_bot.db')
+        seed_database(path, args.events, args.users, args.interests, args.seed)
+
+        # Point the bot's shared state at the synthetic database
+        web1.db.path = path
+        if args.backend == 'memory':
+            conn = sqlite3.connect(path)
+            web1.repo = MemoryRepository.from_sqlite(conn)
+            conn.close()
+        web1.event_cache = UpcomingEventCache()
+        await web1.event_cache.ensure_loaded(web1.repo)
+        # Nothing here reaches Discord, so replies aren't held to its global rate limit
+        web1.outbound._global.limit = web1.outbound._global.remaining = float('inf')
+
+        scenarios = build_scenarios(args.events, args.users, rng)
+        selected = args.only or list(scenarios)
+        results = {}
+        for name in selected:
+            results[name] = await run_scenario(scenarios[name], args.iterations, args.concurrency)
+        web1.db.close()
+
+    report = {
+        'config': {
+            'events': args.events,
+            'users': args.users,
+            'interests': args.interests,
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'backend': args.backend,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--interests', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=('sqlite', 'memory'), default='sqlite',
+                        help='Repository the commands read and write through')
+    parser.add_argument('--only', nargs='*', help='Scenarios to run (default: all)')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,84 @@
+"""Latency comparison: connect-per-call vs the pooled Database layer
+
+Run from the bot directory:  python -m bench.db_pool [--calls N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import Database
+
+def seed(path, events=500, interests=5000):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE events (event_id INTEGER PRIMARY KEY, description TEXT)')
+    conn.execute('CREATE TABLE event_interests (event_id INTEGER, user_id TEXT, UNIQUE(event_id, user_id))')
+    conn.executemany('INSERT INTO events VALUES (?, ?)', [(i, f'event {i}') for i in range(events)])
+    conn.executemany('INSERT INTO event_interests VALUES (?, ?)',
+                     [(i % events, str(i)) for i in range(interests)])
+    conn.commit()
+    conn.close()
+
+QUERY = 'SELECT * FROM event_interests WHERE event_id = ? AND user_id = ?'
+
+async def connect_per_call(path, i):
+    # Today's pattern: a fresh connection opened on the event loop
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute(QUERY, (i % 500, str(i)))
+    c.fetchone()
+    conn.close()
+
+async def pooled(db, i):
+    await db.fetchone(QUERY, (i % 500, str(i)))
+
+async def loop_lag_monitor(stop, samples, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+async def measure(label, call, calls, concurrency):
+    latencies = []
+    lag = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(loop_lag_monitor(stop, lag))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    max_lag = max(lag) * 1000 if lag else 0.0
+    print(f"{label:<18} p50={p50:7.3f}ms  p99={p99:7.3f}ms  "
+          f"throughput={calls / elapsed:8.0f}/s  max loop lag={max_lag:7.3f}ms")
+
+async def main(calls, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed(path)
+        await measure('connect-per-call', lambda i: connect_per_call(path, i), calls, concurrency)
+        db = Database(path)
+        await measure('pooled executor', lambda i: pooled(db, i), calls, concurrency)
+        db.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
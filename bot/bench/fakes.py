@@ -0,0 +1,110 @@
+"""Stand-in Discord objects for driving bot commands offline
+
+Every API call made through these objects is appended to a shared calls list
+so benchmarks can count round trips as well as time them.
+"""
+
+import itertools
+
+# Guild every fake context and interaction runs in unless told otherwise
+DEFAULT_GUILD_ID = 1
+
+_ids = itertools.count(1)
+
+class FakeGuild:
+    def __init__(self, guild_id=DEFAULT_GUILD_ID):
+        self.id = guild_id
+
+class FakeChannel:
+    def __init__(self, channel_id=None):
+        self.id = channel_id or next(_ids)
+
+class FakeUser:
+    def __init__(self, user_id, name=None, calls=None):
+        self.id = user_id
+        self.name = name or f'user{user_id}'
+        self.mention = f'<@{user_id}>'
+        self.dm_channel = None
+        self.calls = calls if calls is not None else []
+
+    def __eq__(self, other):
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def send(self, *args, **kwargs):
+        self.calls.append('dm')
+
+class FakeMessage:
+    def __init__(self, calls, content=None, embed=None, view=None, channel=None):
+        self.id = next(_ids)
+        self.channel = channel or FakeChannel()
+        self.calls = calls
+        self.content = content
+        self.embed = embed
+        self.view = view
+
+    async def add_reaction(self, emoji):
+        self.calls.append('add_reaction')
+
+    async def delete(self):
+        self.calls.append('delete')
+
+    async def edit(self, **kwargs):
+        self.calls.append('edit')
+        self.embed = kwargs.get('embed', self.embed)
+        self.view = kwargs.get('view', self.view)
+
+class FakeCtx:
+    """Command context; sent messages are kept on .sent
+
+    Each context gets a channel of its own, so benchmarks time the handlers
+    rather than a single channel's rate limit in the outbound queue.
+    """
+
+    def __init__(self, author, calls=None, guild=None):
+        self.author = author
+        self.guild = guild or FakeGuild()
+        self.channel = FakeChannel()
+        self.calls = calls if calls is not None else []
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None, view=None, **kwargs):
+        self.calls.append('send')
+        message = FakeMessage(self.calls, content, embed, view, self.channel)
+        self.sent.append(message)
+        return message
+
+class FakeResponse:
+    def __init__(self, calls):
+        self.calls = calls
+        self.messages = []
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self.calls.append('send_message')
+        self.messages.append(content)
+        self._done = True
+
+    async def edit_message(self, **kwargs):
+        self.calls.append('edit_message')
+        self._done = True
+
+    async def send_modal(self, modal):
+        self.calls.append('send_modal')
+        self._done = True
+
+    async def defer(self, **kwargs):
+        self.calls.append('defer')
+        self._done = True
+
+class FakeInteraction:
+    def __init__(self, user, calls=None, guild_id=DEFAULT_GUILD_ID):
+        self.user = user
+        self.guild_id = guild_id
+        self.calls = calls if calls is not None else []
+        self.response = FakeResponse(self.calls)
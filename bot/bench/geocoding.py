@@ -0,0 +1,100 @@
+"""Place lookups: gazetteer + persistent cache vs always asking the network geocoder
+
+Replays a skewed stream of place names (a few popular buildings, a long tail
+of one-off addresses) against a local stand-in geocoder with a fixed
+latency, and reports the cache hit rate and per-lookup latency.
+
+Run from the bot directory:  python -m bench.geocoding [--lookups N] [--places P] [--latency S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database import Database
+from geocoding import Geocoder, normalize
+from migrations import migrate
+
+GAZETTEER = {normalize(name): (44.97 + i * 0.001, -93.23) for i, name in
+             enumerate(['Student Union', 'Main Library', 'Rec Center', 'Engineering Hall'])}
+
+def stand_in(latency):
+    calls = []
+
+    def geocode(query):
+        calls.append(query)
+        time.sleep(latency)
+        if query.startswith('nowhere'):
+            return None
+        return (40.0 + hash(query) % 1000 / 10000, -86.0)
+    return geocode, calls
+
+def workload(lookups, places, seed=0):
+    rng = random.Random(seed)
+    names = list(GAZETTEER) + [f'{i} Main Street' for i in range(places)] + ['nowhere 1', 'nowhere 2']
+    # Zipf-ish: popular places are looked up far more often than the tail
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    return rng.choices(names, weights, k=lookups)
+
+async def replay(label, geocoder, queries):
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        await geocoder.resolve(query)
+        latencies.append(time.perf_counter() - t)
+    total = time.perf_counter() - start
+    latencies.sort()
+    stats = geocoder.stats()
+    print(f"{label:<28} hit rate {stats['hit_rate']:6.1%}  network {stats['network_lookups']:5d}  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  total {total:6.2f} s")
+
+async def main(lookups, places, latency):
+    queries = workload(lookups, places)
+    path = os.path.join(tempfile.mkdtemp(), 'geocode.db')
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+    db = Database(path)
+
+    backend, _ = stand_in(latency)
+    await replay('network only', Geocoder(db, gazetteer={}, backend=backend, cache_size=0,
+                                          network_interval=0), queries)
+
+    backend, calls = stand_in(latency)
+    geocoder = Geocoder(db, gazetteer=GAZETTEER, backend=backend, network_interval=0)
+    await replay('gazetteer + cache (cold)', geocoder, queries)
+    assert len(calls) == len(set(calls)), 'a cached place was geocoded twice'
+
+    # A restarted bot keeps the persistent cache
+    backend, calls = stand_in(latency)
+    await replay('gazetteer + cache (restart)', Geocoder(db, gazetteer=GAZETTEER, backend=backend,
+                                                         network_interval=0), queries)
+    assert not calls, 'the persistent cache missed after a restart'
+
+    # An outage is not remembered as "not found"
+    def outage(query):
+        raise TimeoutError(query)
+    geocoder = Geocoder(db, gazetteer={}, backend=outage, network_interval=0)
+    assert await geocoder.resolve('999 Outage Street') is None
+    backend, calls = stand_in(0)
+    geocoder.backend = backend
+    assert await geocoder.resolve('999 Outage Street') is not None, 'a failed lookup was cached'
+
+    # The shipped gazetteer resolves campus buildings without the network or cache
+    geocoder = Geocoder(db, backend=outage)
+    assert all([await geocoder.resolve(name) for name in ('Coffman', 'Walter Library', 'RecWell', 'northrop')])
+    assert geocoder.stats()['gazetteer_hits'] == 4
+    db.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--places', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.places, args.latency))
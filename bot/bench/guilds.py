@@ -0,0 +1,118 @@
+"""Per-guild query cost as the number of other guilds grows
+
+Seeds the same amount of data per guild for an increasing number of guilds
+and times each guild-scoped read path for one guild. With guild_id leading
+every index (and partitioning the cache and search index), the cost per call
+should stay flat as guilds are added.
+
+Run from the bot directory:  python -m bench.guilds [--guilds 1 10 100 1000] [--events-per-guild N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import web1
+from bench.seed import seed_database
+from database import Database
+from event_cache import UpcomingEventCache
+from eventtime import now_epoch
+from preference_index import GuildPreferenceIndex
+from repository import SqliteRepository
+from search import search_upcoming
+
+USERS_PER_GUILD = 50
+INTERESTS_PER_GUILD = 500
+CALLS = 300
+# Most a call may slow down from the fewest to the most guilds before the check fails;
+# timings under FLAT_FLOOR_US are too small to compare and count as that floor
+FLAT_TOLERANCE = 3.0
+FLAT_FLOOR_US = 20.0
+
+def timed(fn, calls=CALLS):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+async def measure(guilds, events_per_guild, rng):
+    path = os.path.join(tempfile.mkdtemp(), 'guilds.db')
+    seed_database(path, events=guilds * events_per_guild, users=guilds * USERS_PER_GUILD,
+                  interests=guilds * INTERESTS_PER_GUILD, guilds=guilds)
+
+    db = Database(path)
+    repo = SqliteRepository(db)
+    cache = UpcomingEventCache()
+    await cache.ensure_loaded(repo)
+    preferences = GuildPreferenceIndex()
+    preferences.load(await repo.all_preferences())
+    db.close()
+    web1.event_cache = cache
+
+    conn = sqlite3.connect(path)
+    now = now_epoch()
+    # Guild 1's users are those with user_id % guilds == 0
+    users = [str(rng.randrange(USERS_PER_GUILD) * guilds) for _ in range(CALLS)]
+    event_ids = [int(row[0]) for row in conn.execute("SELECT event_id FROM events WHERE guild_id = '1'")]
+
+    def events_page(i):
+        levels = web1.preference_levels(cache.bucket_keys('1'), 1, 1)
+        web1.fetch_events_page('1', levels, None, None, None)
+
+    def my_events(i):
+        conn.execute('''
+            SELECT e.event_id, e.description, e.event_time
+            FROM events e
+            JOIN event_interests i ON e.event_id = i.event_id
+            WHERE i.guild_id = ? AND i.user_id = ? AND e.event_time >= ?
+            ORDER BY e.event_time ASC
+        ''', ('1', users[i], now)).fetchall()
+
+    def detail(i):
+        conn.execute('''
+            SELECT description FROM events WHERE event_id = ? AND guild_id = ?
+        ''', (event_ids[i % len(event_ids)], '1')).fetchone()
+
+    def preferences_lookup(i):
+        conn.execute('''
+            SELECT preferred_types, preferred_sizes FROM user_preferences
+            WHERE guild_id = ? AND user_id = ?
+        ''', ('1', users[i])).fetchone()
+
+    results = {
+        '!events page (cache)': timed(events_page),
+        '!myevents query': timed(my_events),
+        '!detail query': timed(detail),
+        'preferences lookup': timed(preferences_lookup),
+        '!search "building N"': timed(lambda i: search_upcoming(conn, '1', f'building {i % 50}', now), CALLS // 10),
+        '!search "synthetic"': timed(lambda i: search_upcoming(conn, '1', 'synthetic', now), CALLS // 10),
+        'notification match': timed(lambda i: preferences.match('1', 'social', 'small (1-5)')),
+    }
+    conn.close()
+    return results
+
+async def main(guild_counts, events_per_guild):
+    rng = random.Random(0)
+    table = {}
+    for guilds in guild_counts:
+        table[guilds] = await measure(guilds, events_per_guild, rng)
+
+    print(f"{events_per_guild} events, {USERS_PER_GUILD} users per guild; microseconds per call for one guild")
+    print(f"{'':<24}" + ''.join(f"{g:>10} g" for g in guild_counts))
+    for name in table[guild_counts[0]]:
+        print(f"{name:<24}" + ''.join(f"{table[g][name]:>12.1f}" for g in guild_counts))
+
+    fewest, most = table[min(guild_counts)], table[max(guild_counts)]
+    grew = [name for name in fewest
+            if most[name] > FLAT_TOLERANCE * max(fewest[name], FLAT_FLOOR_US)]
+    assert not grew, f'per-guild cost grew with the number of guilds: {", ".join(grew)}'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--guilds', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--events-per-guild', type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.guilds, args.events_per_guild))
@@ -0,0 +1,94 @@
+"""Startup time and RSS: threaded Flask keep-alive vs the aiohttp HealthServer
+
+Each variant runs in a fresh interpreter that has already imported discord
+(as the bot always has), starts the server, polls it until it answers, then
+reports the elapsed time and resident memory. This is the marginal cost the
+health server adds to the bot process.
+
+Run from the bot directory:  python -m bench.health_server [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMON = '''
+import time, urllib.request
+import discord
+start = time.perf_counter()
+
+def wait_until_up(port):
+    while True:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.005)
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+'''
+
+# The keep-alive server this repository used before HealthServer
+FLASK = COMMON + '''
+from flask import Flask
+from threading import Thread
+app = Flask('')
+
+@app.route('/')
+def home():
+    return "Hello. I am alive!"
+
+Thread(target=lambda: app.run(host='127.0.0.1', port={port}), daemon=True).start()
+wait_until_up({port})
+print(time.perf_counter() - start, rss_kb())
+'''
+
+AIOHTTP = COMMON + '''
+import asyncio, sys, threading
+sys.path.insert(0, {root!r})
+from keep_alive import HealthServer
+
+class IdleBot:
+    latency = 0.0
+    def is_ready(self): return True
+    def is_closed(self): return False
+
+async def main():
+    server = HealthServer(IdleBot(), host='127.0.0.1', port={port})
+    await server.start()
+    # Poll from a thread, as an external prober would, while the loop serves
+    await asyncio.to_thread(wait_until_up, {port})
+    print(time.perf_counter() - start, rss_kb())
+    await server.stop()
+
+asyncio.run(main())
+'''
+
+def measure(label, template, runs, port):
+    times, rss = [], []
+    for i in range(runs):
+        code = template.format(port=port + i, root=ROOT)
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            print(f"{label}: failed\n{result.stderr.strip().splitlines()[-1]}")
+            return
+        seconds, kb = result.stdout.splitlines()[-1].split()
+        times.append(float(seconds))
+        rss.append(int(kb))
+    print(f"{label:<16} startup p50={statistics.median(times) * 1000:7.1f}ms  "
+          f"RSS p50={statistics.median(rss) / 1024:6.1f}MiB  ({runs} runs)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=18080)
+    args = parser.parse_args()
+    measure('Flask thread', FLASK, args.runs, args.port)
+    measure('aiohttp on loop', AIOHTTP, args.runs, args.port + args.runs)
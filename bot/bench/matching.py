@@ -0,0 +1,164 @@
+"""Connect-with-Others matching: one pass over all due events, as participants grow
+
+Seeds events starting within the matching window, wants-to-connect members
+spread over them, and an archive of past events so that many members have
+already met. Runs Matcher.sweep() once per size and reports time per stage
+and the share of grouped pairs who had met before, against grouping at random.
+
+Run from the bot directory:  python -m bench.matching [--participants 1000 10000 50000]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import matching
+from database import Database
+from eventtime import now_epoch
+from matching import Matcher, pairing_history
+from migrations import migrate
+from preferences import EVENT_SIZES
+
+GUILD_ID = '1'
+PARTICIPANTS_PER_EVENT = 25
+PAST_EVENTS_PER_MEMBER = 8
+COMMUNITY = 200        # Members mostly attend past events with their own community
+
+def seed(path, participants, rng):
+    now = now_epoch()
+    events = max(1, participants // PARTICIPANTS_PER_EVENT)
+    members = max(participants // 2, 2)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO events (event_id, guild_id, creator_id, creator_name, description, event_type,
+                            event_size, location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, '0', 'host', 'Meetup', 'social', ?, 'Library', ?, '1 hour', 60, ?)
+    ''', [(e, GUILD_ID, rng.choice(EVENT_SIZES), now + rng.randrange(600, matching.MATCH_LEAD), now)
+          for e in range(1, events + 1)])
+    conn.executemany('''
+        INSERT OR IGNORE INTO event_interests (event_id, user_id, username, interested_in_connection, guild_id)
+        VALUES (?, ?, ?, TRUE, ?)
+    ''', [(rng.randint(1, events), str(u), f'user{u}', GUILD_ID)
+          for u in (rng.randrange(members) for _ in range(participants))])
+
+    # Past events drawn from within a community, so the same people keep meeting
+    past = []
+    for u in range(members):
+        community = u // COMMUNITY
+        for _ in range(PAST_EVENTS_PER_MEMBER):
+            past.append((1_000_000 + community * 50 + rng.randrange(50), str(u), f'user{u}', GUILD_ID))
+    conn.executemany('''
+        INSERT INTO event_interests_archive (event_id, user_id, username, interested_in_connection, guild_id)
+        VALUES (?, ?, ?, FALSE, ?)
+    ''', past)
+    conn.commit()
+    count = conn.execute('SELECT COUNT(*) FROM event_interests').fetchone()[0]
+    conn.close()
+    return events, count
+
+def repeat_share(groups, history):
+    pairs = repeats = 0
+    for group in groups:
+        for a, b in itertools.combinations(group, 2):
+            pairs += 1
+            repeats += bool(history.get((GUILD_ID, a), set()) & history.get((GUILD_ID, b), set()))
+    return repeats / pairs if pairs else 0.0
+
+async def measure(participants, budget, rng):
+    path = os.path.join(tempfile.mkdtemp(), 'matching.db')
+    events, joined = seed(path, participants, rng)
+    db = Database(path)
+
+    formed = {}
+    async def announce(guild_id, event_id, groups):
+        formed[event_id] = [[user_id for user_id, _ in members] for _, members in groups]
+
+    original_plan = matching.plan_matches
+    plan_time = 0.0
+    def timed_plan(*args, **kwargs):
+        nonlocal plan_time
+        start = time.perf_counter()
+        try:
+            return original_plan(*args, **kwargs)
+        finally:
+            plan_time = time.perf_counter() - start
+    matching.plan_matches = timed_plan
+
+    matcher = Matcher(db, announce, budget=budget)
+    start = time.perf_counter()
+    await matcher.sweep()
+    total = time.perf_counter() - start
+    matching.plan_matches = original_plan
+
+    conn = sqlite3.connect(path)
+    # Judge both groupings by what members shared before this pass
+    conn.execute('DELETE FROM connect_group_members')
+    members = {(GUILD_ID, u) for groups in formed.values() for group in groups for u in group}
+    history = pairing_history(conn, members)
+    # Random grouping of each event's members, with the same group sizes
+    grouped, baseline = [], []
+    for groups in formed.values():
+        shuffled = [u for group in groups for u in group]
+        rng.shuffle(shuffled)
+        i = 0
+        for group in groups:
+            grouped.append(group)
+            baseline.append(shuffled[i:i + len(group)])
+            i += len(group)
+    conn.close()
+    db.close()
+
+    stats = matcher.stats()
+    print(f"{joined:>7} participants {events:>5} events  pass {total * 1000:7.0f} ms "
+          f"(planning {plan_time * 1000:6.0f} ms)  groups {stats['groups']:>6}  "
+          f"deferred events {stats['deferred_events']:>4}  "
+          f"repeat pairs {repeat_share(grouped, history):.1%} (random {repeat_share(baseline, history):.1%})")
+
+async def check_late_joiners():
+    """An event already inside the matching window is grouped once members press Connect"""
+    path = os.path.join(tempfile.mkdtemp(), 'late.db')
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.execute('''
+        INSERT INTO events (event_id, guild_id, creator_id, description, event_size, event_time, created_at)
+        VALUES (1, ?, '0', 'Meetup', 'small (1-5)', ?, ?)
+    ''', (GUILD_ID, now + 3600, now))
+    conn.commit()
+    db = Database(path)
+    formed = []
+    async def announce(guild_id, event_id, groups):
+        formed.extend(groups)
+    matcher = Matcher(db, announce)
+    await matcher.sweep(now)
+    for user_id in ('1', '2'):
+        conn.execute('''
+            INSERT INTO event_interests (event_id, user_id, username, interested_in_connection, guild_id)
+            VALUES (1, ?, ?, TRUE, ?)
+        ''', (user_id, f'user{user_id}', GUILD_ID))
+    conn.commit()
+    conn.close()
+    await matcher.sweep(now + 60)
+    db.close()
+    assert len(formed) == 1 and len(formed[0][1]) == 2, 'late Connect presses were never grouped'
+    print('late joiners grouped after the event entered the window')
+
+async def main(sizes, budget, seed_value):
+    await check_late_joiners()
+    rng = random.Random(seed_value)
+    for participants in sizes:
+        await measure(participants, budget, rng)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--participants', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--budget', type=float, default=matching.MATCH_BUDGET,
+                        help='Planning budget per pass, in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.participants, args.budget, args.seed))
@@ -0,0 +1,61 @@
+"""!events near: grid index + vectorized haversine vs per-row geopy distance
+
+Run from the bot directory:  python -m bench.near [--events N] [--queries Q] [--radius MILES]
+"""
+import argparse
+import random
+import time
+
+import geopy.distance
+
+from geo import GridIndex
+
+# Events scattered over a ~30 x 30 mile metro area around a campus
+CENTER = (44.9740, -93.2277)
+SPREAD_DEGREES = 0.22
+
+def main(events, queries, radius):
+    rng = random.Random(0)
+    points = {
+        i: (CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+            CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES))
+        for i in range(events)
+    }
+    probes = [(CENTER[0] + rng.uniform(-0.1, 0.1), CENTER[1] + rng.uniform(-0.1, 0.1))
+              for _ in range(queries)]
+
+    start = time.perf_counter()
+    index = GridIndex()
+    for key, (lat, lon) in points.items():
+        index.add(key, lat, lon)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.within(lat, lon, radius) for lat, lon in probes]
+    grid_per_query = (time.perf_counter() - start) / queries
+
+    # Per-row geopy over every event, as a naive implementation would do
+    scan_queries = max(1, queries // 20)
+    start = time.perf_counter()
+    scanned = []
+    for lat, lon in probes[:scan_queries]:
+        hits = [(geopy.distance.great_circle((lat, lon), p).miles, key) for key, p in points.items()]
+        scanned.append(sorted(h for h in hits if h[0] <= radius))
+    scan_per_query = (time.perf_counter() - start) / scan_queries
+
+    for got, expected in zip(indexed, scanned):
+        assert [k for _, k in got] == [k for _, k in expected], 'grid results differ from full scan'
+
+    found = sum(len(r) for r in indexed) / queries
+    print(f"{events} events, radius {radius} miles, ~{found:.0f} results per query")
+    print(f"grid index build            {build * 1000:9.1f} ms")
+    print(f"grid + numpy haversine      {grid_per_query * 1000:9.3f} ms per query")
+    print(f"per-row geopy full scan     {scan_per_query * 1000:9.3f} ms per query")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius', type=float, default=2.0)
+    args = parser.parse_args()
+    main(args.events, args.queries, args.radius)
@@ -0,0 +1,199 @@
+"""Outbound dispatch: 429s, reply latency and API calls under bursts, direct vs queued
+
+A fake Discord enforces per-route windows (5 requests per 1 s, Discord's
+5 per 5 s scaled down) and the global 50 requests per second, answers with
+the usual X-RateLimit headers and retries 429s after Retry-After the way
+discord.py does. Three bursts are driven through it with every call made
+directly and again through an Outbound queue:
+
+  replies   command replies piling into a few busy channels
+  mixed     a notification fan-out while members click buttons and run commands
+  edits     a message edited repeatedly, e.g. a live counter
+
+Run from the bot directory:  python -m bench.outbound [--replies 100] [--dms 300] [--edits 50]
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from outbound import Outbound, NOTIFICATION, route
+
+LATENCY = 0.03          # Seconds per simulated request
+ROUTE_LIMIT = 5         # Requests per route window
+ROUTE_WINDOW = 1.0
+GLOBAL_RATE = 50
+CHANNELS = 4
+
+class FakeDiscord:
+    """Rate-limited REST API stand-in; observe(method, path, status, headers) plays the http_trace"""
+
+    def __init__(self, observe=None):
+        self.observe = observe
+        self.windows = {}  # route -> [reset_at, used]
+        self.requests = 0
+        self.rate_limited = 0
+
+    def _admit(self, key, limit, window, now):
+        reset_at, used = self.windows.get(key, (0.0, 0))
+        if now >= reset_at:
+            reset_at, used = now + window, 0
+        if used >= limit:
+            return False, limit, 0, reset_at - now
+        self.windows[key] = (reset_at, used + 1)
+        return True, limit, limit - used - 1, reset_at - now
+
+    async def request(self, method, path, exempt=False):
+        """Make one request, retrying 429s like discord.py; returns once it succeeds"""
+        while True:
+            await asyncio.sleep(LATENCY)
+            now = time.monotonic()
+            self.requests += 1
+            if exempt:
+                return
+            ok, _, _, retry_after = self._admit('global', GLOBAL_RATE, 1.0, now)
+            headers = {'Retry-After': f'{retry_after:.3f}', 'X-RateLimit-Global': 'true'}
+            if ok:
+                ok, limit, remaining, retry_after = self._admit(route(method, path), ROUTE_LIMIT, ROUTE_WINDOW, now)
+                headers = {'Retry-After': f'{retry_after:.3f}', 'X-RateLimit-Limit': str(limit),
+                           'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset-After': f'{retry_after:.3f}'}
+            if self.observe is not None:
+                self.observe(method, path, 200 if ok else 429, headers)
+            if ok:
+                return
+            self.rate_limited += 1
+            await asyncio.sleep(float(headers['Retry-After']))
+
+class Channel:
+    def __init__(self, api, channel_id):
+        self.api = api
+        self.id = channel_id
+
+    async def send(self, content=None, **kwargs):
+        await self.api.request('POST', f'/channels/{self.id}/messages')
+        return Message(self.api, next(_ids), self)
+
+class User:
+    def __init__(self, api, user_id):
+        self.id = user_id
+        self.dm_channel = Channel(api, 10_000_000 + user_id)
+
+    async def send(self, content=None, **kwargs):
+        return await self.dm_channel.send(content, **kwargs)
+
+class Message:
+    def __init__(self, api, message_id, channel):
+        self.api = api
+        self.id = message_id
+        self.channel = channel
+
+    async def edit(self, **fields):
+        await self.api.request('PATCH', f'/channels/{self.channel.id}/messages/{self.id}')
+
+class Response:
+    def __init__(self, api, interaction_id):
+        self.api = api
+        self.interaction_id = interaction_id
+
+    async def send_message(self, content=None, **kwargs):
+        await self.api.request('POST', f'/interactions/{self.interaction_id}/token/callback', exempt=True)
+
+class Interaction:
+    def __init__(self, api, interaction_id):
+        self.response = Response(api, interaction_id)
+
+_ids = itertools.count(1)
+
+async def timed(latencies, call):
+    start = time.perf_counter()
+    await call
+    latencies.append(time.perf_counter() - start)
+
+def stop(outbound):
+    if outbound._worker is not None:
+        outbound._worker.cancel()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+def report(scenario, mode, api, elapsed, **latencies):
+    parts = [f'{name} p50 {percentile(v, 0.5) * 1000:5.0f} ms p99 {percentile(v, 0.99) * 1000:5.0f} ms'
+             for name, v in latencies.items()]
+    print(f"{scenario:<8} {mode:<7} {elapsed:6.2f} s  requests {api.requests:>4}  429s {api.rate_limited:>4}  "
+          + '  '.join(parts))
+
+async def replies(count, queued):
+    """count command replies spread over CHANNELS channels, all at once"""
+    outbound = Outbound()
+    api = FakeDiscord(outbound.observe if queued else None)
+    channels = [Channel(api, channel_id) for channel_id in range(1, CHANNELS + 1)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        timed(latencies, outbound.send(channels[i % CHANNELS], 'reply') if queued
+              else channels[i % CHANNELS].send('reply'))
+        for i in range(count)))
+    report('replies', 'queued' if queued else 'direct', api, time.perf_counter() - start, reply=latencies)
+    stop(outbound)
+
+async def mixed(dms, queued):
+    """A fan-out of dms notifications, with button clicks and command replies arriving during it"""
+    outbound = Outbound()
+    api = FakeDiscord(outbound.observe if queued else None)
+    channel = Channel(api, 1)
+    users = [User(api, user_id) for user_id in range(dms)]
+    acks, replies_ = [], []
+
+    async def notify():
+        await asyncio.gather(*(outbound.send(user, 'event', lane=NOTIFICATION) if queued else user.send('event')
+                               for user in users))
+
+    async def members():
+        for i in range(20):
+            await asyncio.sleep(0.1)
+            interaction = Interaction(api, i)
+            await asyncio.gather(
+                timed(acks, outbound.respond(interaction, 'ok') if queued else interaction.response.send_message('ok')),
+                timed(replies_, outbound.send(channel, 'reply') if queued else channel.send('reply')),
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(notify(), members())
+    report('mixed', 'queued' if queued else 'direct', api, time.perf_counter() - start,
+           ack=acks, reply=replies_)
+    stop(outbound)
+
+async def edits(count, queued):
+    """count edits to one message, a few milliseconds apart"""
+    outbound = Outbound()
+    api = FakeDiscord(outbound.observe if queued else None)
+    message = Message(api, 1, Channel(api, 1))
+    latencies = []
+
+    async def edit(i):
+        await asyncio.sleep(i * 0.01)
+        await timed(latencies, outbound.edit(message, content=str(i)) if queued else message.edit(content=str(i)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(edit(i) for i in range(count)))
+    report('edits', 'queued' if queued else 'direct', api, time.perf_counter() - start, edit=latencies)
+    if queued:
+        print(f"{'':<8} {'':<7} {outbound.stats()['coalesced']} of {count} edits coalesced")
+    stop(outbound)
+
+async def main(reply_count, dm_count, edit_count):
+    for queued in (False, True):
+        await replies(reply_count, queued)
+    for queued in (False, True):
+        await mixed(dm_count, queued)
+    for queued in (False, True):
+        await edits(edit_count, queued)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--replies', type=int, default=100)
+    parser.add_argument('--dms', type=int, default=300)
+    parser.add_argument('--edits', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.replies, args.dms, args.edits))
@@ -0,0 +1,60 @@
+"""Count Discord API calls per page turn: Paginator vs delete/resend/react
+
+Run from the bot directory:  python -m bench.paginator_calls [--flips N]
+"""
+import argparse
+import asyncio
+
+from discord import Embed
+
+from paginator import Paginator
+from bench.fakes import FakeCtx, FakeInteraction, FakeUser
+
+# API calls one page turn costs on each path
+LEGACY_FLIP = ['delete', 'send', 'add_reaction', 'add_reaction']
+PAGINATOR_FLIP = ['edit_message']
+
+async def get_page(page_number):
+    return Embed(title=f"Page {page_number + 1}")
+
+async def legacy_flips(flips):
+    # The old !events/!myevents loop: delete, resend and re-add both reactions
+    calls = []
+    ctx = FakeCtx(FakeUser(1), calls)
+    message = await ctx.send(embed=await get_page(0))
+    await message.add_reaction('◀️')
+    await message.add_reaction('▶️')
+    start = len(calls)
+    for page in range(1, flips + 1):
+        await message.delete()
+        message = await ctx.send(embed=await get_page(page))
+        await message.add_reaction('◀️')
+        await message.add_reaction('▶️')
+    return calls[start:]
+
+async def paginator_flips(flips):
+    calls = []
+    user = FakeUser(1)
+    view = Paginator(user.id, get_page, flips + 1)
+    await view.start(FakeCtx(user, calls))
+    start = len(calls)
+    for _ in range(flips):
+        interaction = FakeInteraction(user, calls)
+        if await view.interaction_check(interaction):
+            await view.next_button.callback(interaction)
+    view.stop()
+    return calls[start:]
+
+async def main(flips):
+    legacy = await legacy_flips(flips)
+    paginated = await paginator_flips(flips)
+    print(f"delete/resend/react: {len(legacy) / flips:.1f} API calls per page turn")
+    print(f"Paginator:           {len(paginated) / flips:.1f} API calls per page turn")
+    assert legacy == LEGACY_FLIP * flips, f'legacy page turns made {legacy[:len(LEGACY_FLIP)]}'
+    assert paginated == PAGINATOR_FLIP * flips, f'a Paginator page turn made {paginated[:3]}, not one edit_message'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--flips', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.flips))
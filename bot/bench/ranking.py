@@ -0,0 +1,101 @@
+"""Ranking cost per !events call: JSON prefs + variable IN (...) SQL vs bitmask ranking
+
+Run from the bot directory:  python -m bench.ranking [--events N] [--users M] [--calls C]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import time
+
+from event_cache import UpcomingEventCache
+from eventtime import now_epoch
+from preferences import EVENT_TYPES, EVENT_SIZES, encode_types, encode_sizes
+import web1
+
+GUILD_ID = '1'
+
+LEGACY_RANKING = '''
+    SELECT e.event_id, e.event_time,
+        CASE
+            WHEN e.event_type IN ({}) AND e.event_size IN ({}) THEN 1
+            WHEN e.event_type IN ({}) THEN 2
+            WHEN e.event_size IN ({}) THEN 2
+            ELSE 3
+        END as preference_match
+    FROM events e
+    WHERE e.event_time >= ?
+    ORDER BY preference_match ASC, e.event_time ASC
+'''
+
+def seed(conn, events, users):
+    now = now_epoch()
+    conn.execute('''
+        CREATE TABLE events (event_id INTEGER PRIMARY KEY, event_type TEXT, event_size TEXT,
+                             event_time INTEGER)
+    ''')
+    conn.execute('CREATE INDEX idx_events_time ON events(event_time)')
+    conn.execute('''
+        CREATE TABLE prefs_json (user_id TEXT PRIMARY KEY, preferred_types TEXT, preferred_sizes TEXT)
+    ''')
+    conn.execute('''
+        CREATE TABLE prefs_mask (user_id TEXT PRIMARY KEY, preferred_types INTEGER, preferred_sizes INTEGER)
+    ''')
+    rows = [(i, random.choice(EVENT_TYPES), random.choice(EVENT_SIZES), now + random.randint(60, 10 ** 6))
+            for i in range(events)]
+    conn.executemany('INSERT INTO events VALUES (?, ?, ?, ?)', rows)
+    for u in range(users):
+        types = random.sample(EVENT_TYPES, random.randint(1, 4))
+        sizes = random.sample(EVENT_SIZES, random.randint(1, 2))
+        conn.execute('INSERT INTO prefs_json VALUES (?, ?, ?)', (str(u), json.dumps(types), json.dumps(sizes)))
+        conn.execute('INSERT INTO prefs_mask VALUES (?, ?, ?)', (str(u), encode_types(types), encode_sizes(sizes)))
+    conn.commit()
+    return rows
+
+def legacy_call(conn, user_id):
+    types_json, sizes_json = conn.execute(
+        'SELECT preferred_types, preferred_sizes FROM prefs_json WHERE user_id = ?', (user_id,)).fetchone()
+    types = json.loads(types_json)
+    sizes = json.loads(sizes_json)
+    type_placeholders = ','.join('?' for _ in types)
+    size_placeholders = ','.join('?' for _ in sizes)
+    query = LEGACY_RANKING.format(type_placeholders, size_placeholders, type_placeholders, size_placeholders)
+    rows = conn.execute(query, types + sizes + types + sizes + [now_epoch()]).fetchall()
+    return rows[:web1.EVENTS_PER_PAGE]
+
+def bitmask_call(conn, cache, user_id):
+    types_mask, sizes_mask = conn.execute(
+        'SELECT preferred_types, preferred_sizes FROM prefs_mask WHERE user_id = ?', (user_id,)).fetchone()
+    levels = web1.preference_levels(cache.bucket_keys(GUILD_ID), types_mask, sizes_mask)
+    # fetch_events_page reads the module-level cache
+    return web1.fetch_events_page(GUILD_ID, levels, None, None, None)
+
+def timed(label, fn, calls, users):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(str(i % users))
+    per_call = (time.perf_counter() - start) / calls * 1000
+    print(f"{label:<28} {per_call:8.3f} ms per !events call")
+
+def main(events, users, calls):
+    conn = sqlite3.connect(':memory:')
+    rows = seed(conn, events, users)
+
+    cache = UpcomingEventCache()
+    for event_id, event_type, event_size, event_time in rows:
+        cache.put({'event_id': event_id, 'event_type': event_type, 'event_size': event_size,
+                   'event_time': event_time, 'guild_id': GUILD_ID})
+    cache.loaded = True
+    web1.event_cache = cache
+
+    print(f"{events} events, {users} users, {calls} calls")
+    timed('JSON + variable IN (...)', lambda u: legacy_call(conn, u), calls, users)
+    timed('bitmask + bucket ranking', lambda u: bitmask_call(conn, cache, u), calls, users)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+    main(args.events, args.users, args.calls)
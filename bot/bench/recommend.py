@@ -0,0 +1,93 @@
+"""!recommended: build, incremental update and top-N latency of the recommender
+
+Synthetic members each favour one of a few topics and mostly click events
+from it. For each member count the bench reports load time, per-click update
+cost, recommendation latency, and hit rate@N for one held-out click per
+member against recommending the most popular upcoming events.
+
+Run from the bot directory:  python -m bench.recommend [--users 1000 5000 10000] [--events N]
+"""
+import argparse
+import random
+import time
+
+from recommender import InteractionMatrix, RECOMMENDATIONS
+
+TOPICS = 12
+INTERESTS_PER_USER = 15
+OWN_TOPIC = 0.8        # Share of a member's clicks on their favourite topic
+UPCOMING = 0.3         # Share of events (the newest) that are still upcoming
+SAMPLES = 500
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+def synthesize(users, events, rng):
+    topic_events = [[e for e in range(1, events + 1) if e % TOPICS == t] for t in range(TOPICS)]
+    clicks = []
+    for user in range(users):
+        topic = rng.randrange(TOPICS)
+        chosen = set()
+        while len(chosen) < INTERESTS_PER_USER:
+            pool = topic_events[topic] if rng.random() < OWN_TOPIC else topic_events[rng.randrange(TOPICS)]
+            chosen.add(rng.choice(pool))
+        clicks.extend((str(user), event_id) for event_id in chosen)
+    return clicks
+
+def measure(users, events, rng):
+    clicks = synthesize(users, events, rng)
+    upcoming = list(range(int(events * (1 - UPCOMING)) + 1, events + 1))
+    upcoming_set = set(upcoming)
+
+    # Hold out one upcoming click per sampled member
+    sampled = set(rng.sample(range(users), SAMPLES))
+    held_out = {}
+    for user_id, event_id in clicks:
+        if int(user_id) in sampled and event_id in upcoming_set and user_id not in held_out:
+            held_out[user_id] = event_id
+    training = [(u, e) for u, e in clicks if held_out.get(u) != e]
+
+    start = time.perf_counter()
+    matrix = InteractionMatrix()
+    for user_id, event_id in training:
+        matrix.add(user_id, event_id)
+    load_s = time.perf_counter() - start
+
+    popularity = {}
+    for _, event_id in training:
+        popularity[event_id] = popularity.get(event_id, 0) + 1
+
+    latencies = []
+    hits = popular_hits = 0
+    for user_id, event_id in held_out.items():
+        start = time.perf_counter()
+        recommended = matrix.recommend(user_id, upcoming)
+        latencies.append(time.perf_counter() - start)
+        hits += event_id in {e for _, e in recommended}
+        mine = {e for u, e in training if u == user_id}
+        popular = sorted((e for e in upcoming if e not in mine), key=lambda e: -popularity.get(e, 0))
+        popular_hits += event_id in popular[:RECOMMENDATIONS]
+
+    start = time.perf_counter()
+    for user_id, event_id in held_out.items():
+        matrix.add(user_id, event_id)
+    add_us = (time.perf_counter() - start) / len(held_out) * 1e6
+
+    latencies.sort()
+    print(f"{users:>6} users {len(clicks):>7} clicks  load {load_s * 1000:7.0f} ms  "
+          f"click {add_us:5.1f} us  top-{RECOMMENDATIONS} p50 {percentile(latencies, 0.5) * 1000:5.2f} ms "
+          f"p99 {percentile(latencies, 0.99) * 1000:5.2f} ms  "
+          f"hit rate {hits / len(held_out):.0%} (popular {popular_hits / len(held_out):.0%})")
+
+def main(user_counts, events, seed):
+    rng = random.Random(seed)
+    for users in user_counts:
+        measure(users, events, rng)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args.users, args.events, args.seed)
@@ -0,0 +1,164 @@
+"""Event reminders: memory and CPU of 100k pending reminders, and the cost of firing them
+
+Compares the ReminderScheduler heap against one asyncio.sleep task per
+pending reminder, the naive way to schedule them, then seeds a database
+with events spread over the next day and interested members spread over
+them and fires every reminder tick by tick, as the scheduler would.
+
+Run from the bot directory:  python -m bench.reminders [--reminders 100000] [--events 20000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import reminders
+from database import Database
+from eventtime import now_epoch
+from migrations import migrate
+from reminders import ReminderScheduler
+
+GUILD_ID = '1'
+WINDOW = 24 * 3600     # Events start within the next day
+MEMBERS = 20000
+
+async def _nothing(user_ids, event_ids):
+    pass
+
+def heap_footprint(count, rng):
+    now = now_epoch()
+    tracemalloc.start()
+    start = time.perf_counter()
+    scheduler = ReminderScheduler(None, _nothing)
+    for event_id in range(count):
+        scheduler.schedule(event_id, now + reminders.REMINDER_LEAD + rng.randrange(WINDOW))
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed
+
+async def task_footprint(count, rng):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(asyncio.sleep(reminders.REMINDER_LEAD + rng.randrange(WINDOW)))
+             for _ in range(count)]
+    await asyncio.sleep(0)  # Let every task reach its sleep
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return size, elapsed
+
+def seed(path, events, interests, rng):
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO events (event_id, guild_id, creator_id, creator_name, description, event_type,
+                            event_size, location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, '0', 'host', 'Meetup', 'social', 'medium (6-15)', 'Library', ?, '1 hour', 60, ?)
+    ''', [(e, GUILD_ID, now + reminders.REMINDER_LEAD + rng.randrange(WINDOW), now)
+          for e in range(1, events + 1)])
+    conn.executemany('''
+        INSERT OR IGNORE INTO event_interests (event_id, user_id, username, interested_in_connection, guild_id)
+        VALUES (?, ?, ?, FALSE, ?)
+    ''', [(rng.randint(1, events), str(u), f'user{u}', GUILD_ID)
+          for u in (rng.randrange(MEMBERS) for _ in range(interests))])
+    conn.commit()
+    count = conn.execute('SELECT COUNT(*) FROM event_interests').fetchone()[0]
+    conn.close()
+    return now, count
+
+async def fire_all(events, interests, rng):
+    path = os.path.join(tempfile.mkdtemp(), 'reminders.db')
+    now, joined = seed(path, events, interests, rng)
+    db = Database(path)
+    messages = reminded = 0
+    async def deliver(user_ids, event_ids):
+        nonlocal messages, reminded
+        messages += len(user_ids)
+        reminded += len(user_ids) * len(event_ids)
+
+    scheduler = ReminderScheduler(db, deliver)
+    start = time.perf_counter()
+    await scheduler.load()
+    load_s = time.perf_counter() - start
+
+    # Step the clock one tick at a time through the window, skipping empty stretches
+    ticks = []
+    cpu = time.process_time()
+    clock = now
+    while scheduler.stats()['pending']:
+        clock = max(clock + scheduler.tick, scheduler._heap[0][0] - scheduler.tick)
+        start = time.perf_counter()
+        await scheduler.fire_due(clock)
+        ticks.append(time.perf_counter() - start)
+    cpu = time.process_time() - cpu
+
+    # A restart must not send anything twice
+    await scheduler.load()
+    resent = await scheduler.fire_due(now + WINDOW + reminders.REMINDER_LEAD)
+    db.close()
+
+    ticks.sort()
+    print(f"fire   {joined:>7} reminders over {events} events: load {load_s * 1000:5.0f} ms  "
+          f"{len(ticks)} ticks, p50 {ticks[len(ticks) // 2] * 1000:5.2f} ms "
+          f"max {ticks[-1] * 1000:6.2f} ms  total {sum(ticks):5.2f} s ({cpu:5.2f} s CPU)  "
+          f"{messages} DMs for {reminded} reminders  resent after reload {resent}")
+
+async def check_short_notice():
+    """An event created inside the reminder lead still reminds every member who joins after it is due"""
+    path = os.path.join(tempfile.mkdtemp(), 'short.db')
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.execute('''
+        INSERT INTO events (event_id, guild_id, creator_id, description, event_time, created_at)
+        VALUES (1, ?, '0', 'Meetup', ?, ?)
+    ''', (GUILD_ID, now + reminders.REMINDER_LEAD // 2, now))
+    conn.commit()
+    db = Database(path)
+    sent = []
+    async def deliver(user_ids, event_ids):
+        sent.extend(user_ids)
+    scheduler = ReminderScheduler(db, deliver)
+    event_time = now + reminders.REMINDER_LEAD // 2
+    scheduler.schedule(1, event_time)
+    await scheduler.fire_due(now)
+    # Two members register one after the other, both after the reminder went out
+    for i, user_id in enumerate(('7', '8'), start=1):
+        conn.execute('''
+            INSERT INTO event_interests (event_id, user_id, username, interested_in_connection, guild_id)
+            VALUES (1, ?, ?, FALSE, ?)
+        ''', (user_id, f'user{user_id}', GUILD_ID))
+        conn.commit()
+        scheduler.interest_added(1, event_time, now + i * 60)
+        await scheduler.fire_due(now + i * 60)
+    conn.close()
+    await scheduler.fire_due(now + 180)
+    db.close()
+    assert sent == ['7', '8'], f'late registrants reminded: {sent}, expected each of 7 and 8 once'
+    print('short-notice event reminded each late registrant once')
+
+async def main(count, events, seed_value):
+    await check_short_notice()
+    rng = random.Random(seed_value)
+    size, elapsed = heap_footprint(count, rng)
+    print(f"heap   {count:>7} pending: {size / 1e6:6.1f} MB  {elapsed * 1000:6.0f} ms to schedule")
+    size, elapsed = await task_footprint(count, rng)
+    print(f"tasks  {count:>7} pending: {size / 1e6:6.1f} MB  {elapsed * 1000:6.0f} ms to schedule")
+    await fire_all(events, count, rng)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reminders', type=int, default=100000)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.reminders, args.events, args.seed))
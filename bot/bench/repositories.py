@@ -0,0 +1,128 @@
+"""Repository conformance check and backend comparison
+
+Replays the same random sequence of operations against SqliteRepository and
+MemoryRepository, failing on the first call whose results differ, then checks
+that a MemoryRepository snapshot of the SQLite file agrees too. Afterwards
+each backend is timed on the read paths the commands use.
+
+Run from the bot directory:  python -m bench.repositories [--operations N] [--seed S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database import Database
+from migrations import migrate
+from preferences import EVENT_TYPES, EVENT_SIZES
+from repository import MemoryRepository, SqliteRepository
+
+NOW = 1_700_000_000
+GUILDS = ('1', '2', '3')
+USERS = [str(u) for u in range(40)]
+# Few distinct names so ordering ties are broken by user_id
+NAMES = ('ana', 'ben', 'cy', 'dee')
+TIMING_CALLS = 2000
+
+def random_event(rng):
+    return {
+        'guild_id': rng.choice(GUILDS),
+        'creator_id': rng.choice(USERS),
+        'creator_name': rng.choice(NAMES),
+        'description': f'event {rng.randrange(1000)}',
+        'event_type': rng.choice(EVENT_TYPES),
+        'event_size': rng.choice(EVENT_SIZES),
+        'location': 'Library',
+        # Some events already started, and some share a start time
+        'event_time': NOW + rng.randrange(-20, 60) * 3600,
+        'duration': '1 hour',
+        'duration_minutes': 60,
+        'created_at': NOW,
+    }
+
+def random_call(rng, next_event_id):
+    """(method name, args) for one operation against either backend"""
+    # Ids past the last event exercise the "event is gone" paths
+    event_id = rng.randint(1, next_event_id + 1)
+    guild_id, user_id = rng.choice(GUILDS), rng.choice(USERS)
+    return rng.choices([
+        ('create_event', (random_event(rng),)),
+        ('get_event', (guild_id, event_id)),
+        ('upcoming_events', (NOW,)),
+        ('set_event_location', (event_id, rng.uniform(-90, 90), rng.uniform(-180, 180))),
+        ('add_interest', (event_id, user_id, rng.choice(NAMES))),
+        ('toggle_connection', (event_id, user_id)),
+        ('remove_interest', (event_id, user_id)),
+        ('interested_users', (event_id,)),
+        ('user_interests', (guild_id, user_id, NOW)),
+        ('get_preferences', (guild_id, user_id)),
+        ('set_preferences', (guild_id, user_id, rng.choice(NAMES), rng.randrange(64), rng.randrange(8))),
+        ('set_notifications', (guild_id, user_id, rng.random() < 0.5)),
+        ('delete_preferences', (guild_id, user_id)),
+        ('all_preferences', ()),
+    ], weights=[3, 2, 1, 1, 8, 4, 2, 2, 2, 1, 2, 1, 1, 1])[0]
+
+async def check_conformance(path, operations, rng):
+    db = Database(path)
+    await db.run(migrate)
+    backends = {'sqlite': SqliteRepository(db), 'memory': MemoryRepository()}
+    next_event_id = 0
+
+    for step in range(operations):
+        name, args = random_call(rng, next_event_id)
+        results = {label: await getattr(repo, name)(*args) for label, repo in backends.items()}
+        if results['sqlite'] != results['memory']:
+            raise AssertionError(f'step {step}: {name}{args} -> {results}')
+        if name == 'create_event':
+            next_event_id = results['sqlite']
+
+    # A snapshot of the SQLite file must match the live in-memory repository
+    conn = sqlite3.connect(path)
+    snapshot = MemoryRepository.from_sqlite(conn)
+    conn.close()
+    for name, args in [('upcoming_events', (0,)), ('all_preferences', ())] + [
+        ('user_interests', (guild_id, user_id, 0)) for guild_id in GUILDS for user_id in USERS
+    ] + [('interested_users', (event_id,)) for event_id in range(1, next_event_id + 1)]:
+        expected = await getattr(backends['memory'], name)(*args)
+        if await getattr(snapshot, name)(*args) != expected:
+            raise AssertionError(f'snapshot differs on {name}{args}')
+
+    db.close()
+    print(f'conformance: {operations} operations, {next_event_id} events, both backends identical')
+    return snapshot
+
+async def time_reads(label, repo, events, rng):
+    calls = [
+        ('get_event', lambda: repo.get_event(rng.choice(GUILDS), rng.randint(1, events))),
+        ('interested_users', lambda: repo.interested_users(rng.randint(1, events))),
+        ('user_interests', lambda: repo.user_interests(rng.choice(GUILDS), rng.choice(USERS), NOW)),
+        ('get_preferences', lambda: repo.get_preferences(rng.choice(GUILDS), rng.choice(USERS))),
+    ]
+    for name, call in calls:
+        start = time.perf_counter()
+        for _ in range(TIMING_CALLS):
+            await call()
+        per_call = (time.perf_counter() - start) / TIMING_CALLS * 1e6
+        print(f'{label:<7} {name:<18} {per_call:9.1f} us/call')
+
+async def main(operations, seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'repositories.db')
+        snapshot = await check_conformance(path, operations, rng)
+        events = len(await snapshot.upcoming_events(0))
+
+        db = Database(path)
+        await time_reads('sqlite', SqliteRepository(db), events, random.Random(seed))
+        db.close()
+        await time_reads('memory', snapshot, events, random.Random(seed))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--operations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.operations, args.seed))
@@ -0,0 +1,122 @@
+"""!search: FTS5 + bm25 vs a LIKE scan over description and location
+
+Seeds a large events table (half of it already in the past) with
+descriptions drawn from a small vocabulary and times both strategies for
+the same queries.
+
+Run from the bot directory:  python -m bench.search [--events N] [--queries Q]
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from eventtime import now_epoch
+from migrations import migrate
+from preferences import EVENT_TYPES, EVENT_SIZES
+from search import search_upcoming, SEARCH_LIMIT
+
+TOPICS = ('chess board games study group coding pizza soccer pickup basketball yoga '
+          'movie night karaoke hike coffee chat robotics club calculus review '
+          'painting music jam volunteer trivia climbing ramen potluck').split()
+# Long tail of rarer words so term frequencies look like real descriptions
+VOCABULARY = TOPICS + [f'word{i}' for i in range(5000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+GUILD_ID = '1'
+PLACES = ['Library', 'Student Union', 'Rec Center', 'Engineering Hall', 'Dorm Lounge',
+          'Coffee Shop', 'Main Quad', 'Math Building']
+
+def seed(path, events, rng):
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO events
+        (guild_id, creator_id, creator_name, description, event_type, event_size,
+         location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (GUILD_ID, '1', 'creator', ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=rng.randint(3, 12))),
+         rng.choice(EVENT_TYPES), rng.choice(EVENT_SIZES),
+         f'{rng.choice(PLACES)} room {rng.randrange(300)}',
+         now + rng.randint(-180 * 86400, 90 * 86400), '1 hour', 60, now)
+        for _ in range(events)
+    ])
+    conn.commit()
+    return conn
+
+# (description, location, query) triples that must be found: words after any
+# punctuation, not just whitespace, are searchable
+PUNCTUATION_CASES = [
+    ('Chess club @library', 'Library', 'library'),
+    ('Study session', 'Room#204', '204'),
+    ('Board games+snacks', 'Dorm Lounge', 'snacks'),
+    ('Trivia night', 'Union [2nd floor]', '2nd'),
+    ('Pickup soccer *bring water*', 'Field~3', 'water field'),
+    ('Coding jam <beginners welcome>', 'Lab|B', 'beginners'),
+    ('Karaoke=fun', 'Student Center', 'fun'),
+]
+
+def check_punctuation():
+    """Every PUNCTUATION_CASES query finds its event, and only in its own guild"""
+    now = now_epoch()
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    for guild_id in (GUILD_ID, '2'):
+        conn.executemany('''
+            INSERT INTO events (guild_id, creator_id, description, location, event_time, created_at)
+            VALUES (?, '1', ?, ?, ?, ?)
+        ''', [(guild_id, description, location, now + 3600, now)
+              for description, location, _ in PUNCTUATION_CASES])
+    for description, location, query in PUNCTUATION_CASES:
+        found = search_upcoming(conn, GUILD_ID, query, now)
+        assert [(e['guild_id'], e['description']) for _, e in found] == [(GUILD_ID, description)], \
+            f'{query!r} did not find {description!r} @ {location!r}'
+    conn.close()
+    print(f"punctuation cases           {len(PUNCTUATION_CASES)} found, guild-scoped")
+
+def like_scan(conn, terms, now):
+    clauses = ' AND '.join('(description LIKE ? OR location LIKE ?)' for _ in terms.split())
+    params = [p for word in terms.split() for p in (f'%{word}%', f'%{word}%')]
+    return conn.execute(f'''
+        SELECT event_id FROM events
+        WHERE {clauses} AND event_time >= ?
+        ORDER BY event_time
+        LIMIT ?
+    ''', params + [now, SEARCH_LIMIT]).fetchall()
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+def main(events, queries):
+    check_punctuation()
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), 'search.db')
+    start = time.perf_counter()
+    conn = seed(path, events, rng)
+    print(f"seeded {events} events (with FTS index) in {time.perf_counter() - start:.1f} s")
+
+    probes = [' '.join(rng.choices(VOCABULARY[:500], k=rng.choice((1, 2)))) for _ in range(queries)]
+    probes += ['library chess', 'rec center', 'coff']
+    now = now_epoch()
+
+    fts, fts_results = timed(lambda q: search_upcoming(conn, GUILD_ID, q, now), probes)
+    scan, _ = timed(lambda q: like_scan(conn, q, now), probes[:max(1, len(probes) // 10)])
+    found = sum(len(r) for r in fts_results) / len(probes)
+    assert all(event['event_time'] >= now for r in fts_results for _, event in r)
+
+    print(f"FTS5 MATCH + bm25           {fts * 1000:9.2f} ms per query (~{found:.0f} results)")
+    print(f"LIKE scan                   {scan * 1000:9.2f} ms per query")
+    conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    main(args.events, args.queries)
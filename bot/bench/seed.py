@@ -0,0 +1,61 @@
+"""Synthetic discord_bot.db generator for benchmarks"""
+import random
+import sqlite3
+
+from eventtime import now_epoch
+from migrations import migrate
+from preferences import EVENT_TYPES, EVENT_SIZES, encode_types, encode_sizes
+
+def guild_of(index, guilds):
+    """Guild id (as stored) that seeded event or user number index belongs to"""
+    return str(1 + index % guilds)
+
+def seed_database(path, events=1000, users=200, interests=5000, seed=0, guilds=1):
+    """Create a migrated database with N upcoming events, M users and K interests
+
+    Events and users are dealt round-robin over guilds 1..guilds; users only
+    register interest in events of their own guild.
+    """
+    rng = random.Random(seed)
+    now = now_epoch()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+
+    conn.executemany('''
+        INSERT INTO events
+        (event_id, guild_id, creator_id, creator_name, description, event_type, event_size,
+         location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (i, guild_of(i, guilds), str(rng.randrange(users)), f'creator{i}', f'Synthetic event {i} ' + 'x' * rng.randrange(80),
+         rng.choice(EVENT_TYPES), rng.choice(EVENT_SIZES), f'Building {rng.randrange(50)}',
+         now + rng.randint(3600, 90 * 86400), '1 hour', 60, now)
+        for i in range(1, events + 1)
+    ])
+
+    conn.executemany('''
+        INSERT INTO user_preferences
+        (guild_id, user_id, username, preferred_types, preferred_sizes, notification_enabled)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (guild_of(u, guilds), str(u), f'user{u}',
+         encode_types(rng.sample(EVENT_TYPES, rng.randint(1, 3))),
+         encode_sizes(rng.sample(EVENT_SIZES, rng.randint(1, 2))),
+         True)
+        for u in range(users)
+    ])
+
+    pairs = set()
+    users_per_guild = max(1, users // guilds)
+    target = min(interests, events * users_per_guild)
+    while len(pairs) < target:
+        event_id = rng.randint(1, events)
+        pairs.add((event_id, rng.randrange(users_per_guild) * guilds + event_id % guilds))
+    conn.executemany('''
+        INSERT INTO event_interests (event_id, guild_id, user_id, username, interested_in_connection)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(event_id, guild_of(event_id, guilds), str(u), f'user{u}', rng.random() < 0.3)
+          for event_id, u in pairs])
+
+    conn.commit()
+    conn.close()
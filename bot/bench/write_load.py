@@ -0,0 +1,63 @@
+"""Concurrent "I'm Interested!" load test: one transaction per click vs group commit
+
+Simulates a burst of users clicking the interest and connect buttons at once
+and reports writes per second for each strategy.
+
+Run from the bot directory:  python -m bench.write_load [--clicks N] [--events E]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import Database
+from repository import insert_interest, toggle_connection
+from bench.seed import seed_database
+
+async def burst(label, db, write, clicks, events):
+    errors = 0
+    outcomes = {}
+
+    async def click(i):
+        nonlocal errors
+        # Each user clicks interested twice, then connect, on the same event
+        event_id = (i // 3) % events + 1
+        user_id = str(100000 + i // 3)
+        try:
+            if i % 3 == 2:
+                result = await write(toggle_connection, event_id, user_id)
+                key = 'toggled' if result is not None else 'not registered'
+            else:
+                try:
+                    result = await write(insert_interest, event_id, user_id, f'user{user_id}')
+                except sqlite3.IntegrityError:
+                    result = False  # Lost the check-then-insert race, as register_interest handles it
+                key = 'registered' if result else 'already registered'
+            outcomes[key] = outcomes.get(key, 0) + 1
+        except sqlite3.OperationalError:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(click(i) for i in range(clicks)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {clicks / elapsed:9.0f} writes/s  errors={errors}  "
+          f"transactions={db.writer.batches or clicks}  outcomes={outcomes}")
+
+async def main(clicks, events):
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, use_writer in [('transaction per click', False), ('group commit', True)]:
+            path = os.path.join(tmp, f'{use_writer}.db')
+            seed_database(path, events=events, users=10, interests=0)
+            db = Database(path)
+            write = db.write if use_writer else db.run
+            await burst(label, db, write, clicks, events)
+            db.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clicks', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.clicks, args.events))
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+
+from discord import Embed
+
+from eventtime import format_event_time
+
+# Rendered cards kept, across all kinds and events
+CARD_CACHE_SIZE = 2048
+
+def event_card(event):
+    """The standard event card shown by !detail, !myevents, scheduling and notifications"""
+    embed = Embed(title="📅 Event Details", color=0x00ff00)
+    embed.add_field(name="Description", value=event['description'], inline=False)
+    embed.add_field(name="Type", value=event['event_type'].title(), inline=True)
+    embed.add_field(name="Size", value=event['event_size'].title(), inline=True)
+    embed.add_field(name="Location", value=event['location'], inline=True)
+    embed.add_field(name="Date & Time", value=format_event_time(event['event_time']), inline=True)
+    embed.add_field(name="Duration", value=event['duration'], inline=True)
+    embed.add_field(name="Interested", value=f"{event['interested_count']} people", inline=True)
+    embed.add_field(name="Organized by", value=event['creator_name'], inline=False)
+    return embed
+
+def participants_card(event, interested_users):
+    """!interested: an event's details plus who is attending and who wants to connect"""
+    embed = Embed(title="🙋 Event Participants", color=0x00ff00)
+    embed.add_field(name="Event", value=event['description'], inline=False)
+    embed.add_field(name="Time", value=format_event_time(event['event_time']), inline=True)
+    embed.add_field(name="Location", value=event['location'], inline=True)
+    embed.add_field(name="Duration", value=event['duration'], inline=True)
+    embed.add_field(name="Organized by", value=event['creator_name'], inline=True)
+
+    # Separate users by their connection preference
+    general_interest = [username for username, wants_connection in interested_users if not wants_connection]
+    want_to_connect = [username for username, wants_connection in interested_users if wants_connection]
+    if general_interest:
+        embed.add_field(name="🎯 Interested in Attending", value="\n".join(general_interest), inline=False)
+    if want_to_connect:
+        embed.add_field(name="🤝 Want to Connect", value="\n".join(want_to_connect), inline=False)
+
+    embed.set_footer(text=f"Total Interested: {event['interested_count']}")
+    return embed
+
+class CardCache:
+    """Bounded LRU of rendered cards
+
+    Keys are (kind, event_id, version). An event's version is bumped by the
+    database (trg_events_version) and by event_cache.adjust_counts whenever
+    anything a card shows changes, so stale cards are never looked up again
+    and simply age out.
+
+    Cached embeds are shared between every message that shows them; callers
+    that add per-user fields or footers must work on embed.copy().
+    """
+
+    def __init__(self, size=CARD_CACHE_SIZE):
+        self.size = size
+        self._cards = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, event):
+        """The cached card for this version of the event, or None"""
+        key = kind, event['event_id'], event.get('version', 0)
+        embed = self._cards.get(key)
+        if embed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cards.move_to_end(key)
+        return embed
+
+    def put(self, kind, event, embed):
+        """Cache a freshly rendered card and return it"""
+        key = kind, event['event_id'], event.get('version', 0)
+        self._cards[key] = embed
+        self._cards.move_to_end(key)
+        while len(self._cards) > self.size:
+            self._cards.popitem(last=False)
+        return embed
+
+    def discard(self, event_ids):
+        """Drop every cached card of these events, whatever version it was rendered at"""
+        event_ids = set(event_ids)
+        for key in [key for key in self._cards if key[1] in event_ids]:
+            del self._cards[key]
+
+    def event_card(self, event):
+        embed = self.get('event', event)
+        if embed is None:
+            embed = self.put('event', event, event_card(event))
+        return embed
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._cards),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+card_cache = CardCache()
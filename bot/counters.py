@@ -0,0 +1,28 @@
+# Consistency check and repair for the events.interested_count/connect_count
+# counters that the event_interests triggers keep up to date.
+
+ACTUAL_COUNTS = '''
+    SELECT e.event_id, e.interested_count, e.connect_count,
+           COUNT(i.user_id) AS actual_interested,
+           COALESCE(SUM(i.interested_in_connection != 0), 0) AS actual_connect
+    FROM events e
+    LEFT JOIN event_interests i ON e.event_id = i.event_id
+    GROUP BY e.event_id
+'''
+
+def find_counter_drift(conn):
+    """Return (event_id, stored, actual) for every event whose counters disagree"""
+    drift = []
+    for event_id, interested, connect, actual_interested, actual_connect in conn.execute(ACTUAL_COUNTS):
+        if (interested, connect) != (actual_interested, actual_connect):
+            drift.append((event_id, (interested, connect), (actual_interested, actual_connect)))
+    return drift
+
+def rebuild_counters(conn):
+    """Recompute counters for drifted events; returns the drift that was fixed"""
+    drift = find_counter_drift(conn)
+    conn.executemany('''
+        UPDATE events SET interested_count = ?, connect_count = ?
+        WHERE event_id = ?
+    ''', [(actual[0], actual[1], event_id) for event_id, _, actual in drift])
+    return drift
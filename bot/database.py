@@ -0,0 +1,184 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from search import register_functions
+
+# Database settings
+DB_PATH = 'discord_bot.db'
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+WRITE_INTERVAL = 0.005  # Seconds the writer waits to gather a batch
+MAX_WRITE_BATCH = 500
+
+class Database:
+    """Small pool of long-lived SQLite connections served from a dedicated executor
+
+    Each executor thread owns exactly one connection, so the pool size is the
+    number of worker threads and queries never run on the event loop. The
+    database runs in WAL mode so readers never wait on the writer, and all
+    writes go through a single BatchWriter (see write()).
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._executor = None
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.writer = BatchWriter(self)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='db')
+        return self._executor
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            # The events triggers call search_words() to keep the search index in sync
+            register_functions(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn, args):
+        conn = self._connection()
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+    async def run(self, fn, *args):
+        """Run fn(conn, *args) on a pooled connection as a single transaction"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), self._call, fn, args)
+        finally:
+            metrics.add_db_time(time.perf_counter() - start)
+
+    async def fetchone(self, query, params=()):
+        return await self.run(lambda conn: conn.execute(query, params).fetchone())
+
+    async def fetchall(self, query, params=()):
+        return await self.run(lambda conn: conn.execute(query, params).fetchall())
+
+    async def write(self, fn, *args):
+        """Queue fn(conn, *args) for the single writer and await its own result"""
+        start = time.perf_counter()
+        try:
+            return await self.writer.submit(fn, *args)
+        finally:
+            metrics.add_db_time(time.perf_counter() - start)
+
+    async def execute(self, query, params=()):
+        """Execute a write and return the cursor's (lastrowid, rowcount)"""
+        return await self.write(_execute, query, params)
+
+    def close(self):
+        self.writer.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+def _execute(conn, query, params):
+    c = conn.execute(query, params)
+    return c.lastrowid, c.rowcount
+
+class BatchWriter:
+    """Single writer coroutine with group commit
+
+    Mutations queued within WRITE_INTERVAL of each other are applied in one
+    transaction. Each mutation runs inside its own savepoint, so a failure
+    (e.g. an IntegrityError) only rolls back that caller's change, and every
+    caller's future is resolved with its own result or exception.
+    """
+
+    def __init__(self, db, interval=WRITE_INTERVAL, max_batch=MAX_WRITE_BATCH):
+        self.db = db
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.writes = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, fn, *args):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, args, future))
+        return await future
+
+    async def _run(self):
+        # This task outlives the command that started it; don't bill batches to it
+        metrics.detach()
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.interval)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                outcomes = await self.db.run(_apply_batch, [(fn, args) for fn, args, _ in batch])
+            except Exception as e:
+                # The commit itself failed, so nothing in the batch was written
+                outcomes = [(False, e)] * len(batch)
+
+            self.batches += 1
+            self.writes += len(batch)
+            for (_, _, future), (ok, result) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+    def depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+def _apply_batch(conn, mutations):
+    conn.execute('BEGIN IMMEDIATE')
+    outcomes = []
+    for fn, args in mutations:
+        conn.execute('SAVEPOINT mutation')
+        try:
+            result = fn(conn, *args)
+        except Exception as e:
+            conn.execute('ROLLBACK TO mutation')
+            outcomes.append((False, e))
+        else:
+            outcomes.append((True, result))
+        conn.execute('RELEASE mutation')
+    return outcomes
+
+# Shared instance used by every command and button handler
+db = Database()
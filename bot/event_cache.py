@@ -0,0 +1,199 @@
+import asyncio
+import bisect
+import heapq
+
+from eventtime import now_epoch
+from geo import GridIndex
+
+class UpcomingEventCache:
+    """Process-wide cache of upcoming events
+
+    Loaded once from a repository, then kept current write-through by the
+    schedule and interest handlers. Events are evicted as soon as their
+    event_time passes, using a min-heap keyed on event_time.
+
+    Each guild's events are also indexed in (event_time, event_id) order per
+    (event_type, event_size) bucket, so a page of results can be read from
+    any keyset position without ranking or sorting the whole set, and without
+    touching other guilds' events. Events with coordinates are additionally
+    kept in a per-guild GridIndex for radius searches.
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._expiry = []
+        self._buckets = {}   # guild_id -> {(event_type, event_size): [(event_time, event_id)]}
+        self._geo = {}       # guild_id -> GridIndex
+        self._load_lock = asyncio.Lock()
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def ensure_loaded(self, repo):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            for event in await repo.upcoming_events(now_epoch()):
+                self.put(event)
+            self.loaded = True
+
+    def _evict_expired(self):
+        now = now_epoch()
+        while self._expiry and self._expiry[0][0] < now:
+            event_time, event_id = heapq.heappop(self._expiry)
+            event = self._events.get(event_id)
+            # Skip stale heap entries left behind by put() replacing an event
+            if event is not None and event['event_time'] == event_time:
+                self.remove(event_id)
+                self.evictions += 1
+
+    def _bucket_key(self, event):
+        return event['event_type'], event['event_size']
+
+    def put(self, event):
+        """Insert or replace an event; past events are ignored"""
+        if event['event_time'] < now_epoch():
+            return
+        self.remove(event['event_id'])
+        self._events[event['event_id']] = event
+        heapq.heappush(self._expiry, (event['event_time'], event['event_id']))
+        buckets = self._buckets.setdefault(event['guild_id'], {})
+        bucket = buckets.setdefault(self._bucket_key(event), [])
+        bisect.insort(bucket, (event['event_time'], event['event_id']))
+        if event.get('latitude') is not None and event.get('longitude') is not None:
+            self._geo_index(event['guild_id']).add(event['event_id'], event['latitude'], event['longitude'])
+
+    def remove(self, event_id):
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        guild_id = event['guild_id']
+        buckets = self._buckets[guild_id]
+        key = self._bucket_key(event)
+        bucket = buckets[key]
+        del bucket[bisect.bisect_left(bucket, (event['event_time'], event_id))]
+        if not bucket:
+            del buckets[key]
+            if not buckets:
+                del self._buckets[guild_id]
+        geo = self._geo.get(guild_id)
+        if geo is not None:
+            geo.remove(event_id)
+
+    def _geo_index(self, guild_id):
+        geo = self._geo.get(guild_id)
+        if geo is None:
+            geo = self._geo[guild_id] = GridIndex()
+        return geo
+
+    def set_location(self, event_id, latitude, longitude):
+        """Attach coordinates resolved after the event was cached"""
+        event = self._events.get(event_id)
+        if event is None:
+            return
+        event['latitude'] = latitude
+        event['longitude'] = longitude
+        self._geo_index(event['guild_id']).add(event_id, latitude, longitude)
+
+    def adjust_counts(self, event_id, interested=0, connect=0):
+        """Apply a committed change in interest counters to the cached copy"""
+        event = self._events.get(event_id)
+        if event is None:
+            return
+        event['interested_count'] += interested
+        event['connect_count'] += connect
+        # One counter update per write, so one version bump, as trg_events_version does
+        event['version'] += 1
+        event.pop('entry', None)
+
+    async def reload(self, repo, event_ids):
+        """Re-read cached events whose rows were changed behind the cache, e.g. by a counter rebuild"""
+        for event_id in event_ids:
+            event = self._events.get(event_id)
+            if event is None:
+                continue
+            fresh = await repo.get_event(event['guild_id'], event_id)
+            if fresh is None:
+                self.remove(event_id)
+            else:
+                self.put(fresh)
+
+    def get(self, event_id):
+        """Return the cached event, or None (a miss) if it isn't upcoming or cached"""
+        self._evict_expired()
+        event = self._events.get(event_id) if self.loaded else None
+        if event is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return event
+
+    def bucket_keys(self, guild_id):
+        """The (event_type, event_size) pairs that have upcoming events in a guild"""
+        self._evict_expired()
+        return list(self._buckets.get(guild_id, ()))
+
+    def _bounds(self, bucket, start, end, after):
+        lo = 0 if start is None else bisect.bisect_left(bucket, (start,))
+        if after is not None:
+            lo = max(lo, bisect.bisect_right(bucket, after))
+        hi = len(bucket) if end is None else bisect.bisect_left(bucket, (end,))
+        return lo, hi
+
+    def count(self, guild_id, keys, start=None, end=None):
+        """Number of a guild's cached events in the given buckets with start <= event_time < end"""
+        buckets = self._buckets.get(guild_id, {})
+        total = 0
+        for key in keys:
+            bucket = buckets.get(key, [])
+            lo, hi = self._bounds(bucket, start, end, None)
+            total += max(hi - lo, 0)
+        return total
+
+    def iter_events(self, guild_id, keys, start=None, end=None, after=None):
+        """Yield a guild's events from the given buckets in (event_time, event_id) order
+
+        after is an exclusive (event_time, event_id) keyset cursor.
+        """
+        if not self.loaded:
+            self.misses += 1
+            return
+        self.hits += 1
+        buckets = self._buckets.get(guild_id, {})
+        runs = []
+        for key in keys:
+            bucket = buckets.get(key, [])
+            lo, hi = self._bounds(bucket, start, end, after)
+            if lo < hi:
+                runs.append(map(bucket.__getitem__, range(lo, hi)))
+        for _, event_id in heapq.merge(*runs):
+            yield self._events[event_id]
+
+    def near(self, guild_id, latitude, longitude, radius_miles):
+        """[(distance_miles, event)] for a guild's upcoming events within the radius, nearest first"""
+        self._evict_expired()
+        if not self.loaded:
+            self.misses += 1
+            return []
+        self.hits += 1
+        geo = self._geo.get(guild_id)
+        if geo is None:
+            return []
+        return [(distance, self._events[event_id])
+                for distance, event_id in geo.within(latitude, longitude, radius_miles)]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._events),
+            'guilds': len(self._buckets),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+event_cache = UpcomingEventCache()
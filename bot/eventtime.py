@@ -0,0 +1,68 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+# Events store event_time/created_at as integer epoch seconds (local wall clock)
+LEGACY_TIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M']
+
+def to_epoch(dt):
+    return int(dt.timestamp())
+
+def from_epoch(ts):
+    return datetime.fromtimestamp(ts)
+
+def now_epoch():
+    return int(time.time())
+
+def parse_legacy_time(value):
+    """Parse a TIMESTAMP string written by the pre-epoch schema"""
+    for fmt in LEGACY_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def format_event_time(ts):
+    """Render an epoch as the bot's YYYY-MM-DD HH;MM display format"""
+    return from_epoch(ts).strftime('%Y-%m-%d %H:%M').replace(':', ';')
+
+def day_bounds(date_str):
+    """Epoch range [start, end) covering a YYYY-MM-DD day"""
+    day = datetime.strptime(date_str, '%Y-%m-%d')
+    return to_epoch(day), to_epoch(day + timedelta(days=1))
+
+def duration_minutes(duration_str):
+    """Convert a parse_duration() string such as '2 hours' into minutes"""
+    if not duration_str:
+        return None
+    match = re.search(r'\d+', duration_str)
+    if not match:
+        return None
+    amount = int(match.group())
+    if 'hour' in duration_str:
+        return amount * 60
+    if 'min' in duration_str:
+        return amount
+    return None
+
+def parse_event_time(text, now=None):
+    """Parse 'HH;MM' (today) or 'YYYY-MM-DD HH;MM' into a local datetime
+
+    A time earlier today is moved to tomorrow. Returns (event_time, rolled_over)
+    and raises ValueError with a user-facing message for bad or past input.
+    """
+    now = now or datetime.now()
+    value = text.strip().replace(';', ':')
+    try:
+        event_time = datetime.strptime(value, '%Y-%m-%d %H:%M')
+    except ValueError:
+        try:
+            event_time = datetime.combine(now.date(), datetime.strptime(value, '%H:%M').time())
+        except ValueError:
+            raise ValueError('Invalid time format. Please use HH;MM for today, or YYYY-MM-DD HH;MM for specific date.')
+    if event_time >= now:
+        return event_time, False
+    if event_time.date() == now.date():
+        return event_time + timedelta(days=1), True
+    raise ValueError('Cannot schedule events in the past!')
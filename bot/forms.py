@@ -0,0 +1,124 @@
+import discord
+
+from outbound import outbound, NOTIFICATION
+from preferences import EVENT_TYPES, EVENT_SIZES, SIZE_ALIASES
+
+# Seconds a form stays usable after it is posted
+FORM_TIMEOUT = 300.0
+
+TYPE_OPTIONS = [discord.SelectOption(label=event_type.title(), value=event_type) for event_type in EVENT_TYPES]
+# Events store the short size name, preferences the full one
+SIZE_OPTIONS = [discord.SelectOption(label=size, value=alias) for alias, size in SIZE_ALIASES.items()]
+PREFERENCE_SIZE_OPTIONS = [discord.SelectOption(label=size, value=size) for size in EVENT_SIZES]
+
+class ScheduleModal(discord.ui.Modal, title='Schedule an event'):
+    """Free-text event fields, collected and submitted in one interaction
+
+    submit(interaction, modal) validates and saves the event, returning True
+    once it is saved; the type and size were already chosen from a select
+    menu or slash command option.
+    """
+
+    description = discord.ui.TextInput(label='Description', style=discord.TextStyle.paragraph, max_length=1000)
+    location = discord.ui.TextInput(label='Location', max_length=200)
+    time = discord.ui.TextInput(label='Time', placeholder='HH;MM for today, or YYYY-MM-DD HH;MM', max_length=16)
+    duration = discord.ui.TextInput(label='Duration', placeholder="e.g. '2 hours' or '30 minutes'", max_length=30)
+
+    def __init__(self, event_type, event_size, submit):
+        super().__init__(timeout=FORM_TIMEOUT)
+        self.event_type = event_type
+        self.event_size = event_size
+        self.submit = submit
+
+    async def on_submit(self, interaction: discord.Interaction):
+        await self.submit(interaction, self)
+
+class AuthorView(discord.ui.View):
+    """View whose components only respond to the member who opened it"""
+
+    def __init__(self, author_id, timeout=FORM_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.message = None
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await outbound.respond(interaction, "Only the person who ran this command can use this form.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            # Cosmetic, so it yields to anything a member is waiting on
+            await outbound.edit(self.message, lane=NOTIFICATION, view=self)
+        except discord.HTTPException:
+            pass
+
+class ScheduleView(AuthorView):
+    """!schedule form: pick type and size, then fill in the rest in a ScheduleModal"""
+
+    def __init__(self, author_id, submit):
+        super().__init__(author_id)
+        self.submit = submit
+        self.event_type = None
+        self.event_size = None
+
+    @discord.ui.select(placeholder='Event type', options=TYPE_OPTIONS)
+    async def type_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        self.event_type = select.values[0]
+        await outbound.respond_defer(interaction)
+
+    @discord.ui.select(placeholder='Event size', options=SIZE_OPTIONS)
+    async def size_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        self.event_size = select.values[0]
+        await outbound.respond_defer(interaction)
+
+    @discord.ui.button(label='Enter details', style=discord.ButtonStyle.primary)
+    async def details_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.event_type is None or self.event_size is None:
+            await outbound.respond(interaction, "Please pick an event type and size first.", ephemeral=True)
+            return
+        await outbound.respond_modal(interaction, ScheduleModal(self.event_type, self.event_size, self._submit))
+
+    async def _submit(self, interaction, modal):
+        # The event card replaces the form once the event is saved
+        if await self.submit(interaction, modal):
+            self.stop()
+            if self.message is not None:
+                try:
+                    await outbound.delete(self.message)
+                except discord.HTTPException:
+                    pass
+
+class PreferencesView(AuthorView):
+    """!setpreferences form: multi-select types and sizes, then save"""
+
+    def __init__(self, author_id, save):
+        super().__init__(author_id)
+        self.save = save
+        self.preferred_types = []
+        self.preferred_sizes = []
+
+    @discord.ui.select(placeholder='Preferred event types', options=TYPE_OPTIONS,
+                       min_values=1, max_values=len(TYPE_OPTIONS))
+    async def types_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        self.preferred_types = select.values
+        await outbound.respond_defer(interaction)
+
+    @discord.ui.select(placeholder='Preferred event sizes', options=PREFERENCE_SIZE_OPTIONS,
+                       min_values=1, max_values=len(PREFERENCE_SIZE_OPTIONS))
+    async def sizes_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        self.preferred_sizes = select.values
+        await outbound.respond_defer(interaction)
+
+    @discord.ui.button(label='Save', style=discord.ButtonStyle.success)
+    async def save_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not self.preferred_types or not self.preferred_sizes:
+            await outbound.respond(interaction, "Please pick at least one event type and one size.", ephemeral=True)
+            return
+        self.stop()
+        await self.save(interaction, self.preferred_types, self.preferred_sizes)
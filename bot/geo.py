@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.05
+CELL_DEGREES = 0.01        # Grid cell size, roughly 0.7 x 0.5 miles at mid latitudes
+
+def haversine_miles(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points, vectorized"""
+    lat1 = np.radians(lat)
+    lats = np.radians(lats)
+    dlat = lats - lat1
+    dlon = np.radians(lons) - np.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+class GridIndex:
+    """Uniform lat/lon grid of points for radius queries
+
+    Candidates come from the cells overlapping the query's bounding box, and
+    only those survivors get an exact (vectorized) haversine distance.
+    """
+
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells = {}
+        self._where = {}
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, key, lat, lon):
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._where[key] = cell
+
+    def remove(self, key):
+        cell = self._where.pop(key, None)
+        if cell is None:
+            return
+        points = self._cells[cell]
+        del points[key]
+        if not points:
+            del self._cells[cell]
+
+    def _candidate_cells(self, lat, lon, radius_miles):
+        lat_span = radius_miles / MILES_PER_DEGREE_LAT
+        # Longitude degrees shrink with latitude; clamp near the poles
+        lon_span = radius_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - lat_span, lon - lon_span)
+        lat_hi, lon_hi = self._cell(lat + lat_span, lon + lon_span)
+        box_cells = (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1)
+        if box_cells > len(self._cells):
+            # Sparse grid: cheaper to filter the occupied cells than walk the box
+            return [cell for cell in self._cells
+                    if lat_lo <= cell[0] <= lat_hi and lon_lo <= cell[1] <= lon_hi]
+        return [(i, j) for i in range(lat_lo, lat_hi + 1) for j in range(lon_lo, lon_hi + 1)
+                if (i, j) in self._cells]
+
+    def within(self, lat, lon, radius_miles):
+        """[(distance_miles, key)] for points within the radius, nearest first"""
+        keys = []
+        coords = []
+        for cell in self._candidate_cells(lat, lon, radius_miles):
+            points = self._cells[cell]
+            keys.extend(points)
+            coords.extend(points.values())
+        if not keys:
+            return []
+
+        coords = np.asarray(coords, dtype=np.float64)
+        distances = haversine_miles(lat, lon, coords[:, 0], coords[:, 1])
+        inside = np.nonzero(distances <= radius_miles)[0]
+        order = inside[np.argsort(distances[inside], kind='stable')]
+        return [(float(distances[i]), keys[i]) for i in order]
+
+    def __len__(self):
+        return len(self._where)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import time
+
+from geopy.geocoders import Nominatim
+
+from eventtime import now_epoch
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.json')
+CACHE_SIZE = 5000          # Geocode cache rows kept before LRU eviction
+NETWORK_TIMEOUT = 10.0
+NETWORK_INTERVAL = 1.0     # Nominatim's usage policy allows one request per second
+
+def normalize(query):
+    return ' '.join(query.lower().replace(',', ' ').split())
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Map every normalized building name and alias to its (lat, lon)
+
+    The file is a JSON list of {"name", "aliases", "latitude", "longitude"},
+    one entry per building on the bot's campus (the shipped file covers the
+    University of Minnesota Twin Cities). Aliases should be names members
+    actually type; generic ones like "Library" are better left to the network.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        places = json.load(f)
+    gazetteer = {}
+    for place in places:
+        coords = (place['latitude'], place['longitude'])
+        for name in [place['name']] + place.get('aliases', []):
+            gazetteer[normalize(name)] = coords
+    return gazetteer
+
+def nominatim_backend():
+    geolocator = Nominatim(user_agent='spacefinder-bot')
+
+    def geocode(query):
+        location = geolocator.geocode(query, timeout=NETWORK_TIMEOUT)
+        return (location.latitude, location.longitude) if location else None
+    return geocode
+
+class Geocoder:
+    """Resolve place names: offline gazetteer, then SQLite cache, then network
+
+    The network backend is a blocking callable query -> (lat, lon) | None.
+    It runs in a worker thread, one request at a time and spaced by
+    NETWORK_INTERVAL. Both found and not-found answers are cached, and the
+    least recently used cache rows are evicted beyond cache_size; a lookup
+    that fails (timeout, network error) resolves to None but is not cached,
+    so the place is tried again next time.
+    """
+
+    def __init__(self, db, gazetteer=None, backend=None, cache_size=CACHE_SIZE,
+                 network_interval=NETWORK_INTERVAL):
+        self.db = db
+        self.gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+        self.backend = backend
+        self.cache_size = cache_size
+        self.network_interval = network_interval
+        self._network_lock = asyncio.Lock()
+        self._last_network = 0.0
+        self._touches = set()
+        self.gazetteer_hits = 0
+        self.cache_hits = 0
+        self.network_lookups = 0
+        self.failures = 0
+
+    async def resolve(self, query):
+        key = normalize(query)
+        if not key:
+            return None
+
+        coords = self.gazetteer.get(key)
+        if coords is not None:
+            self.gazetteer_hits += 1
+            return coords
+
+        row = await self.db.fetchone('''
+            SELECT latitude, longitude FROM geocode_cache WHERE query = ?
+        ''', (key,))
+        if row is not None:
+            self.cache_hits += 1
+            # Refresh recency in the background; the answer doesn't depend on it
+            task = asyncio.create_task(self.db.execute('''
+                UPDATE geocode_cache SET last_used = ? WHERE query = ?
+            ''', (now_epoch(), key)))
+            self._touches.add(task)
+            task.add_done_callback(self._touches.discard)
+            return None if row[0] is None else (row[0], row[1])
+
+        answered, coords = await self._lookup_network(query)
+        if answered:
+            await self.db.write(_store, key, coords, self.cache_size)
+        return coords
+
+    async def _lookup_network(self, query):
+        """(answered, coords): answered is False when the backend failed rather than found nothing"""
+        if self.backend is None:
+            self.backend = nominatim_backend()
+        async with self._network_lock:
+            wait = self._last_network + self.network_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.network_lookups += 1
+            try:
+                return True, await asyncio.wait_for(asyncio.to_thread(self.backend, query), NETWORK_TIMEOUT)
+            except Exception:
+                self.failures += 1
+                return False, None
+            finally:
+                self._last_network = time.monotonic()
+
+    def stats(self):
+        total = self.gazetteer_hits + self.cache_hits + self.network_lookups
+        return {
+            'gazetteer_hits': self.gazetteer_hits,
+            'cache_hits': self.cache_hits,
+            'network_lookups': self.network_lookups,
+            'failures': self.failures,
+            'hit_rate': (self.gazetteer_hits + self.cache_hits) / total if total else 0.0,
+        }
+
+def _store(conn, key, coords, cache_size):
+    latitude, longitude = coords if coords else (None, None)
+    conn.execute('''
+        INSERT OR REPLACE INTO geocode_cache (query, latitude, longitude, last_used)
+        VALUES (?, ?, ?, ?)
+    ''', (key, latitude, longitude, now_epoch()))
+    conn.execute('''
+        DELETE FROM geocode_cache WHERE query IN (
+            SELECT query FROM geocode_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+    ''', (cache_size,))
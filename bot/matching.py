@@ -0,0 +1,270 @@
+import asyncio
+import random
+import time
+from collections import Counter
+
+from eventtime import now_epoch
+from preferences import canonical_size
+
+# Matching settings
+MATCH_INTERVAL = 300          # Seconds between matching passes
+MATCH_LEAD = 3 * 3600         # Groups are formed this many seconds before an event starts
+MATCH_BUDGET = 2.0            # CPU seconds one pass may spend planning groups
+CANDIDATE_GROUPS = 8          # Open groups compared when placing each participant
+HISTORY_LIMIT = 50            # Most recent past events/groups remembered per participant
+QUERY_CHUNK = 500             # User ids per IN (...) list
+SAVE_BATCH = 200              # Events whose groups are stored per write transaction
+
+# Target members per "Connect with Others" group, by event size
+GROUP_SIZES = {
+    'small (1-5)': 3,
+    'medium (6-15)': 4,
+    'large (16+)': 5,
+}
+DEFAULT_GROUP_SIZE = 4
+
+def group_size(event_size):
+    return GROUP_SIZES.get(canonical_size(event_size or ''), DEFAULT_GROUP_SIZE)
+
+def form_groups(participants, size, history, rng):
+    """Split participants into groups of about size members, avoiding repeat pairings
+
+    history maps a user to the set of past events and groups they were in;
+    two users sharing an entry have met before. Members go, most constrained
+    first, into whichever of CANDIDATE_GROUPS open groups they have met
+    fewest people in, so the cost per member is bounded however large the
+    event is. A lone participant gets no group.
+    """
+    if len(participants) < 2:
+        return []
+    count = max(1, round(len(participants) / size))
+    capacity = -(-len(participants) // count)
+    groups = [[] for _ in range(count)]
+    met = {}  # history entry -> Counter of groups holding someone with that entry
+
+    order = list(participants)
+    rng.shuffle(order)
+    order.sort(key=lambda user: -len(history.get(user, ())))
+    open_groups = list(range(count))
+    position = {g: g for g in open_groups}
+    for turn, user in enumerate(order):
+        past = history.get(user, ())
+        repeats = Counter()
+        for entry in past:
+            holders = met.get(entry)
+            if holders:
+                repeats.update(holders)
+        window = [open_groups[(turn + i) % len(open_groups)]
+                  for i in range(min(CANDIDATE_GROUPS, len(open_groups)))]
+        # Fewest repeat pairings, then the emptiest group
+        best = min(window, key=lambda g: (repeats[g], len(groups[g])))
+        groups[best].append(user)
+        for entry in past:
+            met.setdefault(entry, Counter())[best] += 1
+        if len(groups[best]) == capacity:
+            # Swap-remove so closing a group is O(1)
+            last = open_groups.pop()
+            if last != best:
+                open_groups[position[best]] = last
+                position[last] = position[best]
+
+    # Nobody is left on their own: fold singletons into the smallest real group
+    singles = [group[0] for group in groups if len(group) == 1]
+    groups = [group for group in groups if len(group) > 1]
+    for user in singles:
+        if groups:
+            min(groups, key=len).append(user)
+        else:
+            groups.append([user])
+    return [group for group in groups if len(group) > 1]
+
+def plan_matches(events, participants, history, deadline, seed=0):
+    """[(event_id, groups)] for as many events as fit before the deadline (a perf_counter time)
+
+    events are (event_id, guild_id, event_size) rows in the order to match
+    them; participants maps event_id to its wants-to-connect user ids and
+    history maps (guild_id, user_id) to that member's past events and groups.
+    """
+    plan = []
+    for event_id, guild_id, event_size in events:
+        if time.perf_counter() > deadline:
+            break
+        users = participants.get(event_id, [])
+        guild_history = {user: history.get((guild_id, user), ()) for user in users}
+        groups = form_groups(users, group_size(event_size), guild_history, random.Random(seed + event_id))
+        plan.append((event_id, groups))
+    return plan
+
+def due_events(conn, now, lead=MATCH_LEAD):
+    """Unmatched events starting within lead seconds that have enough members to group, soonest first
+
+    Events with fewer than two wants-to-connect members are left for a later
+    pass rather than marked matched, so people who press Connect after the
+    event enters the window are still grouped.
+    """
+    return conn.execute('''
+        SELECT event_id, guild_id, event_size
+        FROM events
+        WHERE event_time >= ? AND event_time < ? AND matched_at IS NULL AND guild_id IS NOT NULL
+              AND connect_count >= 2
+        ORDER BY event_time, event_id
+    ''', (now, now + lead)).fetchall()
+
+def connect_participants(conn, event_ids):
+    """{event_id: [user_id]} of members who pressed "Connect with Others", and {user_id: username}"""
+    participants = {}
+    usernames = {}
+    for i in range(0, len(event_ids), QUERY_CHUNK):
+        chunk = event_ids[i:i + QUERY_CHUNK]
+        for event_id, user_id, username in conn.execute(f'''
+            SELECT event_id, user_id, username FROM event_interests
+            WHERE event_id IN ({', '.join('?' * len(chunk))}) AND interested_in_connection
+            ORDER BY event_id, user_id
+        ''', chunk):
+            participants.setdefault(event_id, []).append(user_id)
+            usernames[user_id] = username
+    return participants, usernames
+
+PAST_PAIRINGS = {
+    'event': '''
+        SELECT user_id, event_id FROM event_interests_archive
+        WHERE guild_id = ? AND user_id IN ({})
+        ORDER BY event_id DESC
+    ''',
+    'group': '''
+        SELECT user_id, group_id FROM connect_group_members
+        WHERE guild_id = ? AND user_id IN ({})
+        ORDER BY group_id DESC
+    ''',
+}
+
+def pairing_history(conn, members):
+    """{(guild_id, user_id): set} of the archived events and connect groups each member was in
+
+    members is an iterable of (guild_id, user_id). Entries are ('event', id)
+    or ('group', id), the HISTORY_LIMIT most recent of each kind per member.
+    """
+    by_guild = {}
+    for guild_id, user_id in members:
+        by_guild.setdefault(guild_id, []).append(user_id)
+
+    history = {}
+    for guild_id, user_ids in by_guild.items():
+        for i in range(0, len(user_ids), QUERY_CHUNK):
+            chunk = user_ids[i:i + QUERY_CHUNK]
+            for kind, query in PAST_PAIRINGS.items():
+                taken = Counter()
+                for user_id, key in conn.execute(query.format(', '.join('?' * len(chunk))),
+                                                 [guild_id, *chunk]):
+                    if taken[user_id] < HISTORY_LIMIT:
+                        taken[user_id] += 1
+                        history.setdefault((guild_id, user_id), set()).add((kind, key))
+    return history
+
+def save_groups(conn, plan, guilds, now):
+    """Store planned groups and mark events that got groups matched; returns [(group_id, event_id, members)]"""
+    saved = []
+    for event_id, groups in plan:
+        guild_id = guilds[event_id]
+        for members in groups:
+            c = conn.execute('''
+                INSERT INTO connect_groups (guild_id, event_id, formed_at) VALUES (?, ?, ?)
+            ''', (guild_id, event_id, now))
+            conn.executemany('''
+                INSERT INTO connect_group_members (group_id, guild_id, user_id) VALUES (?, ?, ?)
+            ''', [(c.lastrowid, guild_id, user_id) for user_id in members])
+            saved.append((c.lastrowid, event_id, members))
+    conn.executemany('UPDATE events SET matched_at = ? WHERE event_id = ?',
+                     [(now, event_id) for event_id, groups in plan if groups])
+    return saved
+
+def group_for(conn, guild_id, event_id, user_id):
+    """[(user_id, username)] of a member's connect group for an event, or None"""
+    row = conn.execute('''
+        SELECT g.group_id FROM connect_groups g
+        JOIN connect_group_members m ON m.group_id = g.group_id
+        WHERE g.guild_id = ? AND g.event_id = ? AND m.user_id = ?
+    ''', (guild_id, event_id, user_id)).fetchone()
+    if not row:
+        return None
+    return conn.execute('''
+        SELECT m.user_id, COALESCE(i.username, m.user_id)
+        FROM connect_group_members m
+        LEFT JOIN event_interests i ON i.event_id = ? AND i.user_id = m.user_id
+        WHERE m.group_id = ?
+        ORDER BY m.user_id
+    ''', (event_id, row[0])).fetchall()
+
+class Matcher:
+    """Background task that forms "Connect with Others" groups shortly before events start
+
+    Every MATCH_INTERVAL it plans groups for all unmatched events starting
+    within MATCH_LEAD that have at least two members to group, in one pass
+    and off the event loop. Planning stops at MATCH_BUDGET; events it didn't
+    reach stay unmatched for the next pass. Groups are stored through the
+    single writer in SAVE_BATCH-event transactions, then handed to
+    announce(guild_id, event_id, [(group_id, [(user_id, username)])]).
+    """
+
+    def __init__(self, db, announce, interval=MATCH_INTERVAL, budget=MATCH_BUDGET):
+        self.db = db
+        self.announce = announce
+        self.interval = interval
+        self.budget = budget
+        self._task = None
+        self.groups = 0
+        self.matched_events = 0
+        self.deferred_events = 0
+        self.passes = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f'Matching pass failed: {e}')
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self, now=None):
+        """Match every due event that fits in the budget; returns the number of groups formed"""
+        now = now_epoch() if now is None else now
+        events = await self.db.run(due_events, now)
+        if not events:
+            return 0
+        participants, usernames = await self.db.run(connect_participants, [row[0] for row in events])
+        guilds = {event_id: guild_id for event_id, guild_id, _ in events}
+        members = {(guilds[event_id], user_id) for event_id, users in participants.items() for user_id in users}
+        history = await self.db.run(pairing_history, members)
+
+        deadline = time.perf_counter() + self.budget
+        plan = await asyncio.to_thread(plan_matches, events, participants, history, deadline)
+        saved = []
+        for i in range(0, len(plan), SAVE_BATCH):
+            saved += await self.db.write(save_groups, plan[i:i + SAVE_BATCH], guilds, now)
+
+        self.passes += 1
+        self.matched_events += sum(1 for _, groups in plan if groups)
+        self.deferred_events += len(events) - len(plan)
+        self.groups += len(saved)
+        if saved:
+            print(f'Formed {len(saved)} connect groups for {len(plan)} events')
+
+        by_event = {}
+        for group_id, event_id, group in saved:
+            by_event.setdefault(event_id, []).append(
+                (group_id, [(user_id, usernames.get(user_id, user_id)) for user_id in group]))
+        for event_id, groups in by_event.items():
+            await self.announce(guilds[event_id], event_id, groups)
+        return len(saved)
+
+    def stats(self):
+        return {
+            'groups': self.groups,
+            'matched_events': self.matched_events,
+            'deferred_events': self.deferred_events,
+            'passes': self.passes,
+        }
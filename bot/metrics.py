@@ -0,0 +1,147 @@
+import contextvars
+import time
+from contextlib import asynccontextmanager
+
+# Latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'spacefinder'
+
+class Timing:
+    """DB and Discord API time spent by one command or button invocation"""
+
+    __slots__ = ('start', 'db', 'api')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.api = 0.0
+
+_current = contextvars.ContextVar('spacefinder_timing', default=None)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+class Registry:
+    """Per-handler latency histograms, call/error counts and DB vs API time
+
+    Updated and rendered on the bot's event loop.
+    """
+
+    def __init__(self):
+        self.latency = {}
+        self.calls = {}
+        self.errors = {}
+        self.db_seconds = {}
+        self.api_seconds = {}
+        self._gauges = []
+
+    def observe(self, kind, name, timing, failed):
+        key = (kind, name)
+        elapsed = time.perf_counter() - timing.start
+        self.latency.setdefault(key, Histogram()).observe(elapsed)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if failed:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        self.db_seconds[key] = self.db_seconds.get(key, 0.0) + timing.db
+        self.api_seconds[key] = self.api_seconds.get(key, 0.0) + timing.api
+
+    def register_gauge(self, name, help_text, fn):
+        """Expose fn() -> number (or {label: number}) as a gauge"""
+        self._gauges.append((name, help_text, fn))
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        name = f'{PREFIX}_handler_latency_seconds'
+        lines.append(f'# HELP {name} Command and button handler latency')
+        lines.append(f'# TYPE {name} histogram')
+        for (kind, handler), hist in sorted(self.latency.items()):
+            labels = f'kind="{kind}",handler="{handler}"'
+            for bound, count in zip(BUCKETS, hist.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{{labels}}} {hist.total}')
+            lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+        for metric, help_text, values in [
+            ('handler_calls_total', 'Handler invocations', self.calls),
+            ('handler_errors_total', 'Handler invocations that raised', self.errors),
+            ('handler_db_seconds_total', 'Time handlers spent waiting on the database', self.db_seconds),
+            ('handler_discord_api_seconds_total', 'Time handlers spent in Discord API calls', self.api_seconds),
+        ]:
+            name = f'{PREFIX}_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (kind, handler), value in sorted(values.items()):
+                lines.append(f'{name}{{kind="{kind}",handler="{handler}"}} {value}')
+
+        for metric, help_text, fn in self._gauges:
+            name = f'{PREFIX}_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            value = fn()
+            if isinstance(value, dict):
+                for label, v in sorted(value.items()):
+                    lines.append(f'{name}{{name="{label}"}} {v}')
+            else:
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+def begin():
+    """Start timing the current command/button; returns the Timing"""
+    timing = Timing()
+    _current.set(timing)
+    return timing
+
+def finish(kind, name, timing, failed=False):
+    registry.observe(kind, name, timing, failed)
+    _current.set(None)
+
+def detach():
+    """Stop attributing time in this task to whatever invocation spawned it"""
+    _current.set(None)
+
+def add_db_time(seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.db += seconds
+
+def add_api_time(seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.api += seconds
+
+@asynccontextmanager
+async def track(kind, name):
+    """Time a handler that isn't a prefix command, e.g. a button callback"""
+    timing = begin()
+    failed = False
+    try:
+        yield timing
+    except Exception:
+        failed = True
+        raise
+    finally:
+        finish(kind, name, timing, failed)
+
+def timed_api(request):
+    """Wrap an async Discord HTTP request method so its time is attributed"""
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            add_api_time(time.perf_counter() - start)
+    return wrapper
@@ -0,0 +1,468 @@
+import json
+
+from eventtime import parse_legacy_time, to_epoch, duration_minutes
+from preferences import encode_types, encode_sizes
+from search import register_functions
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Never edit a released migration; append a new one instead.
+
+def _initial_schema(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_id TEXT,
+            creator_name TEXT,
+            description TEXT,
+            event_type TEXT,
+            event_size TEXT,
+            location TEXT,
+            event_time TIMESTAMP,
+            duration TEXT,
+            created_at TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS event_interests (
+            interest_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            user_id TEXT,
+            username TEXT,
+            interested_in_connection BOOLEAN,
+            FOREIGN KEY (event_id) REFERENCES events (event_id),
+            UNIQUE(event_id, user_id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id TEXT PRIMARY KEY,
+            username TEXT,
+            preferred_types TEXT,
+            preferred_sizes TEXT,
+            notification_enabled BOOLEAN
+        )
+    ''')
+
+def _epoch_event_times(c):
+    # Rebuild events with integer epoch times and a parsed duration
+    c.execute('''
+        CREATE TABLE events_new (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_id TEXT,
+            creator_name TEXT,
+            description TEXT,
+            event_type TEXT,
+            event_size TEXT,
+            location TEXT,
+            event_time INTEGER NOT NULL,
+            duration TEXT,
+            duration_minutes INTEGER,
+            created_at INTEGER
+        )
+    ''')
+
+    rows = c.execute('''
+        SELECT event_id, creator_id, creator_name, description, event_type,
+               event_size, location, event_time, duration, created_at
+        FROM events
+    ''').fetchall()
+    converted = []
+    unreadable = []
+    for row in rows:
+        event_time = parse_legacy_time(str(row[7]))
+        created_at = parse_legacy_time(str(row[9])) if row[9] else None
+        if event_time is None:
+            unreadable.append(row)
+            continue
+        converted.append(row[:7] + (
+            to_epoch(event_time),
+            row[8],
+            duration_minutes(row[8]),
+            to_epoch(created_at) if created_at else None,
+        ))
+    c.executemany('''
+        INSERT INTO events_new
+        (event_id, creator_id, creator_name, description, event_type, event_size,
+         location, event_time, duration, duration_minutes, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', converted)
+    _quarantine_events(c, unreadable)
+    if rows:
+        # Never hand a quarantined event's id to a new event
+        c.execute("DELETE FROM sqlite_sequence WHERE name = 'events_new'")
+        c.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('events_new', ?)",
+                  (max(row[0] for row in rows),))
+
+    c.execute('DROP TABLE events')
+    c.execute('ALTER TABLE events_new RENAME TO events')
+    c.execute('CREATE INDEX idx_events_time ON events(event_time)')
+    c.execute('CREATE INDEX idx_interests_user ON event_interests(user_id)')
+    c.execute('CREATE INDEX idx_interests_event ON event_interests(event_id)')
+
+def _quarantine_events(c, rows):
+    """Move legacy events whose times can't be parsed, and their interests, out of the live tables
+
+    Nothing can display an event without a time, but the rows are user data:
+    they are kept as-is in events_quarantine and event_interests_quarantine
+    for an admin to fix or drop by hand.
+    """
+    c.execute('''
+        CREATE TABLE events_quarantine (
+            event_id INTEGER PRIMARY KEY,
+            creator_id TEXT,
+            creator_name TEXT,
+            description TEXT,
+            event_type TEXT,
+            event_size TEXT,
+            location TEXT,
+            event_time TEXT,
+            duration TEXT,
+            created_at TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE event_interests_quarantine (
+            interest_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            user_id TEXT,
+            username TEXT,
+            interested_in_connection BOOLEAN
+        )
+    ''')
+    if not rows:
+        return
+    c.executemany('INSERT INTO events_quarantine VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    c.execute('''
+        INSERT INTO event_interests_quarantine
+        SELECT interest_id, event_id, user_id, username, interested_in_connection
+        FROM event_interests WHERE event_id IN (SELECT event_id FROM events_quarantine)
+    ''')
+    c.execute('DELETE FROM event_interests WHERE event_id IN (SELECT event_id FROM events_quarantine)')
+    print(f'Quarantined {len(rows)} events with unreadable times in events_quarantine: '
+          + ', '.join(f'ID {row[0]} ({row[7]!r})' for row in rows))
+
+def _interest_counters(c):
+    # Per-event counters maintained by triggers in the same transaction as the write
+    c.execute('ALTER TABLE events ADD COLUMN interested_count INTEGER NOT NULL DEFAULT 0')
+    c.execute('ALTER TABLE events ADD COLUMN connect_count INTEGER NOT NULL DEFAULT 0')
+    c.execute('''
+        CREATE TRIGGER trg_interest_insert AFTER INSERT ON event_interests
+        BEGIN
+            UPDATE events
+            SET interested_count = interested_count + 1,
+                connect_count = connect_count + (NEW.interested_in_connection != 0)
+            WHERE event_id = NEW.event_id;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_interest_delete AFTER DELETE ON event_interests
+        BEGIN
+            UPDATE events
+            SET interested_count = interested_count - 1,
+                connect_count = connect_count - (OLD.interested_in_connection != 0)
+            WHERE event_id = OLD.event_id;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_interest_toggle AFTER UPDATE OF interested_in_connection ON event_interests
+        BEGIN
+            UPDATE events
+            SET connect_count = connect_count
+                - (OLD.interested_in_connection != 0)
+                + (NEW.interested_in_connection != 0)
+            WHERE event_id = NEW.event_id;
+        END
+    ''')
+    c.execute('''
+        UPDATE events SET
+            interested_count = (SELECT COUNT(*) FROM event_interests i
+                                WHERE i.event_id = events.event_id),
+            connect_count = (SELECT COUNT(*) FROM event_interests i
+                             WHERE i.event_id = events.event_id
+                             AND i.interested_in_connection != 0)
+    ''')
+
+def _preference_bitmasks(c):
+    # Rebuild user_preferences with integer bitmasks instead of JSON lists
+    c.execute('''
+        CREATE TABLE user_preferences_new (
+            user_id TEXT PRIMARY KEY,
+            username TEXT,
+            preferred_types INTEGER NOT NULL DEFAULT 0,
+            preferred_sizes INTEGER NOT NULL DEFAULT 0,
+            notification_enabled BOOLEAN
+        )
+    ''')
+    rows = c.execute('''
+        SELECT user_id, username, preferred_types, preferred_sizes, notification_enabled
+        FROM user_preferences
+    ''').fetchall()
+    c.executemany('''
+        INSERT INTO user_preferences_new VALUES (?, ?, ?, ?, ?)
+    ''', [
+        (user_id, username,
+         encode_types(json.loads(types_json or '[]')),
+         encode_sizes(json.loads(sizes_json or '[]')),
+         enabled)
+        for user_id, username, types_json, sizes_json, enabled in rows
+    ])
+    c.execute('DROP TABLE user_preferences')
+    c.execute('ALTER TABLE user_preferences_new RENAME TO user_preferences')
+
+def _event_coordinates(c):
+    c.execute('ALTER TABLE events ADD COLUMN latitude REAL')
+    c.execute('ALTER TABLE events ADD COLUMN longitude REAL')
+
+def _geocode_cache(c):
+    c.execute('''
+        CREATE TABLE geocode_cache (
+            query TEXT PRIMARY KEY,
+            latitude REAL,
+            longitude REAL,
+            last_used INTEGER NOT NULL
+        )
+    ''')
+    c.execute('CREATE INDEX idx_geocode_cache_last_used ON geocode_cache(last_used)')
+
+def _event_search(c):
+    c.execute('''
+        CREATE VIRTUAL TABLE events_fts USING fts5(
+            description, location,
+            content='events', content_rowid='event_id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_events_fts_insert AFTER INSERT ON events
+        BEGIN
+            INSERT INTO events_fts (rowid, description, location)
+            VALUES (NEW.event_id, NEW.description, NEW.location);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_events_fts_delete AFTER DELETE ON events
+        BEGIN
+            INSERT INTO events_fts (events_fts, rowid, description, location)
+            VALUES ('delete', OLD.event_id, OLD.description, OLD.location);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_events_fts_update AFTER UPDATE OF description, location ON events
+        BEGIN
+            INSERT INTO events_fts (events_fts, rowid, description, location)
+            VALUES ('delete', OLD.event_id, OLD.description, OLD.location);
+            INSERT INTO events_fts (rowid, description, location)
+            VALUES (NEW.event_id, NEW.description, NEW.location);
+        END
+    ''')
+    c.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+def _archive_tables(c):
+    c.execute('''
+        CREATE TABLE events_archive (
+            event_id INTEGER PRIMARY KEY,
+            creator_id TEXT,
+            creator_name TEXT,
+            description TEXT,
+            event_type TEXT,
+            event_size TEXT,
+            location TEXT,
+            event_time INTEGER NOT NULL,
+            duration TEXT,
+            duration_minutes INTEGER,
+            created_at INTEGER,
+            interested_count INTEGER NOT NULL DEFAULT 0,
+            connect_count INTEGER NOT NULL DEFAULT 0,
+            latitude REAL,
+            longitude REAL,
+            archived_at INTEGER NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE event_interests_archive (
+            interest_id INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            user_id TEXT,
+            username TEXT,
+            interested_in_connection BOOLEAN
+        )
+    ''')
+    c.execute('CREATE INDEX idx_events_archive_creator ON events_archive(creator_id, event_time)')
+    c.execute('CREATE INDEX idx_interests_archive_user ON event_interests_archive(user_id)')
+    c.execute('CREATE INDEX idx_interests_archive_event ON event_interests_archive(event_id)')
+
+# Tables partitioned by guild in migration 9
+GUILD_TABLES = ('events', 'event_interests', 'user_preferences', 'events_archive', 'event_interests_archive')
+
+def _guild_partitioning(c):
+    # Existing rows keep guild_id NULL until adopt_unscoped_rows() assigns them
+    for table in ('events', 'event_interests', 'events_archive', 'event_interests_archive'):
+        c.execute(f'ALTER TABLE {table} ADD COLUMN guild_id TEXT')
+
+    # Preferences are per guild: rebuild with a (guild_id, user_id) key
+    c.execute('''
+        CREATE TABLE user_preferences_new (
+            guild_id TEXT,
+            user_id TEXT NOT NULL,
+            username TEXT,
+            preferred_types INTEGER NOT NULL DEFAULT 0,
+            preferred_sizes INTEGER NOT NULL DEFAULT 0,
+            notification_enabled BOOLEAN,
+            PRIMARY KEY (guild_id, user_id)
+        )
+    ''')
+    c.execute('''
+        INSERT INTO user_preferences_new
+        (user_id, username, preferred_types, preferred_sizes, notification_enabled)
+        SELECT user_id, username, preferred_types, preferred_sizes, notification_enabled
+        FROM user_preferences
+    ''')
+    c.execute('DROP TABLE user_preferences')
+    c.execute('ALTER TABLE user_preferences_new RENAME TO user_preferences')
+
+    # Per-guild lookups lead on guild_id; idx_events_time stays for archival and cache loads
+    c.execute('CREATE INDEX idx_events_guild_time ON events(guild_id, event_time)')
+    c.execute('DROP INDEX idx_interests_user')
+    c.execute('CREATE INDEX idx_interests_guild_user ON event_interests(guild_id, user_id)')
+    c.execute('DROP INDEX idx_events_archive_creator')
+    c.execute('CREATE INDEX idx_events_archive_guild_creator ON events_archive(guild_id, creator_id, event_time)')
+    c.execute('DROP INDEX idx_interests_archive_user')
+    c.execute('CREATE INDEX idx_interests_archive_guild_user ON event_interests_archive(guild_id, user_id)')
+
+    # Rebuild search as a contentless index of guild-qualified words ('g<guild>_<word>'),
+    # so a search only ever reads its own guild's doclists. search_words() is the Python
+    # function search.register_functions() installs on every connection.
+    for trigger in ('trg_events_fts_insert', 'trg_events_fts_delete', 'trg_events_fts_update'):
+        c.execute(f'DROP TRIGGER {trigger}')
+    c.execute('DROP TABLE events_fts')
+    c.execute('''
+        CREATE VIRTUAL TABLE events_fts USING fts5(
+            description, location,
+            content='',
+            tokenize="unicode61 remove_diacritics 2 tokenchars '_'"
+        )
+    ''')
+    index_row = '''
+        INSERT INTO events_fts (rowid, description, location)
+        SELECT NEW.event_id, search_words(NEW.guild_id, NEW.description),
+               search_words(NEW.guild_id, NEW.location)
+        WHERE NEW.guild_id IS NOT NULL;
+    '''
+    # A contentless index can only forget a row given exactly the words it indexed
+    unindex_row = '''
+        INSERT INTO events_fts (events_fts, rowid, description, location)
+        SELECT 'delete', OLD.event_id, search_words(OLD.guild_id, OLD.description),
+               search_words(OLD.guild_id, OLD.location)
+        WHERE OLD.guild_id IS NOT NULL;
+    '''
+    c.execute(f'''
+        CREATE TRIGGER trg_events_fts_insert AFTER INSERT ON events
+        BEGIN {index_row} END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER trg_events_fts_delete AFTER DELETE ON events
+        BEGIN {unindex_row} END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER trg_events_fts_update AFTER UPDATE OF description, location, guild_id ON events
+        BEGIN {unindex_row} {index_row} END
+    ''')
+
+def _event_versions(c):
+    # Bumped whenever anything shown on an event card changes, so rendered cards can be cached
+    c.execute('ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+    c.execute('''
+        CREATE TRIGGER trg_events_version
+        AFTER UPDATE OF creator_name, description, event_type, event_size, location, event_time,
+                        duration, interested_count, connect_count ON events
+        BEGIN
+            UPDATE events SET version = version + 1 WHERE event_id = NEW.event_id;
+        END
+    ''')
+
+def _connect_groups(c):
+    # "Connect with Others" groups formed by matching.Matcher, kept as pairing history
+    c.execute('ALTER TABLE events ADD COLUMN matched_at INTEGER')
+    c.execute('''
+        CREATE TABLE connect_groups (
+            group_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id TEXT NOT NULL,
+            event_id INTEGER NOT NULL,
+            formed_at INTEGER NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE connect_group_members (
+            group_id INTEGER NOT NULL,
+            guild_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (group_id, user_id)
+        )
+    ''')
+    c.execute('CREATE INDEX idx_connect_groups_event ON connect_groups(guild_id, event_id)')
+    c.execute('CREATE INDEX idx_group_members_guild_user ON connect_group_members(guild_id, user_id)')
+
+def _event_reminders(c):
+    # Set once reminders.ReminderScheduler has claimed an event's reminder, and per member
+    # once they have been reminded, so late registrants can still be reminded exactly once
+    c.execute('ALTER TABLE events ADD COLUMN reminded_at INTEGER')
+    c.execute('ALTER TABLE event_interests ADD COLUMN reminded_at INTEGER')
+
+def _bot_state(c):
+    # Small key/value settings the bot keeps between restarts, e.g. the synced slash command set
+    c.execute('''
+        CREATE TABLE bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+MIGRATIONS = [
+    (1, _initial_schema),
+    (2, _epoch_event_times),
+    (3, _interest_counters),
+    (4, _preference_bitmasks),
+    (5, _event_coordinates),
+    (6, _geocode_cache),
+    (7, _event_search),
+    (8, _archive_tables),
+    (9, _guild_partitioning),
+    (10, _event_versions),
+    (11, _connect_groups),
+    (12, _event_reminders),
+    (13, _bot_state),
+]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Upgrade the database in place to the latest schema version
+
+    Each migration runs in its own transaction together with the
+    user_version bump, so a failure leaves the file at the last good version.
+    Also installs the SQL functions the schema's triggers call on conn.
+    """
+    register_functions(conn)
+    current = schema_version(conn)
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute('BEGIN')
+        try:
+            migration(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+def adopt_unscoped_rows(conn, guild_id):
+    """Assign rows written before guild partitioning to guild_id; returns rows updated"""
+    updated = 0
+    for table in GUILD_TABLES:
+        updated += conn.execute(f'UPDATE {table} SET guild_id = ? WHERE guild_id IS NULL', (guild_id,)).rowcount
+    return updated
@@ -0,0 +1,71 @@
+import asyncio
+
+import discord
+
+from outbound import outbound, NOTIFICATION
+
+# Fan-out settings
+QUEUE_SIZE = 100          # Pending fan-out jobs before new ones are dropped
+SEND_INTERVAL = 0.5       # Seconds between DMs, well under Discord's DM rate limit
+RATE_LIMIT_BACKOFF = 5.0  # Extra pause after a 429 slips through
+
+class DMQueue:
+    """Bounded queue of notification fan-outs delivered by one background worker
+
+    enqueue() never blocks: command handlers hand off a whole fan-out job and
+    return immediately, and the worker paces individual DMs.
+    """
+
+    def __init__(self, bot, maxsize=QUEUE_SIZE, interval=SEND_INTERVAL):
+        self.bot = bot
+        self.interval = interval
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._worker = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def enqueue(self, user_ids, content, embed=None):
+        """Queue one DM to each user; returns False if the queue is full"""
+        try:
+            self._queue.put_nowait((list(user_ids), content, embed))
+        except asyncio.QueueFull:
+            self.dropped += len(user_ids)
+            print(f'Notification queue full, dropped fan-out to {len(user_ids)} users')
+            return False
+        return True
+
+    async def put(self, user_ids, content, embed=None):
+        """Like enqueue(), but wait for room instead of dropping; for background jobs"""
+        await self._queue.put((list(user_ids), content, embed))
+
+    def depth(self):
+        return self._queue.qsize()
+
+    async def _run(self):
+        while True:
+            user_ids, content, embed = await self._queue.get()
+            try:
+                for user_id in user_ids:
+                    await self._send(user_id, content, embed)
+                    await asyncio.sleep(self.interval)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, user_id, content, embed):
+        try:
+            user = self.bot.get_user(int(user_id)) or await outbound.fetch_user(self.bot, int(user_id))
+            await outbound.send(user, content, lane=NOTIFICATION, embed=embed)
+            self.sent += 1
+        except discord.Forbidden:
+            # User has DMs closed to the bot
+            self.failed += 1
+        except discord.HTTPException as e:
+            self.failed += 1
+            if e.status == 429:
+                await asyncio.sleep(RATE_LIMIT_BACKOFF)
+            print(f'Failed to notify user {user_id}: {e}')
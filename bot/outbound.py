@@ -0,0 +1,306 @@
+import asyncio
+import contextvars
+import functools
+import re
+import time
+from collections import OrderedDict, deque
+
+import aiohttp
+
+# Outbound settings
+MAX_IN_FLIGHT = 8         # Discord API calls running at once
+GLOBAL_RATE = 50          # Requests per second across all routes, Discord's global limit
+DEFAULT_LIMIT = 5         # Requests allowed on a route before Discord has described its limit
+DEFAULT_WINDOW = 5.0      # Seconds in that first guessed window
+MAX_BUCKETS = 5000        # Route buckets kept before idle ones are forgotten
+
+# Priority lanes, served strictly in this order
+INTERACTION = 0           # Interaction responses: must be acknowledged within 3 seconds
+COMMAND = 1               # Replies to prefix commands and edits a member is waiting on
+NOTIFICATION = 2          # DMs and other background sends
+LANES = {INTERACTION: 'interaction', COMMAND: 'command', NOTIFICATION: 'notification'}
+
+_API_PREFIX = re.compile(r'^/api/v\d+')
+# Snowflakes after anything but a major parameter share their route's bucket
+_MINOR_ID = re.compile(r'(?<!/channels)(?<!/guilds)(?<!/webhooks)/\d{15,}')
+_REACTION = re.compile(r'/reactions/[^/]+')
+
+def route(method, path):
+    """Rate-limit route for a request, e.g. 'POST /channels/123/messages'
+
+    Discord limits each route per major parameter (channel, guild or
+    webhook); message ids and emoji don't get a bucket of their own.
+    """
+    path = _API_PREFIX.sub('', path)
+    path = _REACTION.sub('/reactions/{emoji}', path)
+    return f'{method} {_MINOR_ID.sub("/{id}", path)}'
+
+def _channel_id(destination):
+    """Channel a context, message, channel or user sends into; None for an unopened DM"""
+    channel = getattr(destination, 'channel', None)
+    if channel is None and hasattr(destination, 'dm_channel'):
+        channel = destination.dm_channel
+        if channel is None:
+            return None
+    return (channel or destination).id
+
+class TokenBucket:
+    """Requests left in one route's current rate-limit window
+
+    Starts from a guess and is corrected from Discord's X-RateLimit headers
+    on every response, so requests wait here instead of drawing a 429.
+    """
+
+    __slots__ = ('limit', 'window', 'remaining', 'reset_at', 'in_flight')
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.in_flight = 0   # Requests on this route awaiting a response; kept by Outbound
+
+    def ready_at(self, now):
+        """When the next request may go; now if it may go immediately"""
+        if self.remaining > 0 or now >= self.reset_at:
+            return now
+        return self.reset_at
+
+    def take(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        self.remaining -= 1
+
+    def update(self, limit, remaining, reset_after, now):
+        """Adopt the window Discord reported; later requests still in flight are already spent"""
+        self.limit = limit
+        self.remaining = max(remaining - max(self.in_flight - 1, 0), 0)
+        self.reset_at = now + reset_after
+
+    def block(self, until):
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, until)
+
+class Job:
+    __slots__ = ('call', 'kwargs', 'route', 'key', 'future', 'context')
+
+    def __init__(self, call, kwargs, route, key):
+        self.call = call
+        self.kwargs = kwargs
+        self.route = route
+        self.key = key
+        self.future = asyncio.get_running_loop().create_future()
+        # Run in the caller's context so metrics attribute API time to its handler
+        self.context = contextvars.copy_context()
+
+class Outbound:
+    """Single dispatch queue for every Discord API call the bot makes
+
+    Calls wait in priority lanes (interaction responses, then command
+    replies, then notifications) and are released by one worker as their
+    route's TokenBucket and the global bucket allow, at most MAX_IN_FLIGHT
+    at a time. A route that is out of requests holds back only its own
+    calls; the rest of its lane goes ahead. Interaction responses wait on
+    neither bucket nor for a free slot, only behind other responses.
+    Buckets learn each route's real limit from the response headers seen by
+    trace_config(), which must be passed to the bot as http_trace.
+
+    A queued edit to a message absorbs later edits to the same message, so
+    a burst of edits costs one request carrying the latest fields.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, global_rate=GLOBAL_RATE):
+        self.max_in_flight = max_in_flight
+        self._lanes = [OrderedDict() for _ in LANES]  # lane -> route -> deque of Jobs
+        self._buckets = {}
+        self._global = TokenBucket(global_rate, 1.0)
+        self._edits = {}  # message id -> queued edit Job
+        self._wake = asyncio.Event()
+        self._worker = None
+        self._in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    # Calls handlers make instead of talking to discord.py directly
+
+    async def send(self, destination, content=None, lane=COMMAND, **kwargs):
+        """destination.send(content, **kwargs) for a context, channel or user"""
+        channel_id = _channel_id(destination)
+        path = f'/channels/{channel_id}/messages' if channel_id else f'/users/{destination.id}/dm'
+        return await self._submit(destination.send, dict(kwargs, content=content), route('POST', path), lane)
+
+    async def edit(self, message, lane=COMMAND, **fields):
+        """message.edit(**fields), merged into an edit of the same message still queued"""
+        job = self._edits.get(message.id)
+        if job is not None:
+            job.kwargs.update(fields)
+            self.coalesced += 1
+            return await asyncio.shield(job.future)
+        path = f'/channels/{message.channel.id}/messages/{message.id}'
+        return await self._submit(message.edit, fields, route('PATCH', path), lane, key=message.id)
+
+    async def delete(self, message, lane=COMMAND):
+        path = f'/channels/{message.channel.id}/messages/{message.id}'
+        return await self._submit(message.delete, {}, route('DELETE', path), lane)
+
+    async def fetch_user(self, bot, user_id, lane=NOTIFICATION):
+        return await self._submit(functools.partial(bot.fetch_user, user_id), {},
+                                  route('GET', f'/users/{user_id}'), lane)
+
+    async def sync_commands(self, tree, lane=COMMAND):
+        """tree.sync(): a global slash command sync, on the application's commands route"""
+        path = f'/applications/{tree.client.application_id}/commands'
+        return await self._submit(tree.sync, {}, route('PUT', path), lane)
+
+    # Interaction responses go through the interaction's own webhook, which
+    # has no shared route bucket and is exempt from the global limit
+
+    async def respond(self, interaction, content=None, **kwargs):
+        return await self._submit(interaction.response.send_message, dict(kwargs, content=content), None, INTERACTION)
+
+    async def respond_edit(self, interaction, **fields):
+        return await self._submit(interaction.response.edit_message, fields, None, INTERACTION)
+
+    async def respond_modal(self, interaction, modal):
+        return await self._submit(functools.partial(interaction.response.send_modal, modal), {}, None, INTERACTION)
+
+    async def respond_defer(self, interaction, **kwargs):
+        return await self._submit(interaction.response.defer, kwargs, None, INTERACTION)
+
+    async def original_response(self, interaction):
+        return await self._submit(interaction.original_response, {}, None, INTERACTION)
+
+    async def _submit(self, call, kwargs, route_key, lane, key=None):
+        self.start()
+        job = Job(call, kwargs, route_key, key)
+        self._lanes[lane].setdefault(route_key, deque()).append(job)
+        if key is not None:
+            self._edits[key] = job
+        self._wake.set()
+        # Once queued the call is made even if the caller goes away
+        return await asyncio.shield(job.future)
+
+    # Rate-limit headers
+
+    def trace_config(self):
+        """aiohttp trace that feeds every REST response's rate-limit headers back into the buckets"""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._on_request_end)
+        return trace
+
+    async def _on_request_end(self, session, context, params):
+        self.observe(params.method, params.url.path, params.response.status, params.response.headers)
+
+    def observe(self, method, path, status, headers, now=None):
+        now = time.monotonic() if now is None else now
+        if status == 429:
+            self.rate_limited += 1
+            until = now + float(headers.get('Retry-After', 1))
+            if headers.get('X-RateLimit-Global') == 'true':
+                self._global.block(until)
+            else:
+                self._bucket(route(method, path), now).block(until)
+            self._wake.set()
+            return
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        self._bucket(route(method, path), now).update(
+            int(headers.get('X-RateLimit-Limit', 1)), int(headers['X-RateLimit-Remaining']),
+            float(headers.get('X-RateLimit-Reset-After', 0)), now)
+
+    def _bucket(self, route_key, now):
+        bucket = self._buckets.get(route_key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._buckets = {r: b for r, b in self._buckets.items() if b.in_flight or now < b.reset_at}
+            bucket = self._buckets[route_key] = TokenBucket(DEFAULT_LIMIT, DEFAULT_WINDOW)
+        return bucket
+
+    # Dispatch
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            delay = self._dispatch(time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, now):
+        """Start every call that may go now; returns seconds until one might (None: until woken)"""
+        while True:
+            # Interaction responses may exceed MAX_IN_FLIGHT rather than wait out a slow DM
+            lanes = self._lanes if self._in_flight < self.max_in_flight else self._lanes[:INTERACTION + 1]
+            job, delay = self._next(now, lanes)
+            if job is None:
+                return delay
+            bucket = None
+            if job.route is not None:
+                bucket = self._bucket(job.route, now)
+                bucket.take(now)
+                bucket.in_flight += 1
+                # The global bucket only counts requests; it never sees per-route headers
+                self._global.take(now)
+            if self._edits.get(job.key) is job:
+                del self._edits[job.key]
+            self._in_flight += 1
+            job.context.run(asyncio.create_task, self._call(job, bucket))
+
+    def _next(self, now, lanes):
+        """Pop the first job, by lane, whose route may send now"""
+        global_at = self._global.ready_at(now)
+        wait = None
+        for lane in lanes:
+            for route_key, jobs in lane.items():
+                ready_at = now
+                if route_key is not None:
+                    ready_at = max(self._bucket(route_key, now).ready_at(now), global_at)
+                if ready_at <= now:
+                    job = jobs.popleft()
+                    if jobs:
+                        # Round-robin between routes in the same lane
+                        lane.move_to_end(route_key)
+                    else:
+                        del lane[route_key]
+                    return job, None
+                wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    async def _call(self, job, bucket):
+        try:
+            result = await job.call(**job.kwargs)
+        except Exception as e:
+            self.failed += 1
+            job.future.set_exception(e)
+        else:
+            self.sent += 1
+            job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            if bucket is not None:
+                bucket.in_flight -= 1
+            self._wake.set()
+
+    def depth(self):
+        """Calls waiting in each lane"""
+        return {name: sum(len(jobs) for jobs in self._lanes[lane].values()) for lane, name in LANES.items()}
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'rate_limited': self.rate_limited,
+            'in_flight': self._in_flight,
+            'routes': len(self._buckets),
+        }
+
+outbound = Outbound()
@@ -0,0 +1,73 @@
+import discord
+
+import metrics
+from outbound import outbound, NOTIFICATION
+
+class Paginator(discord.ui.View):
+    """Button paginator that edits one message in place
+
+    get_page(index) is an async callable returning the Embed for a page.
+    Each page turn is a single interaction response that edits the message,
+    and clicks are routed by discord.py's view store instead of a wait_for
+    listener per user.
+    """
+
+    def __init__(self, author_id, get_page, total_pages, timeout=120.0):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.get_page = get_page
+        self.total_pages = total_pages
+        self.current_page = 0
+        self.message = None
+        self._update_buttons()
+
+    def clamp(self, total_pages):
+        """Shrink the page count, e.g. from get_page when events expired since it was computed"""
+        self.total_pages = max(min(self.total_pages, total_pages), 1)
+
+    def _update_buttons(self):
+        self.previous_button.disabled = self.current_page == 0
+        self.next_button.disabled = self.current_page >= self.total_pages - 1
+
+    async def start(self, ctx):
+        embed = await self.get_page(0)
+        self._update_buttons()
+        if self.total_pages <= 1:
+            self.stop()
+            self.message = await outbound.send(ctx, embed=embed)
+        else:
+            self.message = await outbound.send(ctx, embed=embed, view=self)
+        return self.message
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await outbound.respond(interaction, "Only the person who ran this command can change pages.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction, page):
+        async with metrics.track('button', 'paginator'):
+            self.current_page = page
+            embed = await self.get_page(page)
+            # After get_page, which may have clamped total_pages
+            self._update_buttons()
+            await outbound.respond_edit(interaction, embed=embed, view=self)
+
+    @discord.ui.button(label="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, max(self.current_page - 1, 0))
+
+    @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, min(self.current_page + 1, self.total_pages - 1))
+
+    async def on_timeout(self):
+        # Grey out the buttons once nobody can page any more
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await outbound.edit(self.message, lane=NOTIFICATION, view=self)
+        except discord.HTTPException:
+            pass
@@ -0,0 +1,97 @@
+from preferences import TYPE_BITS, SIZE_BITS, type_bit, size_bit
+
+class PreferenceIndex:
+    """Inverted index of notification preferences: type bit -> users, size bit -> users
+
+    Only users with notifications enabled are indexed. Kept current by
+    !setpreferences, !clearpreferences and !notifications so matching an
+    event never has to scan user_preferences.
+    """
+
+    def __init__(self):
+        self.by_type = {}
+        self.by_size = {}
+        self._users = {}
+
+    def load(self, rows):
+        """Build from (user_id, preferred_types, preferred_sizes, notification_enabled) mask rows"""
+        self.by_type.clear()
+        self.by_size.clear()
+        self._users.clear()
+        for user_id, types_mask, sizes_mask, enabled in rows:
+            self.set(user_id, types_mask, sizes_mask, bool(enabled))
+
+    def set(self, user_id, types_mask, sizes_mask, enabled=True):
+        self.remove(user_id)
+        if not enabled:
+            return
+        self._users[user_id] = (types_mask, sizes_mask)
+        for bit in TYPE_BITS.values():
+            if types_mask & bit:
+                self.by_type.setdefault(bit, set()).add(user_id)
+        for bit in SIZE_BITS.values():
+            if sizes_mask & bit:
+                self.by_size.setdefault(bit, set()).add(user_id)
+
+    def remove(self, user_id):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+        types_mask, sizes_mask = entry
+        for bit in TYPE_BITS.values():
+            if types_mask & bit:
+                self._discard(self.by_type, bit, user_id)
+        for bit in SIZE_BITS.values():
+            if sizes_mask & bit:
+                self._discard(self.by_size, bit, user_id)
+
+    def _discard(self, index, key, user_id):
+        users = index.get(key)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del index[key]
+
+    def match(self, event_type, event_size):
+        """Users whose preferred types and sizes both include this event's"""
+        type_users = self.by_type.get(type_bit(event_type), set())
+        size_users = self.by_size.get(size_bit(event_size), set())
+        if len(type_users) > len(size_users):
+            type_users, size_users = size_users, type_users
+        return type_users & size_users
+
+    def __len__(self):
+        return len(self._users)
+
+
+class GuildPreferenceIndex:
+    """One PreferenceIndex per guild, so notifications stay inside the guild"""
+
+    def __init__(self):
+        self._guilds = {}
+
+    def load(self, rows):
+        """Build from (guild_id, user_id, preferred_types, preferred_sizes, notification_enabled) rows"""
+        self._guilds.clear()
+        for guild_id, user_id, types_mask, sizes_mask, enabled in rows:
+            self.set(guild_id, user_id, types_mask, sizes_mask, bool(enabled))
+
+    def set(self, guild_id, user_id, types_mask, sizes_mask, enabled=True):
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = PreferenceIndex()
+        index.set(user_id, types_mask, sizes_mask, enabled)
+
+    def remove(self, guild_id, user_id):
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(user_id)
+
+    def match(self, guild_id, event_type, event_size):
+        index = self._guilds.get(guild_id)
+        return index.match(event_type, event_size) if index is not None else set()
+
+    def __len__(self):
+        return sum(len(index) for index in self._guilds.values())
+
+preference_index = GuildPreferenceIndex()
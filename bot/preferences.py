@@ -0,0 +1,53 @@
+# Event categories and their preference bitmask encoding.
+# Bit positions are stored in user_preferences, so only ever append to these lists.
+EVENT_TYPES = ['social', 'academic', 'sports', 'gaming', 'study', 'food', 'other']
+EVENT_SIZES = ['small (1-5)', 'medium (6-15)', 'large (16+)']
+
+# Short size names stored on events by !schedule
+SIZE_ALIASES = {
+    'small': 'small (1-5)',
+    'medium': 'medium (6-15)',
+    'large': 'large (16+)',
+}
+
+TYPE_BITS = {event_type: 1 << i for i, event_type in enumerate(EVENT_TYPES)}
+SIZE_BITS = {size: 1 << i for i, size in enumerate(EVENT_SIZES)}
+
+def canonical_size(size):
+    size = size.lower().strip()
+    return SIZE_ALIASES.get(size, size)
+
+def type_bit(event_type):
+    """Bit for an event type; 0 for free-text types outside EVENT_TYPES"""
+    return TYPE_BITS.get(event_type.lower().strip(), 0)
+
+def size_bit(event_size):
+    return SIZE_BITS.get(canonical_size(event_size), 0)
+
+def encode_types(types):
+    mask = 0
+    for event_type in types:
+        mask |= type_bit(event_type)
+    return mask
+
+def encode_sizes(sizes):
+    mask = 0
+    for size in sizes:
+        mask |= size_bit(size)
+    return mask
+
+def decode_types(mask):
+    return [event_type for event_type, bit in TYPE_BITS.items() if mask & bit]
+
+def decode_sizes(mask):
+    return [size for size, bit in SIZE_BITS.items() if mask & bit]
+
+def preference_match(event_type, event_size, types_mask, sizes_mask):
+    """1 = type and size match, 2 = either matches, 3 = neither"""
+    type_match = type_bit(event_type) & types_mask
+    size_match = size_bit(event_size) & sizes_mask
+    if type_match and size_match:
+        return 1
+    if type_match or size_match:
+        return 2
+    return 3
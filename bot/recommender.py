@@ -0,0 +1,152 @@
+import numpy as np
+
+# Events suggested by !recommended
+RECOMMENDATIONS = 10
+
+INTERACTIONS_QUERY = '''
+    SELECT guild_id, user_id, event_id FROM event_interests WHERE guild_id IS NOT NULL
+    UNION ALL
+    SELECT guild_id, user_id, event_id FROM event_interests_archive WHERE guild_id IS NOT NULL
+'''
+
+def load_interactions(conn):
+    """(guild_id, user_id, event_id) for every live and archived interest"""
+    return conn.execute(INTERACTIONS_QUERY).fetchall()
+
+class InteractionMatrix:
+    """Sparse user x event matrix of "I'm Interested!" clicks for one guild
+
+    Stored as adjacency lists in both directions (row -> columns and
+    column -> rows), so a click or cancellation is an O(1) append or a short
+    list removal and the matrix never needs rebuilding. Archived events stay
+    in the matrix: what members went to is the signal.
+
+    Item-item cosine similarity is never materialized. A user's score for
+    event j, sum over their events i of |U_i & U_j| / sqrt(|U_i| |U_j|), is
+    computed as two vectorized sparse products: weight every co-interested
+    user by the events they share with the user, then sum those weights
+    over each co-interested user's events.
+    """
+
+    def __init__(self):
+        self._rows = {}       # user_id -> row
+        self._columns = {}    # event_id -> column
+        self._event_ids = []  # column -> event_id
+        self._items = []      # row -> [column]
+        self._users = []      # column -> [row]
+        self._counts = np.zeros(16)  # column -> number of interested users
+
+    def _row(self, user_id):
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._rows[user_id] = len(self._items)
+            self._items.append([])
+        return row
+
+    def _column(self, event_id):
+        column = self._columns.get(event_id)
+        if column is None:
+            column = self._columns[event_id] = len(self._users)
+            self._event_ids.append(event_id)
+            self._users.append([])
+            if column == len(self._counts):
+                self._counts = np.concatenate([self._counts, np.zeros(len(self._counts))])
+        return column
+
+    def add(self, user_id, event_id):
+        row, column = self._row(user_id), self._column(event_id)
+        if column in self._items[row]:
+            return
+        self._items[row].append(column)
+        self._users[column].append(row)
+        self._counts[column] += 1
+
+    def remove(self, user_id, event_id):
+        row, column = self._rows.get(user_id), self._columns.get(event_id)
+        if row is None or column is None or column not in self._items[row]:
+            return
+        self._items[row].remove(column)
+        self._users[column].remove(row)
+        self._counts[column] -= 1
+
+    def recommend(self, user_id, candidates, limit=RECOMMENDATIONS):
+        """[(score, event_id)] for the best candidate events the user hasn't joined, best first"""
+        row = self._rows.get(user_id)
+        if row is None or not self._items[row]:
+            return []
+        items = np.array(self._items[row])
+        columns = len(self._users)
+
+        # Users who share an event with this one, weighted by 1/sqrt(|U_i|) per shared event i
+        neighbours = [self._users[i] for i in items]
+        weights = np.bincount(
+            np.fromiter((r for users in neighbours for r in users), dtype=np.int64),
+            weights=np.repeat(1 / np.sqrt(self._counts[items]), [len(users) for users in neighbours]),
+            minlength=len(self._items),
+        )
+        weights[row] = 0
+        similar = np.flatnonzero(weights)
+        if not len(similar):
+            return []
+
+        # Spread each neighbour's weight over the events they're interested in
+        their_items = [self._items[r] for r in similar]
+        scores = np.bincount(
+            np.fromiter((c for cols in their_items for c in cols), dtype=np.int64),
+            weights=np.repeat(weights[similar], [len(cols) for cols in their_items]),
+            minlength=columns,
+        )
+        scores[items] = 0
+
+        known = [self._columns[event_id] for event_id in candidates if event_id in self._columns]
+        if not known:
+            return []
+        known = np.array(known)
+        candidate_scores = scores[known] / np.sqrt(np.maximum(self._counts[known], 1))
+        top = np.flatnonzero(candidate_scores)
+        if len(top) > limit:
+            top = top[np.argpartition(-candidate_scores[top], limit - 1)[:limit]]
+        # Best score first, ties to the lower event_id
+        event_ids = np.array([self._event_ids[c] for c in known[top]])
+        top = top[np.lexsort((event_ids, -candidate_scores[top]))]
+        return [(float(candidate_scores[i]), self._event_ids[known[i]]) for i in top]
+
+    def __len__(self):
+        return int(self._counts.sum())
+
+class Recommender:
+    """One InteractionMatrix per guild, so recommendations stay inside the guild"""
+
+    def __init__(self):
+        self._guilds = {}
+
+    def load(self, rows):
+        """Build from (guild_id, user_id, event_id) rows"""
+        self._guilds.clear()
+        for guild_id, user_id, event_id in rows:
+            self.add(guild_id, user_id, event_id)
+
+    def add(self, guild_id, user_id, event_id):
+        matrix = self._guilds.get(guild_id)
+        if matrix is None:
+            matrix = self._guilds[guild_id] = InteractionMatrix()
+        matrix.add(user_id, event_id)
+
+    def remove(self, guild_id, user_id, event_id):
+        matrix = self._guilds.get(guild_id)
+        if matrix is not None:
+            matrix.remove(user_id, event_id)
+
+    def recommend(self, guild_id, user_id, candidates, limit=RECOMMENDATIONS):
+        matrix = self._guilds.get(guild_id)
+        if matrix is None:
+            return []
+        return matrix.recommend(user_id, candidates, limit)
+
+    def stats(self):
+        return {
+            'guilds': len(self._guilds),
+            'interactions': sum(len(matrix) for matrix in self._guilds.values()),
+        }
+
+recommender = Recommender()
@@ -0,0 +1,157 @@
+import asyncio
+import heapq
+
+from eventtime import now_epoch
+
+# Reminder settings
+REMINDER_LEAD = 3600      # Seconds before an event starts that interested members are reminded
+REMINDER_TICK = 5         # Reminders due within this many seconds of each other go out together
+MAX_SLEEP = 300           # Longest the scheduler sleeps without rechecking the clock
+QUERY_CHUNK = 500         # Event ids per IN (...) list
+
+def pending_reminders(conn, now):
+    """(event_id, event_time) for every event that hasn't started or reached its reminder yet"""
+    return conn.execute('''
+        SELECT event_id, event_time FROM events
+        WHERE reminded_at IS NULL AND event_time > ?
+    ''', (now,)).fetchall()
+
+def claim_reminders(conn, entries, now):
+    """Mark reminders sent and return {event_id: [user_id]} of who to remind
+
+    entries are the (event_id, event_time) pairs popped from the heap. This
+    runs as one write, and each interest is marked as it is claimed, so every
+    member is reminded once per event even across restarts and re-arms;
+    events that already started or moved are skipped.
+    """
+    scheduled = dict(entries)
+    ids = list(scheduled)
+    due = []
+    for i in range(0, len(ids), QUERY_CHUNK):
+        chunk = ids[i:i + QUERY_CHUNK]
+        for event_id, event_time in conn.execute(f'''
+            SELECT event_id, event_time FROM events
+            WHERE event_id IN ({', '.join('?' * len(chunk))}) AND event_time > ?
+        ''', chunk + [now]):
+            if event_time == scheduled[event_id]:
+                due.append(event_id)
+    if not due:
+        return {}
+
+    conn.executemany('UPDATE events SET reminded_at = ? WHERE event_id = ? AND reminded_at IS NULL',
+                     [(now, event_id) for event_id in due])
+    recipients = {}
+    for i in range(0, len(due), QUERY_CHUNK):
+        chunk = due[i:i + QUERY_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        for event_id, user_id in conn.execute(f'''
+            SELECT event_id, user_id FROM event_interests
+            WHERE event_id IN ({placeholders}) AND reminded_at IS NULL
+            ORDER BY event_id, user_id
+        ''', chunk):
+            recipients.setdefault(event_id, []).append(user_id)
+        conn.execute(f'''
+            UPDATE event_interests SET reminded_at = ?
+            WHERE event_id IN ({placeholders}) AND reminded_at IS NULL
+        ''', [now] + chunk)
+    return recipients
+
+class ReminderScheduler:
+    """Single coroutine that reminds interested members REMINDER_LEAD before events
+
+    Holds one min-heap entry per event, keyed on event_time - REMINDER_LEAD,
+    rather than a task per (event, user); who to remind is read when the
+    reminder fires, so interests added or cancelled meanwhile are respected.
+    Everything due within the same REMINDER_TICK is claimed in one write and
+    each member gets a single DM covering all of their events in that tick,
+    through deliver(user_ids, event_ids) once per distinct set of events.
+
+    The heap is rebuilt from the events table by load(), so reminders
+    survive restarts; event_interests.reminded_at keeps any member from
+    being reminded twice. A member who registers after an event's reminder
+    went out (always the case for events created less than the lead ahead)
+    re-arms it through interest_added() and is reminded on the next tick.
+    """
+
+    def __init__(self, db, deliver, lead=REMINDER_LEAD, tick=REMINDER_TICK):
+        self.db = db
+        self.deliver = deliver
+        self.lead = lead
+        self.tick = tick
+        self._heap = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self.sent = 0
+        self.batches = 0
+
+    async def load(self):
+        """Rebuild the heap from the database (on_ready)"""
+        rows = await self.db.run(pending_reminders, now_epoch())
+        self._heap = [(event_time - self.lead, event_id, event_time) for event_id, event_time in rows]
+        heapq.heapify(self._heap)
+        self._wake.set()
+
+    def schedule(self, event_id, event_time):
+        """Add a newly created event; the scheduler wakes if it is now the earliest"""
+        entry = (event_time - self.lead, event_id, event_time)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake.set()
+
+    def interest_added(self, event_id, event_time, now=None):
+        """Re-arm an event whose reminder already went out, so a member registering now is reminded too"""
+        now = now_epoch() if now is None else now
+        if event_time - self.lead <= now < event_time:
+            self.schedule(event_id, event_time)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.fire_due(now_epoch())
+            except Exception as e:
+                print(f'Sending reminders failed: {e}')
+            delay = MAX_SLEEP
+            if self._heap:
+                delay = min(max(self._heap[0][0] - now_epoch(), 0), MAX_SLEEP)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def pop_due(self, now):
+        """Remove and return [(event_id, event_time)] for reminders due by now + tick"""
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.tick:
+            _, event_id, event_time = heapq.heappop(self._heap)
+            due.append((event_id, event_time))
+        return due
+
+    async def fire_due(self, now):
+        """Send every reminder due in this tick; returns the number of members reminded"""
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        recipients = await self.db.write(claim_reminders, due, now)
+
+        # One DM per member, listing all of their events due in this tick
+        events_by_user = {}
+        for event_id, user_ids in recipients.items():
+            for user_id in user_ids:
+                events_by_user.setdefault(user_id, []).append(event_id)
+        users_by_events = {}
+        for user_id, event_ids in events_by_user.items():
+            users_by_events.setdefault(tuple(event_ids), []).append(user_id)
+        for event_ids, user_ids in users_by_events.items():
+            await self.deliver(user_ids, list(event_ids))
+
+        self.sent += len(events_by_user)
+        self.batches += 1
+        return len(events_by_user)
+
+    def stats(self):
+        return {'pending': len(self._heap), 'sent': self.sent, 'batches': self.batches}
@@ -0,0 +1,399 @@
+import bisect
+import sqlite3
+from abc import ABC, abstractmethod
+
+# Columns of an event as handed to commands and the upcoming-events cache
+EVENT_COLUMNS = ('event_id', 'creator_name', 'description', 'event_type', 'event_size',
+                 'location', 'event_time', 'duration', 'interested_count', 'connect_count',
+                 'latitude', 'longitude', 'guild_id', 'version')
+
+# Fields create_event() expects; the repository assigns event_id
+NEW_EVENT_FIELDS = ('guild_id', 'creator_id', 'creator_name', 'description', 'event_type', 'event_size',
+                    'location', 'event_time', 'duration', 'duration_minutes', 'created_at')
+
+class Repository(ABC):
+    """Storage for events, interests and preferences
+
+    Commands only talk to storage through these coroutines, so the backend can
+    be swapped: SqliteRepository is the bot's database, MemoryRepository keeps
+    everything in indexed dicts for benchmarks and as a read replica. Guild
+    and user ids are strings, events are dicts of EVENT_COLUMNS, and lists
+    come back in a fully specified order so both backends agree exactly.
+    """
+
+    # Events
+    @abstractmethod
+    async def create_event(self, event):
+        """Store a dict of NEW_EVENT_FIELDS; returns the new event_id"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_event(self, guild_id, event_id):
+        """The event, or None if it doesn't exist in this guild"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upcoming_events(self, now):
+        """Every guild's events with event_time >= now, by (event_time, event_id)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_event_location(self, event_id, latitude, longitude):
+        raise NotImplementedError
+
+    # Interests
+    @abstractmethod
+    async def add_interest(self, event_id, user_id, username):
+        """True if registered, False if already registered, None if the event is gone"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def toggle_connection(self, event_id, user_id):
+        """Flip the connect flag; returns the new flag, or None if not registered"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def remove_interest(self, event_id, user_id):
+        """Delete an interest; returns its connect flag, or None if not registered"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def interested_users(self, event_id):
+        """[(username, wants_connection)] by (username, user_id)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def user_interests(self, guild_id, user_id, now):
+        """[(event, wants_connection)] for a member's upcoming events, by (event_time, event_id)"""
+        raise NotImplementedError
+
+    # Preferences
+    @abstractmethod
+    async def get_preferences(self, guild_id, user_id):
+        """(types_mask, sizes_mask, notification_enabled) or None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_preferences(self, guild_id, user_id, username, types_mask, sizes_mask):
+        """Insert or replace a member's preferences, with notifications on"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_notifications(self, guild_id, user_id, enabled):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_preferences(self, guild_id, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def all_preferences(self):
+        """[(guild_id, user_id, types_mask, sizes_mask, notification_enabled)] by (guild_id, user_id)"""
+        raise NotImplementedError
+
+def insert_interest(conn, event_id, user_id, username):
+    c = conn.cursor()
+
+    # Cards stay in chat after their event is archived
+    c.execute('SELECT guild_id FROM events WHERE event_id = ?', (event_id,))
+    event = c.fetchone()
+    if not event:
+        return None
+
+    # Check if user is already interested
+    c.execute('''
+        SELECT * FROM event_interests
+        WHERE event_id = ? AND user_id = ?
+    ''', (event_id, user_id))
+
+    if c.fetchone():
+        return False
+
+    # Register new interest
+    c.execute('''
+        INSERT INTO event_interests (event_id, user_id, username, interested_in_connection, guild_id)
+        VALUES (?, ?, ?, FALSE, ?)
+    ''', (event_id, user_id, username, event[0]))
+    return True
+
+def toggle_connection(conn, event_id, user_id):
+    c = conn.cursor()
+    c.execute('''
+        UPDATE event_interests
+        SET interested_in_connection = NOT interested_in_connection
+        WHERE event_id = ? AND user_id = ?
+    ''', (event_id, user_id))
+    if not c.rowcount:
+        return None
+
+    c.execute('''
+        SELECT interested_in_connection FROM event_interests
+        WHERE event_id = ? AND user_id = ?
+    ''', (event_id, user_id))
+    return bool(c.fetchone()[0])
+
+def delete_interest(conn, event_id, user_id):
+    """Delete an interest row, returning its connection flag (None if absent)"""
+    c = conn.cursor()
+    c.execute('''
+        SELECT interested_in_connection FROM event_interests
+        WHERE event_id = ? AND user_id = ?
+    ''', (event_id, user_id))
+    row = c.fetchone()
+    if not row:
+        return None
+
+    c.execute('''
+        DELETE FROM event_interests
+        WHERE event_id = ? AND user_id = ?
+    ''', (event_id, user_id))
+    return bool(row[0])
+
+def _event(row):
+    return dict(zip(EVENT_COLUMNS, row))
+
+class SqliteRepository(Repository):
+    """Repository backed by the bot's SQLite database (see database.Database)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def create_event(self, event):
+        event_id, _ = await self.db.execute(f'''
+            INSERT INTO events ({', '.join(NEW_EVENT_FIELDS)})
+            VALUES ({', '.join('?' * len(NEW_EVENT_FIELDS))})
+        ''', tuple(event[field] for field in NEW_EVENT_FIELDS))
+        return event_id
+
+    async def get_event(self, guild_id, event_id):
+        row = await self.db.fetchone(f'''
+            SELECT {', '.join(EVENT_COLUMNS)}
+            FROM events
+            WHERE event_id = ? AND guild_id = ?
+        ''', (event_id, guild_id))
+        return _event(row) if row else None
+
+    async def upcoming_events(self, now):
+        rows = await self.db.fetchall(f'''
+            SELECT {', '.join(EVENT_COLUMNS)}
+            FROM events
+            WHERE event_time >= ?
+            ORDER BY event_time, event_id
+        ''', (now,))
+        return [_event(row) for row in rows]
+
+    async def set_event_location(self, event_id, latitude, longitude):
+        await self.db.execute('''
+            UPDATE events SET latitude = ?, longitude = ? WHERE event_id = ?
+        ''', (latitude, longitude, event_id))
+
+    async def add_interest(self, event_id, user_id, username):
+        try:
+            return await self.db.write(insert_interest, event_id, user_id, username)
+        except sqlite3.IntegrityError:
+            # Lost a race with a concurrent click by the same user
+            return False
+
+    async def toggle_connection(self, event_id, user_id):
+        return await self.db.write(toggle_connection, event_id, user_id)
+
+    async def remove_interest(self, event_id, user_id):
+        return await self.db.write(delete_interest, event_id, user_id)
+
+    async def interested_users(self, event_id):
+        rows = await self.db.fetchall('''
+            SELECT username, interested_in_connection
+            FROM event_interests
+            WHERE event_id = ?
+            ORDER BY username, user_id
+        ''', (event_id,))
+        return [(username, bool(wants_connection)) for username, wants_connection in rows]
+
+    async def user_interests(self, guild_id, user_id, now):
+        rows = await self.db.fetchall(f'''
+            SELECT {', '.join('e.' + column for column in EVENT_COLUMNS)}, i.interested_in_connection
+            FROM events e
+            JOIN event_interests i ON e.event_id = i.event_id
+            WHERE i.guild_id = ? AND i.user_id = ? AND e.event_time >= ?
+            ORDER BY e.event_time, e.event_id
+        ''', (guild_id, user_id, now))
+        return [(_event(row[:-1]), bool(row[-1])) for row in rows]
+
+    async def get_preferences(self, guild_id, user_id):
+        row = await self.db.fetchone('''
+            SELECT preferred_types, preferred_sizes, notification_enabled
+            FROM user_preferences
+            WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        return (row[0], row[1], bool(row[2])) if row else None
+
+    async def set_preferences(self, guild_id, user_id, username, types_mask, sizes_mask):
+        await self.db.execute('''
+            INSERT OR REPLACE INTO user_preferences
+            (guild_id, user_id, username, preferred_types, preferred_sizes, notification_enabled)
+            VALUES (?, ?, ?, ?, ?, TRUE)
+        ''', (guild_id, user_id, username, types_mask, sizes_mask))
+
+    async def set_notifications(self, guild_id, user_id, enabled):
+        await self.db.execute('''
+            UPDATE user_preferences SET notification_enabled = ? WHERE guild_id = ? AND user_id = ?
+        ''', (enabled, guild_id, user_id))
+
+    async def delete_preferences(self, guild_id, user_id):
+        await self.db.execute('DELETE FROM user_preferences WHERE guild_id = ? AND user_id = ?',
+                              (guild_id, user_id))
+
+    async def all_preferences(self):
+        rows = await self.db.fetchall('''
+            SELECT guild_id, user_id, preferred_types, preferred_sizes, notification_enabled
+            FROM user_preferences
+            ORDER BY guild_id, user_id
+        ''')
+        return [(guild_id, user_id, types_mask, sizes_mask, bool(enabled))
+                for guild_id, user_id, types_mask, sizes_mask, enabled in rows]
+
+class MemoryRepository(Repository):
+    """Repository held in process memory
+
+    Events are kept by id and in one (event_time, event_id) sorted list;
+    interests are indexed both by event and by (guild_id, user_id); counters
+    and versions are maintained the way the SQLite triggers maintain them.
+    """
+
+    def __init__(self):
+        self._events = {}          # event_id -> stored event (NEW_EVENT_FIELDS + counters)
+        self._by_time = []         # sorted (event_time, event_id)
+        self._interests = {}       # event_id -> {user_id: [username, wants_connection]}
+        self._by_member = {}       # (guild_id, user_id) -> {event_id}
+        self._preferences = {}     # (guild_id, user_id) -> [username, types_mask, sizes_mask, enabled]
+        self._next_event_id = 1
+
+    @classmethod
+    def from_sqlite(cls, conn):
+        """Snapshot a migrated SQLite database, e.g. to serve reads from memory"""
+        repo = cls()
+        versions = {}
+        for row in conn.execute(f'''
+            SELECT event_id, {', '.join(NEW_EVENT_FIELDS)}, latitude, longitude, version FROM events
+        '''):
+            event = dict(zip(('event_id',) + NEW_EVENT_FIELDS + ('latitude', 'longitude', 'version'), row))
+            versions[event['event_id']] = event.pop('version')
+            repo._store_event(event)
+        for event_id, user_id, username, wants_connection in conn.execute('''
+            SELECT event_id, user_id, username, interested_in_connection FROM event_interests
+        '''):
+            if event_id in repo._events:
+                repo._add_interest(event_id, user_id, username, bool(wants_connection))
+        # Loading interests replays their counter updates; keep the stored versions
+        for event_id, version in versions.items():
+            repo._events[event_id]['version'] = version
+        for guild_id, user_id, username, types_mask, sizes_mask, enabled in conn.execute('''
+            SELECT guild_id, user_id, username, preferred_types, preferred_sizes, notification_enabled
+            FROM user_preferences
+        '''):
+            repo._preferences[(guild_id, user_id)] = [username, types_mask, sizes_mask, bool(enabled)]
+        return repo
+
+    def _store_event(self, event):
+        event.setdefault('latitude', None)
+        event.setdefault('longitude', None)
+        event['interested_count'] = 0
+        event['connect_count'] = 0
+        event['version'] = 0
+        self._events[event['event_id']] = event
+        bisect.insort(self._by_time, (event['event_time'], event['event_id']))
+        self._interests[event['event_id']] = {}
+        self._next_event_id = max(self._next_event_id, event['event_id'] + 1)
+
+    def _add_interest(self, event_id, user_id, username, wants_connection):
+        event = self._events[event_id]
+        self._interests[event_id][user_id] = [username, wants_connection]
+        self._by_member.setdefault((event['guild_id'], user_id), set()).add(event_id)
+        event['interested_count'] += 1
+        event['connect_count'] += wants_connection
+        event['version'] += 1
+
+    def _view(self, event):
+        return {column: event[column] for column in EVENT_COLUMNS}
+
+    async def create_event(self, event):
+        stored = {field: event[field] for field in NEW_EVENT_FIELDS}
+        stored['event_id'] = self._next_event_id
+        self._store_event(stored)
+        return stored['event_id']
+
+    async def get_event(self, guild_id, event_id):
+        event = self._events.get(event_id)
+        return self._view(event) if event and event['guild_id'] == guild_id else None
+
+    async def upcoming_events(self, now):
+        start = bisect.bisect_left(self._by_time, (now,))
+        return [self._view(self._events[event_id]) for _, event_id in self._by_time[start:]]
+
+    async def set_event_location(self, event_id, latitude, longitude):
+        event = self._events.get(event_id)
+        if event is not None:
+            event['latitude'] = latitude
+            event['longitude'] = longitude
+
+    async def add_interest(self, event_id, user_id, username):
+        if event_id not in self._events:
+            return None
+        if user_id in self._interests[event_id]:
+            return False
+        self._add_interest(event_id, user_id, username, False)
+        return True
+
+    async def toggle_connection(self, event_id, user_id):
+        interest = self._interests.get(event_id, {}).get(user_id)
+        if interest is None:
+            return None
+        interest[1] = not interest[1]
+        self._events[event_id]['connect_count'] += 1 if interest[1] else -1
+        self._events[event_id]['version'] += 1
+        return interest[1]
+
+    async def remove_interest(self, event_id, user_id):
+        interest = self._interests.get(event_id, {}).pop(user_id, None)
+        if interest is None:
+            return None
+        event = self._events[event_id]
+        self._by_member[(event['guild_id'], user_id)].discard(event_id)
+        event['interested_count'] -= 1
+        event['connect_count'] -= interest[1]
+        event['version'] += 1
+        return interest[1]
+
+    async def interested_users(self, event_id):
+        users = self._interests.get(event_id, {})
+        return [(username, wants_connection) for _, (username, wants_connection) in
+                sorted(users.items(), key=lambda item: (item[1][0], item[0]))]
+
+    async def user_interests(self, guild_id, user_id, now):
+        rows = []
+        for event_id in self._by_member.get((guild_id, user_id), ()):
+            event = self._events[event_id]
+            if event['event_time'] >= now:
+                rows.append((event['event_time'], event_id))
+        rows.sort()
+        return [(self._view(self._events[event_id]), self._interests[event_id][user_id][1])
+                for _, event_id in rows]
+
+    async def get_preferences(self, guild_id, user_id):
+        prefs = self._preferences.get((guild_id, user_id))
+        return (prefs[1], prefs[2], prefs[3]) if prefs else None
+
+    async def set_preferences(self, guild_id, user_id, username, types_mask, sizes_mask):
+        self._preferences[(guild_id, user_id)] = [username, types_mask, sizes_mask, True]
+
+    async def set_notifications(self, guild_id, user_id, enabled):
+        prefs = self._preferences.get((guild_id, user_id))
+        if prefs is not None:
+            prefs[3] = bool(enabled)
+
+    async def delete_preferences(self, guild_id, user_id):
+        self._preferences.pop((guild_id, user_id), None)
+
+    async def all_preferences(self):
+        return [(guild_id, user_id, prefs[1], prefs[2], prefs[3])
+                for (guild_id, user_id), prefs in sorted(self._preferences.items())]
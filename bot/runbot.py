@@ -1,7 +1,18 @@
+import os
+import sys
+
+# keep_alive.py lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from config import TOKEN
 from web1 import bot
+from keep_alive import keep_alive
+from database import db
+import metrics
+
+keep_alive(bot, db=db, metrics=metrics.registry.render)
 
 try:
     bot.run(TOKEN)
 except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+    print(f"An error occurred: {e}")
@@ -0,0 +1,59 @@
+# Full-text search over event descriptions and locations, backed by the
+# events_fts FTS5 table that the events triggers keep in sync. Words are
+# indexed qualified by guild, e.g. 'g123_chess', so each guild has its own
+# doclists and a search never reads another guild's postings.
+import re
+
+from repository import EVENT_COLUMNS
+
+# Upcoming matches fetched per search, best bm25 first
+SEARCH_LIMIT = 100
+
+SEARCH_QUERY = f'''
+    SELECT {', '.join('e.' + column for column in EVENT_COLUMNS)}, bm25(events_fts) AS score
+    FROM events_fts
+    JOIN events e ON e.event_id = events_fts.rowid
+    WHERE events_fts MATCH ? AND e.event_time >= ?
+    ORDER BY score
+    LIMIT ?
+'''
+
+# Indexed and searched words: unicode61 splits on everything that isn't a
+# letter or digit, so every word, whatever punctuation precedes it, is qualified
+WORD = re.compile(r'\w+')
+
+def guild_term(guild_id, word):
+    """The indexed form of a word in a guild's events"""
+    return f'g{int(guild_id)}_{word}'
+
+def guild_words(guild_id, text):
+    """text as the events triggers index it: every word guild-qualified (SQL search_words())"""
+    if guild_id is None or not text:
+        return ''
+    return ' '.join(guild_term(guild_id, word) for word in WORD.findall(text.lower()))
+
+def register_functions(conn):
+    """Install search_words() on a connection; the events triggers call it on every write"""
+    conn.create_function('search_words', 2, guild_words, deterministic=True)
+
+def match_expression(guild_id, terms):
+    """Turn free text into an FTS5 query within one guild: every word must match
+
+    The last word may be a prefix, so half-typed searches still work. Words
+    are quoted so FTS5 operators and punctuation in user input are treated
+    as plain text. Returns None if there is nothing to search for.
+    """
+    words = WORD.findall(terms.lower())
+    if not words:
+        return None
+    quoted = [f'"{guild_term(guild_id, word)}"' for word in words]
+    quoted[-1] += '*'
+    return ' AND '.join(quoted)
+
+def search_upcoming(conn, guild_id, terms, now, limit=SEARCH_LIMIT):
+    """[(score, event)] for a guild's upcoming events matching terms; lower bm25 scores rank higher"""
+    expression = match_expression(guild_id, terms)
+    if expression is None:
+        return []
+    rows = conn.execute(SEARCH_QUERY, (expression, now, limit)).fetchall()
+    return [(row[-1], dict(zip(EVENT_COLUMNS, row))) for row in rows]
@@ -1,23 +1,81 @@
+import hashlib
+import json
+import os
 import discord
 from discord.ext import commands
-import sqlite3
-from datetime import datetime, timedelta
+from discord import app_commands
 import asyncio
 from discord import Embed
-import json
-import geopy.distance
-from geopy.geocoders import Nominatim
+from database import db
+from repository import SqliteRepository
+from migrations import migrate, adopt_unscoped_rows
+from counters import find_counter_drift, rebuild_counters
+from event_cache import event_cache
+from paginator import Paginator
+from preference_index import preference_index
+from preferences import (EVENT_TYPES, encode_types, encode_sizes, decode_types, decode_sizes,
+                         preference_match)
+from notifications import DMQueue
+from outbound import outbound
+import metrics
+from geocoding import Geocoder
+from search import search_upcoming
+from archive import Archiver, enable_incremental_vacuum, past_events
+from cards import card_cache, participants_card
+from recommender import recommender, load_interactions
+from matching import Matcher, group_for
+from reminders import ReminderScheduler
+from forms import ScheduleModal, ScheduleView, PreferencesView, TYPE_OPTIONS, SIZE_OPTIONS
+from eventtime import to_epoch, now_epoch, format_event_time, day_bounds, duration_minutes, parse_event_time
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Number of gateway shards; unset lets Discord recommend one
+SHARD_COUNT = int(os.environ['SHARD_COUNT']) if os.environ.get('SHARD_COUNT') else None
+# Every REST response's rate-limit headers feed the outbound dispatch queue's buckets
+bot = commands.AutoShardedBot(command_prefix='!', intents=intents, shard_count=SHARD_COUNT,
+                              http_trace=outbound.trace_config())
 bot.remove_command('help')
+repo = SqliteRepository(db)
+notifier = DMQueue(bot)
+geocoder = Geocoder(db)
+archiver = Archiver(db)
+
+# Attribute Discord API time (REST calls and interaction responses) to the running handler
+bot.http.request = metrics.timed_api(bot.http.request)
+_webhook_adapter = discord.webhook.async_.async_context.get()
+_webhook_adapter.request = metrics.timed_api(_webhook_adapter.request)
+
+metrics.registry.register_gauge('event_cache', 'Upcoming-events cache counters', lambda: event_cache.stats())
+metrics.registry.register_gauge('card_cache', 'Rendered event card cache counters', lambda: card_cache.stats())
+metrics.registry.register_gauge('db_write_queue_depth', 'Mutations waiting for the batch writer', lambda: db.writer.depth())
+metrics.registry.register_gauge('dm_queue_depth', 'Notification fan-outs waiting to be sent', notifier.depth)
+metrics.registry.register_gauge('outbound_queue_depth', 'Discord API calls waiting, by priority lane', outbound.depth)
+metrics.registry.register_gauge('outbound', 'Discord API calls dispatched, coalesced and rate limited', outbound.stats)
+metrics.registry.register_gauge('geocoder', 'Geocoding lookups by source', geocoder.stats)
+metrics.registry.register_gauge('recommender', 'Interest clicks held for recommendations', recommender.stats)
+metrics.registry.register_gauge('archiver', 'Past events moved to the archive tables', archiver.stats)
+metrics.registry.register_gauge('shard_latency_seconds', 'Gateway heartbeat latency per shard',
+                                lambda: {str(shard_id): latency for shard_id, latency in bot.latencies})
+
+@bot.check
+async def in_guild(ctx):
+    # Events, interests and preferences are all scoped to the server a command runs in
+    if ctx.guild is None:
+        raise commands.NoPrivateMessage()
+    return True
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.timing = metrics.begin()
+
+@bot.after_invoke
+async def record_command_metrics(ctx):
+    metrics.finish('command', ctx.command.qualified_name, ctx.timing, ctx.command_failed)
 
 # Constants
-EVENT_TYPES = ['social', 'academic', 'sports', 'gaming', 'study', 'food', 'other']
-EVENT_SIZES = ['small (1-5)', 'medium (6-15)', 'large (16+)']
 CODE_OF_CONDUCT = """
 **Community Code of Conduct**
 
@@ -71,224 +129,194 @@ def parse_duration(duration_str):
     
     return duration_str  # Return as-is if no specific format is matched
 
-def setup_database():
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
-    # Events table without geolocation fields
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS events (
-            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            creator_id TEXT,
-            creator_name TEXT,
-            description TEXT,
-            event_type TEXT,
-            event_size TEXT,
-            location TEXT,
-            event_time TIMESTAMP,
-            duration TEXT,
-            created_at TIMESTAMP
-        )
-    ''')
-    
-    # Event interests table with UNIQUE constraint
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS event_interests (
-            interest_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_id INTEGER,
-            user_id TEXT,
-            username TEXT,
-            interested_in_connection BOOLEAN,
-            FOREIGN KEY (event_id) REFERENCES events (event_id),
-            UNIQUE(event_id, user_id)
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS user_preferences (
-            user_id TEXT PRIMARY KEY,
-            username TEXT,
-            preferred_types TEXT,
-            preferred_sizes TEXT,
-            notification_enabled BOOLEAN
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+async def setup_database():
+    applied = await db.run(migrate)
+    if applied:
+        print(f'Applied schema migrations: {applied}')
+    # One-off full VACUUM, so it must finish before the writer and handlers start
+    await db.run(enable_incremental_vacuum)
+
+def _parameter_fingerprint(p):
+    return (p.name, p.description, p.required, str(p.type), p.min_value, p.max_value,
+            [(choice.name, choice.value) for choice in p.choices])
+
+def app_command_fingerprint():
+    """Hash of the slash commands as defined in code, to tell whether Discord needs a sync
+
+    Covers everything a sync sends that the code can change: names,
+    descriptions, parameters with their choices (e.g. /schedule's
+    EVENT_TYPES) and the command-level guild_only/nsfw/permission flags.
+    """
+    defined = sorted(
+        (command.qualified_name, command.description, command.guild_only, command.nsfw,
+         command.default_permissions.value if command.default_permissions is not None else None,
+         [_parameter_fingerprint(p) for p in getattr(command, 'parameters', [])])
+        for command in bot.tree.walk_commands()
+    )
+    return hashlib.sha256(json.dumps(defined, default=str).encode()).hexdigest()
+
+async def sync_app_commands(force=False):
+    """Register /schedule and /setpreferences with Discord; returns the synced commands, or None
+
+    Global syncs are heavily rate limited, so unless forced this only syncs
+    when the command set differs from the one last synced.
+    """
+    fingerprint = app_command_fingerprint()
+    row = await db.fetchone("SELECT value FROM bot_state WHERE key = 'app_commands'")
+    if not force and row is not None and row[0] == fingerprint:
+        return None
+    synced = await outbound.sync_commands(bot.tree)
+    await db.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES ('app_commands', ?)",
+                     (fingerprint,))
+    return synced
+
+async def setup_bot():
+    # Runs once, before connecting: nothing else is using the database yet
+    await setup_database()
+    synced = await sync_app_commands()
+    if synced is not None:
+        print(f'Synced {len(synced)} slash commands')
+
+bot.setup_hook = setup_bot
 
 @bot.event
 async def on_ready():
     print(f'{bot.user} has connected to Discord!')
-    setup_database()
+    # Data from before guild partitioning belongs to the only guild the bot was in
+    if len(bot.guilds) == 1:
+        adopted = await db.write(adopt_unscoped_rows, str(bot.guilds[0].id))
+        if adopted:
+            print(f'Assigned {adopted} rows to guild {bot.guilds[0].id}')
+    await event_cache.ensure_loaded(repo)
+    preference_index.load(await repo.all_preferences())
+    recommender.load(await db.run(load_interactions))
+    outbound.start()
+    notifier.start()
+    archiver.start()
+    matcher.start()
+    await reminders.load()
+    reminders.start()
+
+# Event card buttons carry their event_id in the custom_id, so a single
+# registered DynamicItem class routes every click, including after a restart.
+class InterestedButton(discord.ui.DynamicItem[discord.ui.Button], template=r'event:interested:(?P<event_id>[0-9]+)'):
+    def __init__(self, event_id):
+        super().__init__(discord.ui.Button(
+            label="I'm Interested!",
+            style=discord.ButtonStyle.primary,
+            custom_id=f'event:interested:{event_id}'
+        ))
+        self.event_id = event_id
 
-class EventView(discord.ui.View):
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['event_id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        async with metrics.track('button', 'interested'):
+            await register_interest(interaction, self.event_id)
+
+class ConnectButton(discord.ui.DynamicItem[discord.ui.Button], template=r'event:connect:(?P<event_id>[0-9]+)'):
     def __init__(self, event_id):
-        super().__init__(timeout=None)
+        super().__init__(discord.ui.Button(
+            label="Connect with Others",
+            style=discord.ButtonStyle.green,
+            custom_id=f'event:connect:{event_id}'
+        ))
         self.event_id = event_id
 
-    @discord.ui.button(label="I'm Interested!", style=discord.ButtonStyle.primary)
-    async def interested_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await register_interest(interaction, self.event_id)
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['event_id']))
 
-    @discord.ui.button(label="Connect with Others", style=discord.ButtonStyle.green)
-    async def connect_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await toggle_connection_interest(interaction, self.event_id)
+    async def callback(self, interaction: discord.Interaction):
+        async with metrics.track('button', 'connect'):
+            await toggle_connection_interest(interaction, self.event_id)
+
+bot.add_dynamic_items(InterestedButton, ConnectButton)
+
+def event_buttons(event_id):
+    """Component-only view for an event card
+
+    The view is stopped before sending so discord.py never keeps it in its
+    view store; clicks are dispatched through the dynamic items above.
+    """
+    view = discord.ui.View(timeout=None)
+    view.add_item(InterestedButton(event_id))
+    view.add_item(ConnectButton(event_id))
+    view.stop()
+    return view
 
 async def register_interest(interaction, event_id):
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
-    try:
-        # Check if user is already interested
-        c.execute('''
-            SELECT * FROM event_interests 
-            WHERE event_id = ? AND user_id = ?
-        ''', (event_id, str(interaction.user.id)))
-        
-        existing_interest = c.fetchone()
-        
-        if existing_interest:
-            await interaction.response.send_message("You're already registered for this event!", ephemeral=True)
-            return
-        
-        # Register new interest
-        c.execute('''
-            INSERT INTO event_interests (event_id, user_id, username, interested_in_connection)
-            VALUES (?, ?, ?, FALSE)
-        ''', (event_id, str(interaction.user.id), interaction.user.name))
-        
-        conn.commit()
-        await interaction.response.send_message("You're registered as interested in this event!", ephemeral=True)
-        
-    except sqlite3.IntegrityError:
-        await interaction.response.send_message("You're already registered for this event!", ephemeral=True)
-    finally:
-        conn.close()
+    registered = await repo.add_interest(event_id, str(interaction.user.id), interaction.user.name)
 
-async def toggle_connection_interest(interaction, event_id):
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
-    c.execute('''
-        UPDATE event_interests 
-        SET interested_in_connection = NOT interested_in_connection
-        WHERE event_id = ? AND user_id = ?
-    ''', (event_id, str(interaction.user.id)))
-    
-    conn.commit()
-    conn.close()
-    
-    await interaction.response.send_message("Your connection preference has been updated!", ephemeral=True)
-
-def create_event_embed(description, event_type, event_size, location, event_time, duration, creator_name, distance=None):
-    embed = Embed(title="📅 Event Details", color=0x00ff00)
-    embed.add_field(name="Description", value=description, inline=False)
-    embed.add_field(name="Type", value=event_type.title(), inline=True)
-    embed.add_field(name="Size", value=event_size.title(), inline=True)
-    embed.add_field(name="Location", value=location, inline=True)
-    # Convert time format to use semicolon
-    formatted_time = event_time.strftime("%Y-%m-%d %H:%M").replace(':', ';')
-    embed.add_field(name="Date & Time", value=formatted_time, inline=True)
-    embed.add_field(name="Duration", value=duration, inline=True)
-    if distance is not None:
-        embed.add_field(name="Distance", value=f"{distance:.1f} miles", inline=True)
-    embed.add_field(name="Organized by", value=creator_name, inline=False)
-    return embed
+    if registered is None:
+        await outbound.respond(interaction, "This event has already ended.", ephemeral=True)
+        return
+    if not registered:
+        await outbound.respond(interaction, "You're already registered for this event!", ephemeral=True)
+        return
 
-@bot.command(name='setpreferences')
-async def set_preferences(ctx):
-    """Set your event preferences"""
-    try:
-        # Get preferred event types
-        types_msg = "Select your preferred event types (comma-separated):\n"
-        types_msg += ", ".join(EVENT_TYPES)
-        await ctx.send(types_msg)
-        types_response = await bot.wait_for('message', timeout=30.0,
-                                          check=lambda m: m.author == ctx.author)
-        preferred_types = [t.strip() for t in types_response.content.lower().split(',')]
-        
-        # Validate event types
-        invalid_types = [t for t in preferred_types if t not in EVENT_TYPES]
-        if invalid_types:
-            await ctx.send(f"Invalid event type(s): {', '.join(invalid_types)}\nPlease try again with valid types.")
-            return
-        
-        # Get preferred event sizes
-        sizes_msg = "Select your preferred event sizes (comma-separated):\n"
-        sizes_msg += ", ".join(EVENT_SIZES)
-        await ctx.send(sizes_msg)
-        sizes_response = await bot.wait_for('message', timeout=30.0,
-                                          check=lambda m: m.author == ctx.author)
-        
-        # Simple size translation
-        preferred_sizes = []
-        for s in sizes_response.content.lower().split(','):
-            size = s.strip()
-            if size == 'small':
-                preferred_sizes.append('small (1-5)')
-            elif size == 'medium':
-                preferred_sizes.append('medium (6-15)')
-            elif size == 'large':
-                preferred_sizes.append('large (16+)')
-            elif size in EVENT_SIZES:  # Already in full format
-                preferred_sizes.append(size)
-            else:
-                await ctx.send(f"Invalid event size(s): {size}\nPlease try again with valid sizes.")
-                return
-        
-        # Save preferences
-        conn = sqlite3.connect('discord_bot.db')
-        c = conn.cursor()
-        
-        c.execute('''
-            INSERT OR REPLACE INTO user_preferences 
-            (user_id, username, preferred_types, preferred_sizes, notification_enabled)
-            VALUES (?, ?, ?, ?, TRUE)
-        ''', (
-            str(ctx.author.id),
-            ctx.author.name,
-            json.dumps(preferred_types),
-            json.dumps(preferred_sizes)
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        # Create and send confirmation embed
+    event_cache.adjust_counts(event_id, interested=1)
+    recommender.add(str(interaction.guild_id), str(interaction.user.id), event_id)
+    event = event_cache.get(event_id)
+    if event is not None:
+        reminders.interest_added(event_id, event['event_time'])
+    await outbound.respond(interaction, "You're registered as interested in this event!", ephemeral=True)
+
+async def toggle_connection_interest(interaction, event_id):
+    wants_connection = await repo.toggle_connection(event_id, str(interaction.user.id))
+    if wants_connection is not None:
+        event_cache.adjust_counts(event_id, connect=1 if wants_connection else -1)
+    
+    await outbound.respond(interaction, "Your connection preference has been updated!", ephemeral=True)
+
+async def save_preferences(interaction, preferred_types, preferred_sizes):
+    """Store the choices from a PreferencesView"""
+    async with metrics.track('button', 'setpreferences'):
+        # Save preferences as bitmasks
+        types_mask = encode_types(preferred_types)
+        sizes_mask = encode_sizes(preferred_sizes)
+        guild_id = str(interaction.guild_id)
+        await repo.set_preferences(guild_id, str(interaction.user.id), interaction.user.name,
+                                   types_mask, sizes_mask)
+        preference_index.set(guild_id, str(interaction.user.id), types_mask, sizes_mask)
+        
+        # Replace the form with a confirmation embed
         embed = Embed(title="✅ Preferences Saved", color=0x00ff00)
         embed.add_field(name="Preferred Event Types", value=", ".join(preferred_types), inline=False)
         embed.add_field(name="Preferred Event Sizes", value=", ".join(preferred_sizes), inline=False)
         
-        await ctx.send("Preferences saved successfully!", embed=embed)
-        
-    except asyncio.TimeoutError:
-        await ctx.send("Timeout: Preference setting cancelled.")
-    except Exception as e:
-        await ctx.send(f"An error occurred while setting preferences: {str(e)}")
+        await outbound.respond_edit(interaction, content="Preferences saved successfully!", embed=embed, view=None)
+
+@bot.command(name='setpreferences')
+async def set_preferences(ctx):
+    """Set your event preferences"""
+    view = PreferencesView(ctx.author.id, save_preferences)
+    view.message = await outbound.send(ctx, "Select your preferred event types and sizes, then press Save:", view=view)
+
+@bot.tree.command(name='setpreferences', description='Set your event preferences')
+@app_commands.guild_only()
+async def set_preferences_slash(interaction: discord.Interaction):
+    async with metrics.track('slash', 'setpreferences'):
+        view = PreferencesView(interaction.user.id, save_preferences)
+        await outbound.respond(interaction, "Select your preferred event types and sizes, then press Save:",
+                               view=view, ephemeral=True)
+        view.message = await outbound.original_response(interaction)
 
 @bot.command(name='viewpreferences')
 async def view_preferences(ctx):
     """View your current preferences"""
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
     # Get user preferences
-    c.execute('''
-        SELECT preferred_types, preferred_sizes
-        FROM user_preferences
-        WHERE user_id = ?
-    ''', (str(ctx.author.id),))
-    
-    prefs = c.fetchone()
-    conn.close()
+    prefs = await repo.get_preferences(str(ctx.guild.id), str(ctx.author.id))
     
     if not prefs:
-        await ctx.send("You haven't set any preferences yet. Use `!setpreferences` to set them.")
+        await outbound.send(ctx, "You haven't set any preferences yet. Use `!setpreferences` to set them.")
         return
     
-    # Parse preferences
-    preferred_types = json.loads(prefs[0])
-    preferred_sizes = json.loads(prefs[1])
+    # Decode preference bitmasks
+    preferred_types = decode_types(prefs[0])
+    preferred_sizes = decode_sizes(prefs[1])
     
     # Create embed
     embed = Embed(title="🎯 Your Preferences", color=0x00ff00)
@@ -306,617 +334,591 @@ async def view_preferences(ctx):
     # Add instructions for updating
     embed.set_footer(text="Use !setpreferences to update your preferences")
     
-    await ctx.send(embed=embed)
+    await outbound.send(ctx, embed=embed)
 
 @bot.command(name='clearpreferences')
 async def clear_preferences(ctx):
     """Clear all your preferences"""
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
+    await repo.delete_preferences(str(ctx.guild.id), str(ctx.author.id))
+    preference_index.remove(str(ctx.guild.id), str(ctx.author.id))
     
-    c.execute('DELETE FROM user_preferences WHERE user_id = ?', (str(ctx.author.id),))
+    await outbound.send(ctx, "✅ Your preferences have been cleared. Use `!setpreferences` to set new ones.")
+
+@bot.command(name='notifications')
+async def toggle_notifications(ctx, setting=None):
+    """Turn DMs about new events matching your preferences on or off"""
+    if setting not in ('on', 'off'):
+        await outbound.send(ctx, "Please choose on or off. Example: `!notifications off`")
+        return
     
-    conn.commit()
-    conn.close()
+    enabled = setting == 'on'
+    prefs = await repo.get_preferences(str(ctx.guild.id), str(ctx.author.id))
     
-    await ctx.send("✅ Your preferences have been cleared. Use `!setpreferences` to set new ones.")
+    if not prefs:
+        await outbound.send(ctx, "You haven't set any preferences yet. Use `!setpreferences` to set them.")
+        return
+    
+    await repo.set_notifications(str(ctx.guild.id), str(ctx.author.id), enabled)
+    preference_index.set(str(ctx.guild.id), str(ctx.author.id), prefs[0], prefs[1], enabled)
+    
+    await outbound.send(ctx, f"🔔 Event notifications turned {setting}.")
 
-@bot.command(name='schedule')
-async def schedule_event(ctx):
-    """Schedule a new event"""
-    try:
-        # Get event description
-        await ctx.send("Please provide the event description:")
-        description_msg = await bot.wait_for('message', timeout=30.0,
-                                           check=lambda m: m.author == ctx.author)
-        
-        # Get event type
-        types_msg = "Select the event type:\n"
-        types_msg += ", ".join(EVENT_TYPES)
-        await ctx.send(types_msg)
-        type_msg = await bot.wait_for('message', timeout=30.0,
-                                     check=lambda m: m.author == ctx.author)
-        
-        # Get event size
-        sizes_msg = "Select the event size:\n"
-        sizes_msg += ", ".join(EVENT_SIZES)
-        await ctx.send(sizes_msg)
-        size_msg = await bot.wait_for('message', timeout=30.0,
-                                     check=lambda m: m.author == ctx.author)
-        
-        # Get location as simple string
-        await ctx.send("Please provide the event location:")
-        location_msg = await bot.wait_for('message', timeout=30.0,
-                                         check=lambda m: m.author == ctx.author)
-        
-        # Get date and time with smart parsing
-        await ctx.send("Please provide the event time (format: HH;MM for today, or YYYY-MM-DD HH;MM for specific date):")
-        time_msg = await bot.wait_for('message', timeout=30.0,
-                                     check=lambda m: m.author == ctx.author)
-        
-        # Get duration
-        await ctx.send("Please provide the event duration (e.g., '2 hours' or '30 minutes'):")
-        duration_msg = await bot.wait_for('message', timeout=30.0,
-                                         check=lambda m: m.author == ctx.author)
-        
+def notify_matching_users(guild_id, event_id, creator_id, event_type, event_size, embed):
+    """Queue DMs about a new event to guild members whose preferences match it"""
+    user_ids = preference_index.match(guild_id, event_type, event_size)
+    user_ids.discard(creator_id)
+    if user_ids:
+        notifier.enqueue(
+            sorted(user_ids),
+            f"🔔 A new event matching your preferences was just scheduled! Use `!detail {event_id}` to see it.",
+            embed
+        )
+
+async def announce_groups(guild_id, event_id, groups):
+    """DM every member of newly formed connect groups who else is in their group"""
+    event = event_cache.get(event_id)
+    if event is None:
+        event = await repo.get_event(guild_id, event_id)
+    if event is None:
+        return
+    embed = card_cache.event_card(event)
+    for _, members in groups:
+        names = ", ".join(username for _, username in members)
+        await notifier.put(
+            [user_id for user_id, _ in members],
+            f"🤝 Your Connect with Others group for event {event_id} is: {names}. "
+            f"Say hi before it starts! Use `!mygroup {event_id}` to see it again.",
+            embed
+        )
+
+matcher = Matcher(db, announce_groups)
+metrics.registry.register_gauge('matcher', 'Connect with Others groups formed', matcher.stats)
+
+async def send_reminder(user_ids, event_ids):
+    """DM members about their events starting soon, one message per member"""
+    events = [event_cache.get(event_id) for event_id in event_ids]
+    events = [event for event in events if event is not None]
+    if not events:
+        return
+    if len(events) == 1:
+        event = events[0]
+        content = (f"⏰ Reminder: an event you're interested in starts at {format_event_time(event['event_time'])}! "
+                   f"Use `!detail {event['event_id']}` to see it.")
+        await notifier.put(user_ids, content, card_cache.event_card(event))
+        return
+    lines = [f"**ID: {event['event_id']}** ⏰ {format_event_time(event['event_time'])} • "
+             f"{event['description'][:50]}" for event in events]
+    await notifier.put(user_ids, "⏰ Reminder: events you're interested in are starting soon!\n" + "\n".join(lines))
+
+reminders = ReminderScheduler(db, send_reminder)
+metrics.registry.register_gauge('reminders', 'Event reminders pending and sent', reminders.stats)
+
+async def locate_event(event_id, location):
+    """Geocode an event's location and store its coordinates"""
+    coords = await geocoder.resolve(location)
+    if coords is None:
+        return
+    await repo.set_event_location(event_id, *coords)
+    event_cache.set_location(event_id, *coords)
+
+async def save_event(interaction, form):
+    """Validate a submitted ScheduleModal and create the event; returns True once saved"""
+    async with metrics.track('modal', 'schedule'):
         # Parse and validate duration
-        parsed_duration = parse_duration(duration_msg.content)
-        if not parsed_duration:
-            await ctx.send('Invalid duration format. Please use formats like "2 hours" or "30 minutes".')
-            return
+        parsed_duration = parse_duration(form.duration.value)
+        if not parsed_duration or not duration_minutes(parsed_duration):
+            await outbound.respond(interaction, 
+                'Invalid duration format. Please use formats like "2 hours" or "30 minutes".', ephemeral=True)
+            return False
         
         try:
-            # Smart time parsing
-            time_input = time_msg.content.strip()
-            
-            # Check if input contains only time
-            if ':' in time_input or ';' in time_input:
-                if ' ' not in time_input and len(time_input.split(';' if ';' in time_input else ':')) == 2:
-                    # Time only provided - use today's date
-                    today = datetime.now().date()
-                    time_input = f"{today} {time_input}"
-            
-            # Convert semicolon to colon for datetime parsing
-            formatted_time = time_input.replace(';', ':')
-            
-            try:
-                # Try parsing with full date-time format
-                event_time = datetime.strptime(formatted_time, '%Y-%m-%d %H:%M')
-            except ValueError:
-                try:
-                    # Try parsing with just date and time
-                    event_time = datetime.strptime(formatted_time, '%Y-%m-%d %H:%M')
-                except ValueError:
-                    # Try parsing with today's date and time
-                    try:
-                        time_part = datetime.strptime(formatted_time, '%H:%M').time()
-                        event_time = datetime.combine(datetime.now().date(), time_part)
-                    except ValueError:
-                        await ctx.send('Invalid time format. Please use HH;MM for today, or YYYY-MM-DD HH;MM for specific date.')
-                        return
-            
-            # Check if event time is in the past
-            if event_time < datetime.now():
-                # If it's today's date and time is in the past, try tomorrow
-                if event_time.date() == datetime.now().date():
-                    event_time = event_time + timedelta(days=1)
-                    await ctx.send(f"Note: Since the time is in the past, the event has been scheduled for tomorrow ({event_time.strftime('%Y-%m-%d')})")
-                else:
-                    await ctx.send('Cannot schedule events in the past!')
-                    return
-            
-            # Save event
-            conn = sqlite3.connect('discord_bot.db')
-            c = conn.cursor()
-            
-            c.execute('''
-                INSERT INTO events 
-                (creator_id, creator_name, description, event_type, event_size, location, 
-                event_time, duration, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                str(ctx.author.id),
-                ctx.author.name,
-                description_msg.content,
-                type_msg.content.lower(),
-                size_msg.content.lower(),
-                location_msg.content,
-                event_time,
-                parsed_duration,
-                datetime.now()
-            ))
-            
-            event_id = c.lastrowid
-            
-            # Send confirmation
-            embed = create_event_embed(
-                description_msg.content,
-                type_msg.content,
-                size_msg.content,
-                location_msg.content,
-                event_time,
-                parsed_duration,
-                ctx.author.name
-            )
-            await ctx.send("Event scheduled successfully! ✅", embed=embed, view=EventView(event_id))
-            
-            conn.commit()
-            conn.close()
-            
+            event_time, rolled_over = parse_event_time(form.time.value)
         except ValueError as e:
-            await ctx.send('Invalid time format. Please use HH;MM for today, or YYYY-MM-DD HH;MM for specific date.')
-            
-    except asyncio.TimeoutError:
-        await ctx.send('Timeout: Event scheduling cancelled.')
-
-# Modified create_event_embed function without distance
-def create_event_embed(description, event_type, event_size, location, event_time, duration, creator_name):
-    embed = Embed(title="📅 Event Details", color=0x00ff00)
-    embed.add_field(name="Description", value=description, inline=False)
-    embed.add_field(name="Type", value=event_type.title(), inline=True)
-    embed.add_field(name="Size", value=event_size.title(), inline=True)
-    embed.add_field(name="Location", value=location, inline=True)
-    # Convert time format to use semicolon
-    formatted_time = event_time.strftime("%Y-%m-%d %H:%M").replace(':', ';')
-    embed.add_field(name="Date & Time", value=formatted_time, inline=True)
-    embed.add_field(name="Duration", value=duration, inline=True)
-    embed.add_field(name="Organized by", value=creator_name, inline=False)
-    return embed
-class EventDetailView(discord.ui.View):
-    def __init__(self, event_id):
-        super().__init__(timeout=None)
-        self.event_id = event_id
-
-    @discord.ui.button(label="I'm Interested!", style=discord.ButtonStyle.primary)
-    async def interested_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await register_interest(interaction, self.event_id)
+            await outbound.respond(interaction, str(e), ephemeral=True)
+            return False
+        
+        description = form.description.value.strip()
+        location = form.location.value.strip()
+        creator = interaction.user
+        guild_id = str(interaction.guild_id)
+        
+        # Save event
+        event = {
+            'guild_id': guild_id,
+            'creator_id': str(creator.id),
+            'creator_name': creator.name,
+            'description': description,
+            'event_type': form.event_type,
+            'event_size': form.event_size,
+            'location': location,
+            'event_time': to_epoch(event_time),
+            'duration': parsed_duration,
+            'duration_minutes': duration_minutes(parsed_duration),
+            'created_at': now_epoch(),
+        }
+        event_id = await repo.create_event(event)
+        
+        event.update(event_id=event_id, interested_count=0, connect_count=0,
+                     latitude=None, longitude=None, version=0)
+        event_cache.put(event)
+        reminders.schedule(event_id, event['event_time'])
+        
+        # Send confirmation
+        embed = card_cache.event_card(event)
+        content = "Event scheduled successfully! ✅"
+        if rolled_over:
+            content += f"\nNote: Since the time is in the past, the event has been scheduled for tomorrow ({event_time.strftime('%Y-%m-%d')})"
+        await outbound.respond(interaction, content, embed=embed, view=event_buttons(event_id))
+        notify_matching_users(guild_id, event_id, str(creator.id), form.event_type, form.event_size, embed)
+        # Resolve coordinates for !events near in the background
+        asyncio.create_task(locate_event(event_id, location))
+        return True
 
-    @discord.ui.button(label="Connect with Others", style=discord.ButtonStyle.success)
-    async def connect_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await toggle_connection_interest(interaction, self.event_id)
+@bot.command(name='schedule')
+async def schedule_event(ctx):
+    """Schedule a new event"""
+    view = ScheduleView(ctx.author.id, save_event)
+    view.message = await outbound.send(ctx, "Pick the event type and size, then press **Enter details**:", view=view)
+
+@bot.tree.command(name='schedule', description='Schedule a new event')
+@app_commands.guild_only()
+@app_commands.describe(event_type='What kind of event it is', event_size='How many people it is for')
+@app_commands.choices(
+    event_type=[app_commands.Choice(name=option.label, value=option.value) for option in TYPE_OPTIONS],
+    event_size=[app_commands.Choice(name=option.label, value=option.value) for option in SIZE_OPTIONS],
+)
+async def schedule_slash(interaction: discord.Interaction, event_type: app_commands.Choice[str],
+                         event_size: app_commands.Choice[str]):
+    async with metrics.track('slash', 'schedule'):
+        await outbound.respond_modal(interaction, ScheduleModal(event_type.value, event_size.value, save_event))
 
 @bot.command(name='detail')
 async def event_detail(ctx, event_id: int = None):
     """Show detailed information about a specific event"""
     if not event_id:
-        await ctx.send("Please provide an event ID. Example: `!detail 123`")
+        await outbound.send(ctx, "Please provide an event ID. Example: `!detail 123`")
         return
 
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
-    # Get event details
-    c.execute('''
-        SELECT e.creator_name, e.description, e.event_type, e.event_size, 
-               e.location, e.event_time, e.duration,
-               COUNT(DISTINCT i.user_id) as interested_count
-        FROM events e
-        LEFT JOIN event_interests i ON e.event_id = i.event_id
-        WHERE e.event_id = ?
-        GROUP BY e.event_id
-    ''', (event_id,))
-    
-    event = c.fetchone()
-    conn.close()
+    # Get event details, served from the upcoming-events cache when possible
+    guild_id = str(ctx.guild.id)
+    event = event_cache.get(event_id)
+    if not event or event['guild_id'] != guild_id:
+        event = await repo.get_event(guild_id, event_id)
     
     if not event:
-        await ctx.send("❌ Event not found. Please check the event ID.")
+        await outbound.send(ctx, "❌ Event not found. Please check the event ID.")
         return
     
-    (creator_name, description, event_type, event_size, location, 
-     event_time, duration, interested_count) = event
-
-    # Parse event time
-    event_datetime = datetime.strptime(event_time, '%Y-%m-%d %H:%M:%S')
-    formatted_time = event_datetime.strftime('%Y-%m-%d %H:%M').replace(':', ';')
-
-    # Create embed with vertical green line design
-    embed = Embed(title="📅 Event Details", color=0x00ff00)
-    
-    # Description section
-    embed.add_field(name="Description", value=description, inline=False)
-    
-    # First row
-    embed.add_field(name="Type", value=event_type.title(), inline=True)
-    embed.add_field(name="Size", value=event_size.title(), inline=True)
-    embed.add_field(name="Location", value=location, inline=True)
-    
-    # Second row
-    embed.add_field(name="Date & Time", value=formatted_time, inline=True)
-    embed.add_field(name="Duration", value=duration, inline=True)
-    embed.add_field(name="\u200b", value="\u200b", inline=True)  # Empty field for alignment
-    
-    # Organizer
-    embed.add_field(name="Organized by", value=creator_name, inline=False)
+    embed = card_cache.event_card(event)
 
     # Add buttons
-    view = EventDetailView(event_id)
-    
-    await ctx.send(embed=embed, view=view)
-
-
+    await outbound.send(ctx, embed=embed, view=event_buttons(event_id))
+
+
+
+# Number of events shown per !events page
+EVENTS_PER_PAGE = 5
+# Search radius for !events near <place>
+NEAR_RADIUS_MILES = 2.0
+
+def preference_levels(bucket_keys, types_mask, sizes_mask):
+    """Group (event_type, event_size) buckets by preference match level"""
+    levels = ([], [], [])
+    for event_type, event_size in bucket_keys:
+        match = preference_match(event_type, event_size, types_mask, sizes_mask)
+        levels[match - 1].append((event_type, event_size))
+    return levels
+
+def fetch_events_page(guild_id, levels, start, end, cursor, limit=EVENTS_PER_PAGE):
+    """Read one page of (match, event) pairs after a keyset cursor
+
+    The cursor is the (preference_match, event_time, event_id) of the last
+    event on the previous page, or None for the first page.
+    """
+    page = []
+    for match, keys in enumerate(levels, start=1):
+        if cursor and match < cursor[0]:
+            continue
+        after = cursor[1:] if cursor and match == cursor[0] else None
+        for event in event_cache.iter_events(guild_id, keys, start, end, after):
+            page.append((match, event))
+            if len(page) == limit:
+                return page
+    return page
+
+def format_event_entry(event):
+    """Body of an !events list entry, memoized on the cached event until its counts change"""
+    entry = event.get('entry')
+    if entry is None:
+        description = event['description']
+        # Format each event entry (limited to first 50 chars of description)
+        entry = f"⏰ {format_event_time(event['event_time'])}\n"
+        entry += f"📍 {event['location']}\n"
+        entry += f"💭 {description[:50]}{'...' if len(description) > 50 else ''}\n"
+        entry += f"👥 {event['interested_count']} interested • {event['event_type']} • {event['event_size']}\n"
+        entry += "─" * 40 + "\n"  # Separator
+        event['entry'] = entry
+    return entry
 
 @bot.command(name='events')
 async def list_events(ctx, filter_type=None, *, filter_value=None):
     """View events with advanced filtering"""
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
+    if filter_type and filter_type.lower() == 'near':
+        await list_events_near(ctx, filter_value)
+        return
+
     # Get user preferences
-    c.execute('''
-        SELECT preferred_types, preferred_sizes 
-        FROM user_preferences 
-        WHERE user_id = ?
-    ''', (str(ctx.author.id),))
-    
-    user_prefs = c.fetchone()
-    preferred_types = json.loads(user_prefs[0]) if user_prefs else []
-    preferred_sizes = json.loads(user_prefs[1]) if user_prefs else []
-    
-    # Base query with preference matching
-    query = '''
-        SELECT 
-            e.event_id, 
-            e.creator_name, 
-            e.description, 
-            e.event_type, 
-            e.event_size, 
-            e.location,
-            e.event_time, 
-            e.duration,
-            COUNT(DISTINCT i.user_id) as interested_count,
-            CASE 
-                WHEN e.event_type IN ({}) AND e.event_size IN ({}) THEN 1
-                WHEN e.event_type IN ({}) THEN 2
-                WHEN e.event_size IN ({}) THEN 2
-                ELSE 3
-            END as preference_match
-        FROM events e
-        LEFT JOIN event_interests i ON e.event_id = i.event_id
-        WHERE datetime(e.event_time) >= datetime('now', 'localtime')
-    '''
-    
-    # Prepare preference parameters
-    type_placeholders = ','.join(['?' for _ in preferred_types]) if preferred_types else "''"
-    size_placeholders = ','.join(['?' for _ in preferred_sizes]) if preferred_sizes else "''"
-    
-    # Parameters for the preference matching
-    params = []
-    params.extend(preferred_types)
-    params.extend(preferred_sizes)
-    params.extend(preferred_types)
-    params.extend(preferred_sizes)
-    
-    # Add filter conditions if provided
+    user_prefs = await repo.get_preferences(str(ctx.guild.id), str(ctx.author.id))
+    
+    types_mask, sizes_mask = user_prefs[:2] if user_prefs else (0, 0)
+    
+    # Narrow the cached upcoming events by filter
+    await event_cache.ensure_loaded(repo)
+    guild_id = str(ctx.guild.id)
+    bucket_keys = event_cache.bucket_keys(guild_id)
+    day_start = day_end = None
+    
     if filter_type and filter_value:
         if filter_type.lower() == 'type':
-            query += ' AND LOWER(e.event_type) = LOWER(?)'
-            params.append(filter_value)
+            bucket_keys = [k for k in bucket_keys if k[0].lower() == filter_value.lower()]
         elif filter_type.lower() == 'size':
-            query += ' AND LOWER(e.event_size) = LOWER(?)'
-            params.append(filter_value)
+            bucket_keys = [k for k in bucket_keys if k[1].lower() == filter_value.lower()]
         elif filter_type.lower() == 'date':
             try:
-                filter_date = datetime.strptime(filter_value, '%Y-%m-%d')
-                query += ' AND DATE(e.event_time) = DATE(?)'
-                params.append(filter_value)
+                day_start, day_end = day_bounds(filter_value)
             except ValueError:
-                await ctx.send('Invalid date format. Please use YYYY-MM-DD')
-                conn.close()
+                await outbound.send(ctx, 'Invalid date format. Please use YYYY-MM-DD')
                 return
     
-    # Group by and order by preference match and time
-    query += ''' 
-        GROUP BY e.event_id 
-        ORDER BY 
-            preference_match ASC,
-            e.event_time ASC
-    '''
-    
-    # Format query with placeholders
-    query = query.format(
-        type_placeholders, 
-        size_placeholders,
-        type_placeholders, 
-        size_placeholders
-    )
-    
-    try:
-        c.execute(query, params)
-        events = c.fetchall()
-    except sqlite3.Error as e:
-        await ctx.send(f"An error occurred while fetching events: {str(e)}")
-        conn.close()
+    # Total comes from bucket sizes; only the page being shown is read and rendered
+    total_events = event_cache.count(guild_id, bucket_keys, day_start, day_end)
+    if not total_events:
+        await outbound.send(ctx, "No upcoming events found matching your criteria.")
         return
     
-    if not events:
-        await ctx.send("No upcoming events found matching your criteria.")
-        conn.close()
-        return
-
-    # Create list view embed
-    embed = Embed(title="📅 Upcoming Events", color=0x00ff00)
-    
-    # Format event list
-    event_list = []
-    for event in events:
-        (event_id, creator_name, description, event_type, event_size, location, 
-         event_time, duration, interested_count, preference_match) = event
-        
-        # Parse event time
-        event_datetime = datetime.strptime(event_time, '%Y-%m-%d %H:%M:%S')
-        formatted_time = event_datetime.strftime('%Y-%m-%d %H:%M').replace(':', ';')
-        
-        # Add preference indicator
-        pref_indicator = "✨ " if preference_match == 1 else "⭐ " if preference_match == 2 else ""
+    levels = preference_levels(bucket_keys, types_mask, sizes_mask)
+    total_pages = (total_events + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE
+    cursors = [None]  # Keyset cursor that starts each page visited so far
+    
+    async def get_page(page_number):
+        nonlocal total_pages
+        # Pages are only reachable one step at a time, so the cursor is known
+        page = fetch_events_page(guild_id, levels, day_start, day_end, cursors[page_number])
+        if len(page) < EVENTS_PER_PAGE:
+            # Events expired since the count: this is the last page, and there is no cursor past it
+            total_pages = page_number + 1
+            view.clamp(total_pages)
+        elif len(cursors) == page_number + 1:
+            match, last = page[-1]
+            cursors.append((match, last['event_time'], last['event_id']))
+        
+        # Format event list
+        event_list = []
+        for match, event in page:
+            # Add preference indicator
+            pref_indicator = "✨ " if match == 1 else "⭐ " if match == 2 else ""
+            event_list.append(f"**ID: {event['event_id']}** {pref_indicator}\n" + format_event_entry(event))
         
-        # Format each event entry (limited to first 50 chars of description)
-        event_entry = f"**ID: {event_id}** {pref_indicator}\n"
-        event_entry += f"⏰ {formatted_time}\n"
-        event_entry += f"📍 {location}\n"
-        event_entry += f"💭 {description[:50]}{'...' if len(description) > 50 else ''}\n"
-        event_entry += f"👥 {interested_count} interested • {event_type} • {event_size}\n"
-        event_entry += "─" * 40 + "\n"  # Separator
-        
-        event_list.append(event_entry)
-    
-    # Split events into pages (5 events per page)
-    EVENTS_PER_PAGE = 5
-    pages = [event_list[i:i + EVENTS_PER_PAGE] for i in range(0, len(event_list), EVENTS_PER_PAGE)]
-    total_pages = len(pages)
-    current_page = 0
-    
-    while True:
-        # Create embed for current page
         embed = Embed(title="📅 Upcoming Events", color=0x00ff00)
-        embed.description = "".join(pages[current_page])
-        embed.set_footer(text=f"Page {current_page + 1} of {total_pages} • Use !detail <ID> to see full event details")
+        embed.description = "".join(event_list) or "These events have already started."
+        embed.set_footer(text=f"Page {page_number + 1} of {total_pages} • Use !detail <ID> to see full event details")
         
         # Show filter if applied
         if filter_type and filter_value:
             embed.add_field(name="Active Filter", 
                           value=f"{filter_type}: {filter_value}", 
                           inline=False)
-        
-        message = await ctx.send(embed=embed)
-        
-        if total_pages > 1:
-            await message.add_reaction('◀️')
-            await message.add_reaction('▶️')
-            
-            try:
-                reaction, user = await bot.wait_for(
-                    'reaction_add',
-                    timeout=30.0,
-                    check=lambda r, u: u == ctx.author and str(r.emoji) in ['◀️', '▶️']
-                )
-                
-                await message.delete()
-                
-                if str(reaction.emoji) == '◀️':
-                    current_page = (current_page - 1) % total_pages
-                elif str(reaction.emoji) == '▶️':
-                    current_page = (current_page + 1) % total_pages
-                    
-            except asyncio.TimeoutError:
-                break
-        else:
-            break
-    
-    conn.close()
+        return embed
+    
+    view = Paginator(ctx.author.id, get_page, total_pages)
+    await view.start(ctx)
     
+async def list_events_near(ctx, place):
+    """!events near <place>: upcoming events within NEAR_RADIUS_MILES, nearest first"""
+    if not place:
+        await outbound.send(ctx, "Please provide a place. Example: `!events near library`")
+        return
+
+    coords = await geocoder.resolve(place)
+    if coords is None:
+        await outbound.send(ctx, f"❌ Couldn't find a location called \"{place}\".")
+        return
+
+    await event_cache.ensure_loaded(repo)
+    nearby = event_cache.near(str(ctx.guild.id), coords[0], coords[1], NEAR_RADIUS_MILES)
+    if not nearby:
+        await outbound.send(ctx, f"No upcoming events found within {NEAR_RADIUS_MILES:g} miles of {place}.")
+        return
+
+    total_pages = (len(nearby) + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE
+
+    async def get_page(page_number):
+        page = nearby[page_number * EVENTS_PER_PAGE:(page_number + 1) * EVENTS_PER_PAGE]
+        event_list = [
+            f"**ID: {event['event_id']}** • 📏 {distance:.1f} miles\n" + format_event_entry(event)
+            for distance, event in page
+        ]
+        embed = Embed(title=f"📍 Events near {place}", color=0x00ff00)
+        embed.description = "".join(event_list)
+        embed.set_footer(text=f"Page {page_number + 1} of {total_pages} • Use !detail <ID> to see full event details")
+        return embed
+
+    await Paginator(ctx.author.id, get_page, total_pages).start(ctx)
+
+@bot.command(name='search')
+async def search_events(ctx, *, terms=None):
+    """Search upcoming events by description and location"""
+    if not terms:
+        await outbound.send(ctx, "Please provide something to search for. Example: `!search chess library`")
+        return
+
+    user_prefs = await repo.get_preferences(str(ctx.guild.id), str(ctx.author.id))
+    types_mask, sizes_mask = user_prefs[:2] if user_prefs else (0, 0)
+
+    results = await db.run(search_upcoming, str(ctx.guild.id), terms, now_epoch())
+    if not results:
+        await outbound.send(ctx, f"No upcoming events found matching \"{terms}\".")
+        return
+
+    # Preferred events first, then best text match within each preference level
+    ranked = sorted(
+        ((preference_match(event['event_type'], event['event_size'], types_mask, sizes_mask), score, event)
+         for score, event in results),
+        key=lambda r: r[:2]
+    )
+    total_pages = (len(ranked) + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE
+
+    async def get_page(page_number):
+        page = ranked[page_number * EVENTS_PER_PAGE:(page_number + 1) * EVENTS_PER_PAGE]
+        event_list = []
+        for match, _, event in page:
+            pref_indicator = "✨ " if match == 1 else "⭐ " if match == 2 else ""
+            event_list.append(f"**ID: {event['event_id']}** {pref_indicator}\n" + format_event_entry(event))
+        embed = Embed(title=f"🔎 Events matching \"{terms}\"", color=0x00ff00)
+        embed.description = "".join(event_list)
+        embed.set_footer(text=f"Page {page_number + 1} of {total_pages} • Use !detail <ID> to see full event details")
+        return embed
+
+    await Paginator(ctx.author.id, get_page, total_pages).start(ctx)
+
+@bot.command(name='recommended')
+async def recommended_events(ctx):
+    """Upcoming events liked by members who were interested in the same events as you"""
+    guild_id = str(ctx.guild.id)
+    await event_cache.ensure_loaded(repo)
+    upcoming = {event['event_id']: event
+                for event in event_cache.iter_events(guild_id, event_cache.bucket_keys(guild_id))}
+    recommendations = recommender.recommend(guild_id, str(ctx.author.id), upcoming)
+    if not recommendations:
+        await outbound.send(ctx, "No recommendations yet. Press \"I'm Interested!\" on a few events and check back!")
+        return
+
+    total_pages = (len(recommendations) + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE
+
+    async def get_page(page_number):
+        page = recommendations[page_number * EVENTS_PER_PAGE:(page_number + 1) * EVENTS_PER_PAGE]
+        event_list = [f"**ID: {event_id}** 🔮\n" + format_event_entry(upcoming[event_id]) for _, event_id in page]
+        embed = Embed(title="🔮 Recommended For You", color=0x00ff00)
+        embed.description = "".join(event_list)
+        embed.set_footer(text=f"Page {page_number + 1} of {total_pages} • Based on what members like you are interested in")
+        return embed
+
+    await Paginator(ctx.author.id, get_page, total_pages).start(ctx)
+
+@bot.command(name='mygroup')
+async def view_my_group(ctx, event_id: int = None):
+    """Show your Connect with Others group for an event"""
+    if not event_id:
+        await outbound.send(ctx, "Please provide an event ID. Example: `!mygroup 123`")
+        return
+
+    members = await db.run(group_for, str(ctx.guild.id), event_id, str(ctx.author.id))
+    if not members:
+        await outbound.send(ctx, "You're not in a group for this event yet. Groups are formed a few hours "
+                                 "before the event for everyone who pressed \"Connect with Others\".")
+        return
+
+    embed = Embed(title="🤝 Your Connect Group", color=0x00ff00)
+    embed.add_field(name="Members", value="\n".join(username for _, username in members), inline=False)
+    embed.set_footer(text=f"Event ID: {event_id}")
+    await outbound.send(ctx, embed=embed)
+
 @bot.command(name='interested')
 async def view_interested_users(ctx, event_id: int = None):
     """View users interested in an event"""
     if not event_id:
-        await ctx.send("Please provide an event ID. Example: !interested 123")
+        await outbound.send(ctx, "Please provide an event ID. Example: !interested 123")
         return
         
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
     # Get event details and count of interested users
-    c.execute('''
-        SELECT e.description, e.event_time, e.location, e.duration, e.creator_name,
-               COUNT(i.user_id) as interested_count
-        FROM events e
-        LEFT JOIN event_interests i ON e.event_id = i.event_id
-        WHERE e.event_id = ?
-        GROUP BY e.event_id
-    ''', (event_id,))
-    
-    event = c.fetchone()
+    guild_id = str(ctx.guild.id)
+    event = event_cache.get(event_id)
+    if not event or event['guild_id'] != guild_id:
+        event = await repo.get_event(guild_id, event_id)
+    
     if not event:
-        await ctx.send("Event not found.")
-        conn.close()
+        await outbound.send(ctx, "Event not found.")
         return
     
-    description, event_time, location, duration, creator_name, interested_count = event
-    
-    # Get interested users with their preferences
-    c.execute('''
-        SELECT username, interested_in_connection
-        FROM event_interests
-        WHERE event_id = ?
-        ORDER BY username
-    ''', (event_id,))
-    
-    interested_users = c.fetchall()
-    conn.close()
-    
-    # Create embed
-    embed = Embed(title="🙋 Event Participants", color=0x00ff00)
-    
-    # Add event details
-    formatted_time = datetime.strptime(event_time, '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M').replace(':', ';')
-    
-    embed.add_field(name="Event", value=description, inline=False)
-    embed.add_field(name="Time", value=formatted_time, inline=True)
-    embed.add_field(name="Location", value=location, inline=True)
-    embed.add_field(name="Duration", value=duration, inline=True)
-    embed.add_field(name="Organized by", value=creator_name, inline=True)
-    
-    # Separate users by their connection preference
-    general_interest = []
-    want_to_connect = []
-    
-    for username, wants_connection in interested_users:
-        if wants_connection:
-            want_to_connect.append(username)
-        else:
-            general_interest.append(username)
-    
-    if general_interest:
-        embed.add_field(
-            name="🎯 Interested in Attending",
-            value="\n".join(general_interest) if general_interest else "None",
-            inline=False
-        )
-    
-    if want_to_connect:
-        embed.add_field(
-            name="🤝 Want to Connect",
-            value="\n".join(want_to_connect) if want_to_connect else "None",
-            inline=False
-        )
-    
-    embed.set_footer(text=f"Total Interested: {interested_count}")
+    # The participant lists only change along with the event's version
+    embed = card_cache.get('participants', event)
+    if embed is None:
+        interested_users = await repo.interested_users(event_id)
+        embed = card_cache.put('participants', event, participants_card(event, interested_users))
     
-    await ctx.send(embed=embed)
+    await outbound.send(ctx, embed=embed)
 
 @bot.command(name='myevents')
 async def view_my_interests(ctx):
     """View all events you're interested in"""
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-    
     # Get all events the user is interested in
-    c.execute('''
-        SELECT e.event_id, e.description, e.event_time, e.location, 
-               e.duration, e.creator_name, i.interested_in_connection,
-               (SELECT COUNT(DISTINCT user_id) FROM event_interests WHERE event_id = e.event_id) as total_interested
-        FROM events e
-        JOIN event_interests i ON e.event_id = i.event_id
-        WHERE i.user_id = ? AND datetime(e.event_time) >= datetime('now', 'localtime')
-        ORDER BY e.event_time ASC
-    ''', (str(ctx.author.id),))
-    
-    interested_events = c.fetchall()
-    conn.close()
+    interested_events = await repo.user_interests(str(ctx.guild.id), str(ctx.author.id), now_epoch())
     
     if not interested_events:
-        await ctx.send("You haven't expressed interest in any upcoming events.")
+        await outbound.send(ctx, "You haven't expressed interest in any upcoming events.")
         return
     
-    # Create embeds for events
-    embeds = []
-    for event in interested_events:
-        event_id, description, event_time, location, duration, creator, wants_connection, total_interested = event
-        
-        embed = Embed(title="📅 Event Details", color=0x00ff00)
-        embed.add_field(name="Description", value=description, inline=False)
-        
-        # Parse the event_time string into a datetime object first
-        event_datetime = datetime.strptime(event_time, '%Y-%m-%d %H:%M:%S')
-        formatted_time = event_datetime.strftime('%Y-%m-%d %H:%M').replace(':', ';')
-        
-        embed.add_field(name="Date & Time", value=formatted_time, inline=True)
-        embed.add_field(name="Location", value=location, inline=True)
-        embed.add_field(name="Duration", value=duration, inline=True)
-        embed.add_field(name="Organized by", value=creator, inline=True)
-        embed.add_field(name="Total Interested", value=f"{total_interested} people", inline=True)
+    # Display events with pagination, rendering only the page being shown
+    total_pages = len(interested_events)
+    
+    async def get_page(page_number):
+        event, wants_connection = interested_events[page_number]
+        embed = card_cache.event_card(event).copy()
         embed.add_field(
             name="Your Status",
             value="🤝 Interested in connecting" if wants_connection else "🎯 Interested in attending",
             inline=True
         )
-        embed.set_footer(text=f"Event ID: {event_id}")
-        embeds.append(embed)
+        embed.set_footer(text=f"Event ID: {event['event_id']} | Page {page_number + 1} of {total_pages}")
+        return embed
     
-    # Display events with pagination
-    current_page = 0
-    total_pages = len(embeds)
+    await Paginator(ctx.author.id, get_page, total_pages).start(ctx)
+
+# Most recent archived events shown by !history
+HISTORY_LIMIT = 50
+
+@bot.command(name='history')
+async def view_history(ctx):
+    """View past events you organized or were interested in"""
+    guild_id = str(ctx.guild.id)
+    user_id = str(ctx.author.id)
+    history = await db.run(past_events, guild_id, user_id, HISTORY_LIMIT)
     
-    while True:
-        embed = embeds[current_page]
-        embed.set_footer(text=f"Event ID: {interested_events[current_page][0]} | Page {current_page + 1} of {total_pages}")
-        
-        message = await ctx.send(embed=embed)
-        
-        if total_pages > 1:
-            await message.add_reaction('◀️')
-            await message.add_reaction('▶️')
-            
-            try:
-                reaction, user = await bot.wait_for(
-                    'reaction_add',
-                    timeout=30.0,
-                    check=lambda r, u: u == ctx.author and str(r.emoji) in ['◀️', '▶️']
-                )
-                
-                await message.delete()
-                
-                if str(reaction.emoji) == '◀️':
-                    current_page = (current_page - 1) % total_pages
-                elif str(reaction.emoji) == '▶️':
-                    current_page = (current_page + 1) % total_pages
-                    
-            except asyncio.TimeoutError:
-                break
-        else:
-            break
+    if not history:
+        await outbound.send(ctx, "You don't have any past events yet.")
+        return
+    
+    total_pages = (len(history) + EVENTS_PER_PAGE - 1) // EVENTS_PER_PAGE
+    
+    async def get_page(page_number):
+        event_list = []
+        for event_id, description, location, event_time, interested_count, organized in \
+                history[page_number * EVENTS_PER_PAGE:(page_number + 1) * EVENTS_PER_PAGE]:
+            entry = f"**ID: {event_id}** {'🗓️ Organized by you' if organized else ''}\n"
+            entry += f"⏰ {format_event_time(event_time)}\n"
+            entry += f"📍 {location}\n"
+            entry += f"💭 {description[:50]}{'...' if len(description) > 50 else ''}\n"
+            entry += f"👥 {interested_count} interested\n"
+            entry += "─" * 40 + "\n"
+            event_list.append(entry)
+        embed = Embed(title="🕰️ Your Past Events", color=0x00ff00)
+        embed.description = "".join(event_list)
+        embed.set_footer(text=f"Page {page_number + 1} of {total_pages}")
+        return embed
+    
+    await Paginator(ctx.author.id, get_page, total_pages).start(ctx)
 
 @bot.command(name='cancelinterest')
 async def cancel_interest(ctx, event_id: int = None):
     """Cancel your interest in an event"""
     if not event_id:
-        await ctx.send("Please provide an event ID. Example: `!cancelinterest 123`")
+        await outbound.send(ctx, "Please provide an event ID. Example: `!cancelinterest 123`")
         return
 
-    conn = sqlite3.connect('discord_bot.db')
-    c = conn.cursor()
-
     # Check if event exists and get event details
-    c.execute('''
-        SELECT description, event_time 
-        FROM events 
-        WHERE event_id = ?
-    ''', (event_id,))
-    event = c.fetchone()
+    event = await repo.get_event(str(ctx.guild.id), event_id)
 
     if not event:
-        await ctx.send("❌ Event not found. Please check the event ID.")
-        conn.close()
+        await outbound.send(ctx, "❌ Event not found. Please check the event ID.")
         return
 
-    # Check if user is interested in this event
-    c.execute('''
-        SELECT * FROM event_interests
-        WHERE event_id = ? AND user_id = ?
-    ''', (event_id, str(ctx.author.id)))
+    # Remove interest
+    wanted_connection = await repo.remove_interest(event_id, str(ctx.author.id))
 
-    if not c.fetchone():
-        await ctx.send("❌ You are not registered for this event.")
-        conn.close()
+    if wanted_connection is None:
+        await outbound.send(ctx, "❌ You are not registered for this event.")
         return
 
-    # Remove interest
-    c.execute('''
-        DELETE FROM event_interests
-        WHERE event_id = ? AND user_id = ?
-    ''', (event_id, str(ctx.author.id)))
-
-    conn.commit()
-    conn.close()
+    event_cache.adjust_counts(event_id, interested=-1, connect=-1 if wanted_connection else 0)
+    recommender.remove(str(ctx.guild.id), str(ctx.author.id), event_id)
 
     # Create confirmation embed
     embed = Embed(title="Interest Cancelled", color=0xff0000)
-    embed.add_field(name="Event", value=event[0], inline=False)
-    event_time = datetime.strptime(event[1], '%Y-%m-%d %H:%M:%S')
-    formatted_time = event_time.strftime('%Y-%m-%d %H:%M').replace(':', ';')
+    embed.add_field(name="Event", value=event['description'], inline=False)
+    formatted_time = format_event_time(event['event_time'])
     embed.add_field(name="Date & Time", value=formatted_time, inline=True)
 
-    await ctx.send("✅ Successfully cancelled your interest in the event.", embed=embed)
+    await outbound.send(ctx, "✅ Successfully cancelled your interest in the event.", embed=embed)
+
+@bot.command(name='recount')
+@commands.has_permissions(administrator=True)
+async def recount_interests(ctx, action=None):
+    """Check (or with `fix`, rebuild) the per-event interest counters"""
+    if action == 'fix':
+        drift = await db.write(rebuild_counters)
+        # The rebuild bypassed the write-through cache: re-read the repaired events,
+        # and drop cards whose version may now name different counts
+        repaired = [event_id for event_id, _, _ in drift]
+        await event_cache.reload(repo, repaired)
+        card_cache.discard(repaired)
+    else:
+        drift = await db.run(find_counter_drift)
+
+    if not drift:
+        await outbound.send(ctx, "✅ All interest counters are consistent.")
+        return
+
+    lines = [
+        f"ID {event_id}: stored {stored[0]}/{stored[1]}, actual {actual[0]}/{actual[1]}"
+        for event_id, stored, actual in drift[:20]
+    ]
+    status = "Rebuilt" if action == 'fix' else "Found"
+    footer = "" if action == 'fix' else "\nRun `!recount fix` to rebuild them."
+    await outbound.send(ctx, f"{status} {len(drift)} inconsistent counter(s) (interested/connect):\n"
+                             + "\n".join(lines) + footer)
+
+@bot.command(name='cachestats')
+@commands.has_permissions(administrator=True)
+async def cache_stats(ctx):
+    """Show upcoming-events and event card cache hit/miss counters"""
+    stats = event_cache.stats()
+    cards = card_cache.stats()
+    await outbound.send(
+        ctx,
+        f"📦 Cached events: {stats['size']} • hits: {stats['hits']} • misses: {stats['misses']} "
+        f"• evictions: {stats['evictions']} • hit rate: {stats['hit_rate']:.1%}\n"
+        f"🃏 Cached cards: {cards['size']} • hits: {cards['hits']} • misses: {cards['misses']} "
+        f"• hit rate: {cards['hit_rate']:.1%}"
+    )
+
+@bot.command(name='geostats')
+@commands.has_permissions(administrator=True)
+async def geocoder_stats(ctx):
+    """Show where place lookups were answered from"""
+    stats = geocoder.stats()
+    await outbound.send(
+        ctx,
+        f"🗺️ Gazetteer hits: {stats['gazetteer_hits']} • cache hits: {stats['cache_hits']} "
+        f"• network lookups: {stats['network_lookups']} • failures: {stats['failures']} "
+        f"• hit rate: {stats['hit_rate']:.1%}"
+    )
+
+@bot.command(name='synccommands')
+@commands.is_owner()
+async def sync_commands(ctx):
+    """Force a slash command sync, e.g. after commands were changed from outside the bot"""
+    synced = await sync_app_commands(force=True)
+    await outbound.send(ctx, f"✅ Synced {len(synced)} slash commands.")
 
 @bot.command(name='help')
 async def help_command(ctx):
@@ -925,21 +927,27 @@ async def help_command(ctx):
 
     # Event Commands
     event_commands = """
-`!schedule` - Create a new event
+`!schedule` or `/schedule` - Create a new event
 `!events` - View all upcoming events
 `!events type social` - View events filtered by type
 `!events size small` - View events filtered by size
 `!events date 2024-11-06` - View events for a specific date
+`!search <terms>` - Search upcoming events by description or location
+`!recommended` - Upcoming events liked by members with interests like yours
+`!events near <place>` - View events near a place, nearest first
 `!interested <event_id>` - View who's interested in an event
 `!cancelinterest <event_id>` - Cancel your interest in an event
+`!mygroup <event_id>` - See who's in your Connect with Others group
+`!history` - View past events you organized or were interested in
 """
     embed.add_field(name="🎯 Event Commands", value=event_commands.strip(), inline=False)
 
     # Preference Commands
     pref_commands = """
-`!setpreferences` - Set your event preferences
+`!setpreferences` or `/setpreferences` - Set your event preferences
 `!viewpreferences` - View your current preferences
 `!clearpreferences` - Clear all your preferences
+`!notifications on|off` - Get DMs about new events matching your preferences
 """
     embed.add_field(name="⚙️ Preference Commands", value=pref_commands.strip(), inline=False)
 
@@ -976,14 +984,14 @@ async def help_command(ctx):
     coc_note = "For detailed community guidelines, please refer to our Code of Conduct."
     embed.set_footer(text=coc_note)
 
-    await ctx.send(embed=embed)
+    await outbound.send(ctx, embed=embed)
 
 @bot.command(name='code')
 async def code_of_conduct(ctx):
     """Display the Code of Conduct"""
     embed = Embed(title="📜 Community Code of Conduct", color=0x00ff00)
     embed.description = CODE_OF_CONDUCT
-    await ctx.send(embed=embed)
+    await outbound.send(ctx, embed=embed)
 # Run the bot
 if __name__ == "__main__":
     bot.run(TOKEN)
\ No newline at end of file
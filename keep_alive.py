@@ -1,15 +1,94 @@
-from flask import Flask
-from threading import Thread
+import asyncio
+import os
+import time
 
-app = Flask('')
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "Hello. I am alive!"
+HOST = '0.0.0.0'
+PORT = int(os.environ.get('PORT', 8080))
+LAG_INTERVAL = 0.5    # Seconds between event loop lag samples
+MAX_LOOP_LAG = 0.25   # Seconds of lag before the bot reports not ready
+DB_TIMEOUT = 1.0
 
-def run():
-  app.run(host='0.0.0.0',port=8080)
+class HealthServer:
+    """Liveness/readiness HTTP endpoint served on the bot's own event loop
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+    /        liveness: the process and its loop are running
+    /ready   readiness: gateway connected, database reachable, loop lag low
+    /metrics Prometheus text, when a metrics renderer is supplied
+    """
+
+    def __init__(self, bot, db=None, metrics=None, host=HOST, port=PORT):
+        self.bot = bot
+        self.db = db
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.loop_lag = 0.0
+        self._runner = None
+        self._lag_task = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/ready', self.ready)
+        if metrics is not None:
+            self.app.router.add_get('/metrics', self.serve_metrics)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self._measure_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _measure_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lag = max(time.perf_counter() - start - LAG_INTERVAL, 0.0)
+
+    async def home(self, request):
+        return web.Response(text="Hello. I am alive!")
+
+    async def _check_db(self):
+        if self.db is None:
+            return None
+        try:
+            await asyncio.wait_for(self.db.fetchone('SELECT 1'), timeout=DB_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def ready(self, request):
+        gateway = self.bot.is_ready() and not self.bot.is_closed()
+        db_ok = await self._check_db()
+        checks = {
+            'gateway_connected': gateway,
+            'gateway_latency_seconds': self.bot.latency if gateway else None,
+            'database_reachable': db_ok,
+            'event_loop_lag_seconds': round(self.loop_lag, 4),
+        }
+        healthy = gateway and db_ok is not False and self.loop_lag < MAX_LOOP_LAG
+        checks['ready'] = healthy
+        return web.json_response(checks, status=200 if healthy else 503)
+
+    async def serve_metrics(self, request):
+        return web.Response(text=self.metrics(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Prometheus-Format': '0.0.4'})
+
+def keep_alive(bot, db=None, metrics=None):
+    """Start the health server from the bot's setup_hook, on the bot's loop"""
+    server = HealthServer(bot, db=db, metrics=metrics)
+    original_setup_hook = bot.setup_hook
+
+    async def setup_hook():
+        await original_setup_hook()
+        await server.start()
+
+    bot.setup_hook = setup_hook
+    return server
@@ -65,5 +65,5 @@ for filename in os.listdir('./cogs'):
     
 
         
-keep_alive()
+keep_alive(client)
 client.run('Token')